@@ -0,0 +1,184 @@
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.subtitle_handler import align_words_with_punctuation  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "corpus", "alignment_transcripts.json")
+STRESS_CASES_PATH = os.path.join(os.path.dirname(__file__), "corpus", "alignment_stress_cases.json")
+# Longest time allowed to align one stress case, in seconds
+STRESS_TIME_LIMIT = 5.0
+
+VOCABULARY = (
+    "the of and to in is that it was for on are as with his they at be this from have or by "
+    "one had not but what all were when we there can an your which their said if do will each "
+    "about how up out them then she many some so these would other into has more her two like "
+    "him see time could no make than first been its who now people my made over did down only "
+    "way find use may water long little very after words called just where most know get "
+    "through back much before go good new write our used me man too any day same right look "
+    "think also around another came come work three word must because does part even place "
+    "well such here take why things help put years different away again off went old number "
+    "great tell men say small every found still between name should home big give air line set "
+    "own under read last never us left end along while might next sound below saw something "
+    "thought both few those always looked show large often together asked house world going "
+    "want school important until form food keep children feet land side without boy once animals "
+    "life enough took sometimes four head above kind began almost live page got earth need far "
+    "hand high year mother light parts country father let night following picture being study "
+    "second eyes soon times story boys since white days ever paper hard near sentence better best "
+    "across during today others however sure means knew whales ocean planet volcano comet"
+).split()
+
+
+def make_words(texts, word_duration=0.4):
+    """
+    Builds Whisper-like word objects with evenly spaced timestamps.
+    """
+    return [
+        SimpleNamespace(word=text, start=i * word_duration, end=(i + 1) * word_duration)
+        for i, text in enumerate(texts)
+    ]
+
+
+def check_corpus(path=CORPUS_PATH):
+    """
+    Aligns every transcript of the corpus and compares the result with the expected words.
+
+    Returns:
+        int: The number of failed transcripts.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    failures = 0
+    for case in corpus:
+        aligned = align_words_with_punctuation(make_words(case["words"]), case["text"])
+        result = [text for _, _, text in aligned]
+        if result == case["expected"]:
+            print(f"ok      {case['name']}")
+        else:
+            failures += 1
+            print(f"FAILED  {case['name']}\n  expected: {case['expected']}\n  got:      {result}")
+    return failures
+
+
+def check_scaling(sizes=(10000, 20000, 40000, 80000), drop_every=97):
+    """
+    Aligns synthetic transcripts of growing size, with one word in every drop_every missing from
+    the Whisper words, and reports the time per word (which should stay roughly constant).
+    Every word must keep its own text, and the text must be kept whole and in order.
+
+    Returns:
+        int: The number of misaligned words.
+    """
+    misaligned = 0
+    for size in sizes:
+        text = " ".join(f"word{i}," for i in range(size))
+        words = make_words([f"word{i}" for i in range(size) if i % drop_every])
+        start = time.perf_counter()
+        aligned = align_words_with_punctuation(words, text)
+        elapsed = time.perf_counter() - start
+        # The dropped words may be attached to either neighbour
+        texts = {start: text for start, _, text in aligned}
+        errors = sum(1 for w in words if f"{w.word}," not in texts.get(w.start, "").split())
+        if not _keeps_text(aligned, text):
+            errors += 1
+        misaligned += errors
+        print(f"{size:>7} words: {elapsed:.2f}s ({elapsed / size * 1e6:.1f} us/word), "
+              f"{errors} misaligned")
+    return misaligned
+
+
+def _keeps_text(aligned, text):
+    """
+    Whether the aligned words contain the whole text in order (a text word may be split over
+    several Whisper words).
+    """
+    return "".join(t for _, _, t in aligned).replace(" ", "") == text.replace(" ", "")
+
+
+def make_transcript(count, seed):
+    """
+    Builds a transcript of count words of pseudo-English prose, with capitalized sentences,
+    commas and question marks, from a fixed seed.
+
+    Returns:
+        list[str]: The punctuated words of the transcript.
+    """
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(VOCABULARY))]
+    tokens = []
+    while len(tokens) < count:
+        sentence = rng.choices(VOCABULARY, weights, k=min(rng.randint(5, 16), count - len(tokens)))
+        sentence[0] = sentence[0].capitalize()
+        for k in range(1, len(sentence) - 1):
+            if rng.random() < 0.08:
+                sentence[k] += ","
+        sentence[-1] += rng.choice(".....?!")
+        tokens.extend(sentence)
+    return tokens
+
+
+def check_stress_cases(path=STRESS_CASES_PATH, time_limit=STRESS_TIME_LIMIT):
+    """
+    Aligns long synthetic transcripts where Whisper skipped passages ("drop": [start, end) word
+    ranges of the text), invented passages ("hallucinate": [position, count]) or transcribed a
+    different text altogether ("divergent_seed"), and checks that:
+    - no text is lost or reordered,
+    - every transcribed word keeps its own text, and invented words get none,
+    - the alignment takes less than time_limit seconds.
+
+    Returns:
+        int: The number of failed cases.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+
+    failures = 0
+    for case in cases:
+        tokens = make_transcript(case["words"], case["seed"])
+        dropped = {i for start, end in case.get("drop", []) for i in range(start, end)}
+        # Each Whisper word with the index of the text token it transcribes (None if invented)
+        sources = [(token.strip(",.?!"), i) for i, token in enumerate(tokens) if i not in dropped]
+        for position, count in sorted(case.get("hallucinate", []), reverse=True):
+            invented = make_transcript(count, case["seed"] + 1000)
+            sources[position:position] = [(token.strip(",.?!").lower(), None) for token in invented]
+        if "divergent_seed" in case:
+            sources = [(token.strip(",.?!"), None)
+                       for token in make_transcript(case["words"], case["divergent_seed"])]
+        words = make_words([word for word, _ in sources])
+
+        start = time.perf_counter()
+        aligned = align_words_with_punctuation(words, " ".join(tokens))
+        elapsed = time.perf_counter() - start
+
+        errors = []
+        if not _keeps_text(aligned, " ".join(tokens)):
+            errors.append("text lost or reordered")
+        if "divergent_seed" not in case:
+            texts = {start: text for start, _, text in aligned}
+            wrong = sum(1 for w, (_, source) in zip(words, sources)
+                        if (source is None) != (w.start not in texts)
+                        or (source is not None and tokens[source] not in texts[w.start].split()))
+            if wrong:
+                errors.append(f"{wrong} words with the wrong text")
+        if elapsed > time_limit:
+            errors.append(f"took {elapsed:.1f}s")
+
+        if errors:
+            failures += 1
+            print(f"FAILED  {case['name']}: {', '.join(errors)}")
+        else:
+            print(f"ok      {case['name']} ({elapsed:.2f}s)")
+    return failures
+
+
+if __name__ == "__main__":
+    failures = check_corpus()
+    failures += check_stress_cases()
+    misaligned = check_scaling()
+    sys.exit(1 if failures or misaligned else 0)
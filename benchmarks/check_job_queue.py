@@ -0,0 +1,142 @@
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import worker  # noqa: E402
+from utils.job_queue import STAGES, JobQueue  # noqa: E402
+
+# Number of worker processes claiming the jobs at the same time
+WORKERS = 3
+JOBS = 100
+# Time a stage takes, in seconds: the stages end at once, so the workers keep racing for claims
+STAGE_SECONDS = 0.0
+# Lease of the crashed and the lease-losing workers, in seconds
+SHORT_LEASE = 0.6
+
+
+class LosingQueue(JobQueue):
+    """
+    A queue that refuses every renewal, as when another worker took over the stage.
+    """
+
+    def renew(self, job_id, worker, lease_seconds=None):
+        return False
+
+
+def _record(log_path, *fields):
+    # One short write per line, so the lines of several processes do not interleave
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(" ".join(fields) + "\n")
+
+
+def _fake_stage(log_path, worker_id, stage_seconds):
+    """
+    Builds a run_stage replacement that records each claim and each finished stage.
+    """
+    def run_stage(job, services, logger, checkpoint=None):
+        _record(log_path, "start", job["id"], job["stage"], worker_id)
+        deadline = time.monotonic() + stage_seconds
+        while time.monotonic() < deadline:
+            checkpoint()
+            time.sleep(0.01)
+        _record(log_path, "done", job["id"], job["stage"], worker_id)
+        return "final.mp4" if job["stage"] == STAGES[-1] else None
+    return run_stage
+
+
+def _run_worker(queue_path, log_path, worker_id, lease_seconds=5.0, stage_seconds=STAGE_SECONDS,
+                losing=False, max_jobs=None):
+    worker.run_stage = _fake_stage(log_path, worker_id, stage_seconds)
+    job_queue = (LosingQueue if losing else JobQueue)(queue_path)
+    logger = logging.getLogger("check_job_queue")
+    worker.run_worker(job_queue, None, worker_id, STAGES, logger, lease_seconds=lease_seconds,
+                      poll_seconds=0.05, max_jobs=max_jobs, exit_when_idle=True)
+
+
+def _read_log(log_path):
+    with open(log_path, "r", encoding="utf-8") as f:
+        return [line.split() for line in f if line.strip()]
+
+
+def check_concurrent_claims():
+    """
+    Runs several worker processes on the same queue, with a crashed worker whose stage must be
+    claimed again after its lease expires, and a worker that loses its lease and must stop.
+
+    Returns:
+        int: The number of failed checks.
+    """
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        queue_path = os.path.join(directory, "jobs.db")
+        log_path = os.path.join(directory, "claims.log")
+        open(log_path, "w").close()
+        job_queue = JobQueue(queue_path)
+        job_ids = [job_queue.submit([], job_id=f"job-{i:03d}")["id"] for i in range(JOBS)]
+
+        # A worker that crashes after claiming a stage never renews nor completes it
+        crashed = job_queue.claim("crashed", STAGES, lease_seconds=SHORT_LEASE)["id"]
+        # A worker that loses the lease of its stage while running it
+        context = multiprocessing.get_context("spawn")
+        losing = context.Process(target=_run_worker, args=(queue_path, log_path, "losing"),
+                                 kwargs={"lease_seconds": SHORT_LEASE, "stage_seconds": 10.0,
+                                         "losing": True, "max_jobs": 1})
+        losing.start()
+        losing.join(timeout=30)
+        time.sleep(SHORT_LEASE)
+
+        started = time.perf_counter()
+        processes = [context.Process(target=_run_worker, args=(queue_path, log_path, f"worker-{i}"))
+                     for i in range(WORKERS)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=120)
+        elapsed = time.perf_counter() - started
+
+        events = _read_log(log_path)
+        starts = Counter((job_id, stage) for event, job_id, stage, _ in events if event == "start")
+        dones = Counter((job_id, stage) for event, job_id, stage, _ in events if event == "done")
+        lost = [(job_id, stage) for event, job_id, stage, worker_id in events
+                if event == "start" and worker_id == "losing"]
+        finished_after_loss = [(job_id, stage) for event, job_id, stage, worker_id in events
+                               if event == "done" and worker_id == "losing"]
+        workers = Counter(worker_id for event, _, _, worker_id in events if event == "done")
+
+        if losing.exitcode != 0 or any(process.exitcode != 0 for process in processes):
+            print("A worker process failed.")
+            failures += 1
+        if len(lost) != 1 or finished_after_loss:
+            print(f"The worker that lost its lease did not stop its stage: {lost}")
+            failures += 1
+        for job_id in job_ids:
+            for stage in STAGES:
+                # The crashed claim never reaches the stage, the lost one is claimed again
+                expected = 2 if (job_id, stage) in lost else 1
+                if starts[(job_id, stage)] != expected or dones[(job_id, stage)] != 1:
+                    print(f"The {stage} stage of {job_id} was claimed {starts[(job_id, stage)]} "
+                          f"times (expected {expected}) and finished {dones[(job_id, stage)]} "
+                          f"times (expected 1).")
+                    failures += 1
+            job = job_queue.get(job_id)
+            if job["status"] != "succeeded":
+                print(f"{job_id} is {job['status']}: {job['error']}")
+                failures += 1
+        if job_queue.get(crashed)["status"] != "succeeded":
+            print(f"The stage of the crashed worker was not claimed again ({crashed}).")
+            failures += 1
+
+    print(f"{JOBS} jobs x {len(STAGES)} stages on {WORKERS} workers in {elapsed:.2f}s "
+          f"(stages per worker: {dict(sorted(workers.items()))}), "
+          f"{failures} failures.")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if check_concurrent_claims() else 0)
@@ -0,0 +1,216 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from parsers.arguments import parse_args  # noqa: E402
+from pipeline import run_pipeline  # noqa: E402
+from services.video_editor import BACKGROUND_MUSIC_DIFF, assemble_video  # noqa: E402
+from stubs import StubServices, canned_script  # noqa: E402
+from utils.audio_processing import adjust_background_music_volume, reprocess_audio  # noqa: E402
+from utils.file_handler import save_audio, save_image, save_subtitles  # noqa: E402
+from utils.scene_planner import plan_scenes  # noqa: E402
+from utils.subtitle_handler import align_words_with_punctuation, format_srt_from_aligned_words  # noqa: E402
+
+STAGES = [
+    "reprocess_audio",
+    "align_words_with_punctuation",
+    "format_srt_from_aligned_words",
+    "plan_scenes",
+    "adjust_background_music_volume",
+    "assemble_video",
+]
+
+
+def timed(results, name, function, *args, **kwargs):
+    """
+    Calls function(*args, **kwargs), storing its wall time in results[name].
+    """
+    start = time.perf_counter()
+    value = function(*args, **kwargs)
+    results[name] = round(time.perf_counter() - start, 4)
+    return value
+
+
+def benchmark_stages(seconds, work_dir, latency=0.0):
+    """
+    Times the individual pipeline stages on stub assets of the given narration length.
+
+    Returns:
+        dict: Stage name -> seconds.
+    """
+    services = StubServices(seconds, latency=latency)
+    file_id = f"stages_{seconds}s"
+    folder = os.path.join(work_dir, file_id)
+    os.makedirs(folder, exist_ok=True)
+    results = {}
+
+    # A 10% longer narration forces reprocess_audio to speed it up
+    audio = services.openai_tts.text_to_speech(canned_script(seconds * 1.1))
+    audio = timed(results, "reprocess_audio", reprocess_audio,
+                  audio_data=audio, max_duration=seconds)
+    audio_path = save_audio(audio, directory=folder, file_id=file_id)
+
+    transcript = services.whisper.transcribe_audio(audio_path)
+    aligned = timed(results, "align_words_with_punctuation", align_words_with_punctuation,
+                    transcript.words, transcript.text)
+    srt_content, cues = timed(results, "format_srt_from_aligned_words",
+                              format_srt_from_aligned_words, aligned)
+    save_subtitles(srt_content, directory=folder, file_id=file_id)
+
+    music = services.openai.generate_music_choice(
+        "", [], json.dumps(load_songs())).dict()
+    music_path = os.path.join(REPO_ROOT, "songs", "mp3", next(
+        s["file"] for s in load_songs() if s["id"] == music["id"]))
+    timed(results, "adjust_background_music_volume", adjust_background_music_volume,
+          audio_path, music_path, target_diff=BACKGROUND_MUSIC_DIFF, output_dir=folder)
+
+    scenes = timed(results, "plan_scenes", plan_scenes, cues)
+    for number, scene in enumerate(scenes, start=1):
+        save_image(services.replicate.generate_image(scene["text"]), directory=folder,
+                   file_id=file_id, suffix=f"img_{number}")
+    timed(results, "assemble_video", assemble_video,
+          folder, file_id, cues, background_music_path=music_path, scenes=scenes)
+    return results
+
+
+def load_songs():
+    with open(os.path.join(REPO_ROOT, "songs", "songs.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def benchmark_full_run(seconds, latency=0.0, extra_args=()):
+    """
+    Times a whole run of the pipeline with stub providers.
+
+    Returns:
+        float: Seconds.
+    """
+    services = StubServices(seconds, latency=latency)
+    args = parse_args([
+        "--theme", "Benchmark", "--language", "English", "--tts_service", "openai",
+        "--max_duration", str(seconds), *extra_args
+    ])
+    logger = logging.getLogger("rapidclip_generator.benchmark")
+    file_id = f"benchmark_{seconds}s"
+    start = time.perf_counter()
+    try:
+        run_pipeline(args, services, logger, file_id=file_id)
+    finally:
+        elapsed = time.perf_counter() - start
+        shutil.rmtree(os.path.join("output", file_id), ignore_errors=True)
+    return round(elapsed, 4)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compares results with a baseline run.
+
+    Returns:
+        list[str]: A description of every timing that got slower than the baseline by more
+                   than the tolerance (a fraction, e.g. 0.25 for 25%).
+    """
+    previous = {run["seconds"]: run for run in baseline["runs"]}
+    regressions = []
+    for run in results["runs"]:
+        old = previous.get(run["seconds"])
+        if not old:
+            continue
+        timings = dict(run["stages"], full_run=run["full_run"])
+        old_timings = dict(old["stages"], full_run=old["full_run"])
+        for name, value in timings.items():
+            reference = old_timings.get(name)
+            if value is None or not reference:
+                continue
+            if value > reference * (1 + tolerance):
+                regressions.append(
+                    f"{run['seconds']}s {name}: {reference:.3f}s -> {value:.3f}s "
+                    f"(+{(value / reference - 1) * 100:.0f}%)")
+    return regressions
+
+
+def parse_benchmark_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pipeline stages and full runs with offline provider stubs."
+    )
+    parser.add_argument("--lengths", type=int, nargs="+", default=[15, 30, 60, 180],
+                        help="Narration lengths to benchmark, in seconds (default: 15 30 60 180).")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Simulated latency of every provider call, in seconds (default: 0).")
+    parser.add_argument("--skip_full_run", action="store_true",
+                        help="Only time the individual stages.")
+    parser.add_argument("--output", default=None,
+                        help="Results file (default: benchmarks/results/<timestamp>.json).")
+    parser.add_argument("--baseline", default=None,
+                        help="Results file of a previous run to compare with. Exits with status 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline, as a fraction (default: 0.25).")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_benchmark_args()
+    # The pipeline uses paths relative to the repository root (fonts/, songs/, output/)
+    os.chdir(REPO_ROOT)
+    work_dir = os.path.join("output", "benchmark_stages")
+
+    started = datetime.now(timezone.utc)
+    results = {
+        "started_at": started.isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "latency": args.latency,
+        "runs": [],
+    }
+    try:
+        for seconds in args.lengths:
+            print(f"Benchmarking {seconds}s video...", flush=True)
+            stages = benchmark_stages(seconds, work_dir, latency=args.latency)
+            full_run = None if args.skip_full_run else benchmark_full_run(
+                seconds, latency=args.latency)
+            results["runs"].append(
+                {"seconds": seconds, "stages": stages, "full_run": full_run})
+            for name in STAGES:
+                print(f"  {name:<32} {stages[name]:8.3f}s")
+            if full_run is not None:
+                print(f"  {'full run':<32} {full_run:8.3f}s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import hashlib
+import io
+import json
+import os
+import re
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image
+from pydub import AudioSegment
+from services.provider_router import ProviderRouter
+
+WORDS_PER_SECOND = 2.5
+SAMPLE_RATE = 24000
+EMBEDDING_SIZE = 256
+
+CANNED_SCRIPT = (
+    "Did you know that octopuses have three hearts? Two of them pump blood to the gills, "
+    "while the third keeps it moving through the rest of the body. Their blood is blue, "
+    "because it relies on copper instead of iron to carry oxygen. Even more surprising, "
+    "most of their neurons live in their arms, so each arm can taste, touch and react on "
+    "its own. Some species change color in a fraction of a second, and they do it while "
+    "being colorblind! Scientists still debate how they pull this off; one idea is that "
+    "their skin itself senses light. Next time you see an octopus, remember: you are "
+    "looking at one of the strangest minds on the planet."
+)
+
+CANNED_VOICE_INSTRUCTIONS = {
+    "accent_affect": "Neutral and warm.",
+    "tone": "Curious and upbeat.",
+    "pacing": "Lively, with short pauses after questions.",
+    "emotion": "Amazed.",
+    "pronunciation": "Clear, stressing surprising facts.",
+    "personality_affect": "A friendly science host.",
+}
+
+
+def canned_script(seconds):
+    """
+    Returns a script that takes about the given number of seconds to narrate.
+    """
+    words = CANNED_SCRIPT.split()
+    count = max(1, int(seconds * WORDS_PER_SECOND))
+    script = " ".join(words[i % len(words)] for i in range(count))
+    return script.rstrip(",;:!?.") + "."
+
+
+def synthesize_speech(text):
+    """
+    Synthesizes speech-like MP3 audio for a text: one tone burst per word, separated by short
+    silences, at WORDS_PER_SECOND.
+    """
+    words = text.split()
+    slot = int(SAMPLE_RATE / WORDS_PER_SECOND)
+    voiced = int(slot * 0.8)
+    t = np.arange(voiced) / SAMPLE_RATE
+    envelope = np.sin(np.pi * np.arange(voiced) / voiced)
+    samples = np.zeros(slot * len(words), dtype=np.float32)
+    for i, word in enumerate(words):
+        pitch = 140 + 15 * (len(word) % 5)
+        samples[i * slot:i * slot + voiced] = 0.4 * envelope * np.sin(2 * np.pi * pitch * t)
+    segment = AudioSegment(
+        (samples * 32767).astype(np.int16).tobytes(),
+        frame_rate=SAMPLE_RATE, sample_width=2, channels=1)
+    buffer = io.BytesIO()
+    segment.export(buffer, format="mp3", bitrate="64k")
+    return buffer.getvalue()
+
+
+class _Stub:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def _wait(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class StubOpenAIService(_Stub):
+    """
+    Offline stand-in for OpenAIService returning a canned script of a given length.
+    """
+
+    def __init__(self, seconds, latency=0.0):
+        super().__init__(latency)
+        self.script = canned_script(seconds)
+
+    def generate_script(self, theme, language):
+        self._wait()
+        return self.script
+
+    def generate_script_and_voice_instructions(self, theme, language):
+        self._wait()
+        return {"voice_instructions": dict(CANNED_VOICE_INSTRUCTIONS), "script": self.script}
+
+    def stream_script(self, theme, language):
+        self._wait()
+        for token in re.findall(r"\S+\s*", self.script):
+            yield "script", token
+
+    def stream_script_and_voice_instructions(self, theme, language):
+        self._wait()
+        yield "voice_instructions", dict(CANNED_VOICE_INSTRUCTIONS)
+        yield from self.stream_script(theme, language)
+
+    def generate_image_prompt(self, full_subtitles, previous_prompts, group_text):
+        self._wait()
+        return f"Illustration of: {group_text}"
+
+    def embed_texts(self, texts, model="text-embedding-3-small"):
+        self._wait()
+        # Hashed bag of words: prompts sharing words get similar embeddings
+        embeddings = []
+        for text in texts:
+            vector = np.zeros(EMBEDDING_SIZE, dtype=np.float32)
+            for word in re.findall(r"\w+", text.lower()):
+                digest = hashlib.sha256(word.encode("utf-8")).digest()
+                vector[int.from_bytes(digest[:4], "little") % EMBEDDING_SIZE] += 1.0
+            embeddings.append(vector.tolist())
+        return embeddings
+
+    def generate_music_choice(self, script, image_prompts, songs_json):
+        self._wait()
+        # Pick the first song whose file is available
+        songs = json.loads(songs_json)
+        song = next((s for s in songs if os.path.exists(
+            os.path.join("songs", "mp3", s["file"]))), songs[0])
+        return SimpleNamespace(dict=lambda: {"reasoning": "Benchmark stub.", "id": song["id"]})
+
+
+class StubTTSService(_Stub):
+    """
+    Offline stand-in for ElevenLabsService and OpenAITTSService.
+    """
+
+    def text_to_speech(self, text, **kwargs):
+        self._wait()
+        return synthesize_speech(text)
+
+
+class StubWhisperService(_Stub):
+    """
+    Offline stand-in for WhisperService: returns the script words, lower-cased and without
+    punctuation like Whisper does, spread evenly over the audio.
+    """
+
+    def __init__(self, openai_stub, latency=0.0):
+        super().__init__(latency)
+        self.openai_stub = openai_stub
+
+    def transcribe_audio(self, audio_file_path):
+        self._wait()
+        duration = len(AudioSegment.from_file(audio_file_path)) / 1000.0
+        text = self.openai_stub.script
+        words = re.findall(r"[\w']+", text)
+        slot = duration / len(words)
+        return SimpleNamespace(
+            text=text,
+            duration=duration,
+            words=[
+                SimpleNamespace(word=w.lower(), start=round(i * slot, 3),
+                                end=round((i + 0.8) * slot, 3))
+                for i, w in enumerate(words)
+            ],
+        )
+
+
+class StubReplicateService(_Stub):
+    """
+    Offline stand-in for ReplicateService returning a gradient PNG colored after the prompt.
+    """
+
+    def generate_image(self, prompt, width=1080, height=1920, model=None):
+        self._wait()
+        seed = hashlib.sha256(prompt.encode("utf-8")).digest()
+        top = np.frombuffer(seed[:3], dtype=np.uint8).astype(np.float32)
+        bottom = np.frombuffer(seed[3:6], dtype=np.uint8).astype(np.float32)
+        ramp = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+        pixels = (top * (1 - ramp) + bottom * ramp).astype(np.uint8)
+        image = Image.fromarray(np.broadcast_to(pixels, (height, width, 3)).copy())
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", compress_level=1)
+        return buffer.getvalue()
+
+
+class StubServices:
+    """
+    Drop-in replacement for ServiceRegistry backed by offline stubs.
+    """
+
+    def __init__(self, seconds, latency=0.0):
+        """
+        Args:
+            seconds (float): Target narration length of the canned script.
+            latency (float): Simulated latency of every provider call, in seconds.
+        """
+        self.openai = StubOpenAIService(seconds, latency)
+        self.elevenlabs = StubTTSService(latency)
+        self.openai_tts = StubTTSService(latency)
+        self.whisper = StubWhisperService(self.openai, latency)
+        self.replicate = StubReplicateService(latency)
+        self._routers = {}
+
+    def validate(self, names):
+        # Stubs need no credentials
+        return None
+
+    def router(self, name, backends, hedge=False):
+        key = (name, tuple(backends), hedge)
+        if key not in self._routers:
+            self._routers[key] = ProviderRouter(name, backends, hedge=hedge)
+        return self._routers[key]
@@ -0,0 +1,37 @@
+import sys
+from parsers.arguments import parse_image_library_args
+from services.registry import ServiceRegistry
+from utils.image_library import rebuild_image_library
+from utils.logger import setup_logger
+
+
+def main():
+    """
+    Rebuilds the cross-video image library used by --image_library.
+    - Finds the images of every video folder and their prompts (from <id>_images.json, or from
+      process.log for older videos).
+    - Embeds the prompts in batches and writes a fresh index, keeping the most recent images.
+    """
+    logger = setup_logger()
+    args = parse_image_library_args()
+
+    services = ServiceRegistry()
+    try:
+        services.validate(["openai"])
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    logger.info(f"Rebuilding the image library in {args.image_library_dir}...")
+    library = rebuild_image_library(
+        services.openai.embed_texts,
+        output_dir=args.output_dir,
+        directory=args.image_library_dir,
+        max_entries=args.max_entries,
+        logger=logger
+    )
+    logger.info(f"Image library rebuilt with {len(library)} images.")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,18 +8,29 @@ ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY')
 REPLICATE_API_TOKEN = os.getenv('REPLICATE_API_TOKEN')
 SANA_MODEL_VERSION = os.getenv(
     'SANA_MODEL_VERSION', 'c6b5d2b7459910fec94432e9e1203c3cdce92d6db20f7145747990b52fa6')
+SANA_MODEL = f"nvidia/sana:{SANA_MODEL_VERSION}"
+ELEVENLABS_MODEL_ID = os.getenv('ELEVENLABS_MODEL_ID', 'eleven_multilingual_v2')
 
-if not OPENAI_API_KEY:
-    raise ValueError(
-        "The OPENAI_API_KEY variable was not found in the .env file."
-    )
 
-if not ELEVENLABS_API_KEY:
-    raise ValueError(
-        "The ELEVENLABS_API_KEY variable was not found in the .env file."
-    )
+def require(name):
+    """
+    Returns a required setting, raising if it is missing.
 
-if not REPLICATE_API_TOKEN:
-    raise ValueError(
-        "The REPLICATE_API_TOKEN variable was not found in the .env file."
-    )
+    Credentials are only checked for the providers a run actually uses, so e.g. an OpenAI TTS
+    run does not need ELEVENLABS_API_KEY.
+
+    Args:
+        name (str): The name of the setting (e.g. "OPENAI_API_KEY").
+
+    Returns:
+        str: The value of the setting.
+
+    Raises:
+        ValueError: If the setting is not defined.
+    """
+    value = globals().get(name)
+    if not value:
+        raise ValueError(
+            f"The {name} variable was not found in the .env file."
+        )
+    return value
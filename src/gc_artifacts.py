@@ -0,0 +1,35 @@
+from moviepy.config import FFMPEG_BINARY
+from parsers.arguments import parse_gc_args
+from utils.artifact_store import collect_garbage
+from utils.logger import setup_logger
+
+
+def main():
+    """
+    Reclaims the space of the output folder.
+    - Applies a retention policy to every video folder whose final video is verified.
+    - Replaces duplicate narrations and images with copy-on-write clones of the stored copy.
+    - Deletes the stored artifacts no video uses anymore, and reports the space reclaimed.
+    """
+    logger = setup_logger()
+    args = parse_gc_args()
+
+    report = collect_garbage(
+        output_dir=args.output_dir,
+        policy=args.retention,
+        older_than_days=args.older_than_days,
+        dry_run=args.dry_run,
+        ffmpeg_binary=FFMPEG_BINARY,
+        logger=logger
+    )
+    reclaimed = report["deleted_bytes"] + report["deduplicated_bytes"] + report["store_bytes"]
+    logger.info(
+        f"{'Would reclaim' if args.dry_run else 'Reclaimed'} {reclaimed / 1e6:.1f} MB from "
+        f"{report['cleaned']} of {report['videos']} videos: "
+        f"{report['deleted_bytes'] / 1e6:.1f} MB of intermediates, "
+        f"{report['deduplicated_bytes'] / 1e6:.1f} MB of duplicates, "
+        f"{report['store_bytes'] / 1e6:.1f} MB of unused stored artifacts.")
+
+
+if __name__ == "__main__":
+    main()
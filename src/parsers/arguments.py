@@ -1,8 +1,71 @@
 import argparse
+from utils.option_defaults import DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS, DEFAULT_QUEUE_PATH, \
+    RETENTION_POLICIES, STAGES
+from utils.output_formats import DEFAULT_SIZE, parse_size
 
 
-def parse_args():
-    parser = argparse.ArgumentParser(
+def positive_int(value):
+    """
+    argparse type of the options counting things that cannot be zero, such as workers.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be 1 or greater, got {number}")
+    return number
+
+
+def output_size(value):
+    """
+    argparse type of --output_sizes: WIDTHxHEIGHT or an aspect ratio such as 16:9.
+    """
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+class RaisingArgumentParser(argparse.ArgumentParser):
+    """
+    An ArgumentParser for options that do not come from the command line (e.g. a job posted
+    to the server): errors raise ValueError instead of printing to stderr and exiting, and
+    help is not printed.
+    """
+
+    def print_help(self, file=None):
+        pass
+
+    def print_usage(self, file=None):
+        pass
+
+    def exit(self, status=0, message=None):
+        if message:
+            raise ValueError(message.strip())
+        raise ValueError("Options that exit (such as help) are not accepted.")
+
+    def error(self, message):
+        raise ValueError(message)
+
+
+def parse_args(argv=None, exit_on_error=True):
+    """
+    Parses the options of a video generation run.
+
+    Args:
+        argv (list[str], optional): The arguments to parse. Defaults to sys.argv[1:].
+        exit_on_error (bool): Print the usage and exit on invalid options, like a command.
+                              Otherwise raise ValueError.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+
+    Raises:
+        ValueError: If the options are not valid and exit_on_error is False.
+    """
+    parser_class = argparse.ArgumentParser if exit_on_error else RaisingArgumentParser
+    parser = parser_class(
         description="Generate a script and convert it to audio."
     )
     parser.add_argument("--theme", required=True,
@@ -19,17 +82,185 @@ def parse_args():
                         help="Similarity boost setting for the voice (default: 0.5).")
     parser.add_argument("--max_duration", type=float, default=None,
                         help="Maximum duration for the audio in seconds. If the generated audio exceeds this duration, it will be accelerated to match it.")
+    parser.add_argument("--compress_pauses", action="store_true",
+                        help="When the audio exceeds --max_duration, shorten the pauses between phrases first and only speed up the remaining excess.")
+    parser.add_argument("--pause_floor_ms", type=int, default=250,
+                        help="Minimum duration of a pause shortened by --compress_pauses, in milliseconds (default: 250).")
     parser.add_argument("--openai_tts_model", default="tts-1-hd",
                         help="OpenAI TTS model name (default: tts-1-hd).")
     parser.add_argument("--openai_tts_voice", default="alloy",
                         help="OpenAI TTS voice name (default: alloy).")
+    parser.add_argument("--tts_models", nargs="+", default=[],
+                        help="Other models of --tts_service that may voice the script instead of the main one (--openai_tts_model, or ELEVENLABS_MODEL_ID); each request goes to the fastest healthy model.")
+    parser.add_argument("--image_models", nargs="+", default=None,
+                        help="Replicate models taking the same inputs as nvidia/sana that may generate the images; each request goes to the fastest healthy model (default: nvidia/sana).")
+    parser.add_argument("--hedge_requests", action="store_true",
+                        help="Send a duplicate TTS or image request, to the next fastest model, when a request is slower than the p95 latency of its model.")
     parser.add_argument("--watermark", type=str, default=None,
                         help="Optional watermark text to overlay on the video.")
+    parser.add_argument("--subtitle_formats", nargs="+", choices=["srt", "vtt", "ass"], default=["srt"],
+                        help="Subtitle files to write next to the video (default: srt). The SRT file is always written.")
+    parser.add_argument("--karaoke", action="store_true",
+                        help="Highlight each word of the subtitles while it is spoken (also adds karaoke tags to ASS subtitles).")
+    parser.add_argument("--ducking", action="store_true",
+                        help="Lower the background music while the narration speaks and raise it in its pauses, instead of one gain for the whole track.")
+    parser.add_argument("--poster_cue", type=int, default=None,
+                        help="Subtitle cue (1-based) whose middle frame is saved as the poster <id>_final_poster.jpg (default: the first image).")
+    parser.add_argument("--proxy", action="store_true",
+                        help="Also write a 640-pixel-high, low-bitrate review copy <id>_final_proxy.mp4 in the same encode pass.")
+    parser.add_argument("--timing_startup", "--timing-startup", action="store_true",
+                        help="Log how long importing the CLI, provider SDKs and moviepy took.")
+    parser.add_argument("--incremental_render", action="store_true",
+                        help="Keep fingerprinted video segments in the output folder so later re-renders only re-encode what changed.")
+    parser.add_argument("--profile_render", "--profile-render", action="store_true",
+                        help="Profile the render (time per layer and frame, encoder throughput, peak memory) and save the profile in the video folder.")
+    parser.add_argument("--streaming_render", action="store_true",
+                        help="Render with flat memory use: load each image only while it is on screen and mix the audio in blocks.")
+    parser.add_argument("--retention", choices=list(RETENTION_POLICIES), default="keep",
+                        help="Once the final video is verified, delete its intermediates ('sources': mixes, partial videos and segment caches; 'final': also the narration and images) and deduplicate identical files through the artifact store (default: keep, which only deduplicates).")
+    parser.add_argument("--output_sizes", type=output_size, nargs="+", default=[DEFAULT_SIZE],
+                        help="Video sizes to render from the same images, as WIDTHxHEIGHT or 9:16, 16:9, 1:1, 4:5 (default: 1080x1920). Images are generated once at a size covering them all.")
+    parser.add_argument("--min_scene_seconds", type=float, default=3.0,
+                        help="Minimum time an image stays on screen, in seconds (default: 3).")
+    parser.add_argument("--max_scene_seconds", type=float, default=8.0,
+                        help="Maximum time an image stays on screen, unless a single subtitle is longer, in seconds (default: 8).")
+    parser.add_argument("--max_image_regenerations", type=int, default=2,
+                        help="Maximum number of extra images generated per video to replace near-duplicates of earlier images (default: 2, 0 to only log them).")
+    parser.add_argument("--image_library", choices=["reuse", "suggest"], default=None,
+                        help="Look up each image prompt in the cross-video image library: 'reuse' uses the image of a similar earlier prompt instead of generating one, 'suggest' generates anyway and records the match in <id>_images.json.")
+    parser.add_argument("--image_library_threshold", type=float, default=0.92,
+                        help="Minimum cosine similarity between prompt embeddings for a library match (default: 0.92).")
+    parser.add_argument("--image_library_dir", default="output/image_library",
+                        help="Where the image library index is stored (default: output/image_library).")
+    parser.add_argument("--stream_script", action="store_true",
+                        help="Stream the script generation and synthesize each sentence as soon as it is complete.")
+    parser.add_argument("--tts_chunked", action="store_true",
+                        help="Split the script at sentence and paragraph boundaries and synthesize the chunks concurrently.")
+    parser.add_argument("--tts_chunk_chars", type=positive_int, default=800,
+                        help="Maximum number of characters per TTS chunk in chunked mode (default: 800).")
+    parser.add_argument("--tts_workers", type=positive_int, default=4,
+                        help="Maximum number of concurrent TTS requests when synthesizing in pieces (default: 4).")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if args.tts_service == "elevenlabs" and not args.voice_id:
         parser.error(
             "--voice_id is required when --tts_service is 'elevenlabs'")
+    if args.min_scene_seconds > args.max_scene_seconds:
+        parser.error(
+            "--min_scene_seconds cannot be greater than --max_scene_seconds")
+    if args.poster_cue is not None and args.poster_cue < 1:
+        parser.error("--poster_cue must be 1 or greater")
+    if args.stream_script and args.tts_chunked:
+        parser.error("--stream_script cannot be combined with --tts_chunked")
 
     return args
+
+
+def parse_rerender_args():
+    parser = argparse.ArgumentParser(
+        description="Re-render the video of an existing output folder, re-encoding only the segments that changed."
+    )
+    parser.add_argument("--video_folder", required=True,
+                        help="The output folder of the video (e.g. output/<id>).")
+    parser.add_argument("--watermark", type=str, default=None,
+                        help="Override the watermark text used in the original render.")
+    parser.add_argument("--profile_render", "--profile-render", action="store_true",
+                        help="Profile the render and save the profile in the video folder.")
+    parser.add_argument("--streaming_render", action="store_true",
+                        help="Render with flat memory use, for long videos.")
+    parser.add_argument("--output_sizes", type=output_size, nargs="+", default=None,
+                        help="Override the video sizes of the original render (WIDTHxHEIGHT or 9:16, 16:9, 1:1, 4:5). They are cropped from the images as generated, which must be large enough.")
+
+    return parser.parse_args()
+
+
+def parse_image_library_args():
+    parser = argparse.ArgumentParser(
+        description="Rebuild the cross-video image library index from the images in the output folder."
+    )
+    parser.add_argument("--output_dir", default="output",
+                        help="The folder containing the video folders (default: output).")
+    parser.add_argument("--image_library_dir", default="output/image_library",
+                        help="Where the index is stored (default: output/image_library).")
+    parser.add_argument("--max_entries", type=int, default=5000,
+                        help="Maximum number of indexed images; the most recent are kept (default: 5000).")
+
+    return parser.parse_args()
+
+
+def parse_server_args():
+    parser = argparse.ArgumentParser(
+        description="Run a local HTTP server that queues and runs video generation jobs."
+    )
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Address to listen on (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8765,
+                        help="Port to listen on (default: 8765).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of jobs processed concurrently (default: 1).")
+    parser.add_argument("--max_finished_jobs", type=int, default=1000,
+                        help="Number of finished jobs whose status is kept; older ones are forgotten, their files stay in the output folder (default: 1000).")
+
+    return parser.parse_args()
+
+
+def parse_worker_args():
+    parser = argparse.ArgumentParser(
+        description="Run a worker that claims video jobs from a queue shared by several hosts."
+    )
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH,
+                        help=f"Path to the SQLite job queue, on storage shared by all workers (default: {DEFAULT_QUEUE_PATH}).")
+    parser.add_argument("--capabilities", nargs="+", choices=STAGES, default=list(STAGES),
+                        help="Stages this worker runs: 'generate' (script, audio, subtitles, images) and/or 'render' (default: both).")
+    parser.add_argument("--worker_id", default=None,
+                        help="Identifier of the worker in the queue (default: <hostname>-<pid>).")
+    parser.add_argument("--lease_seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help=f"Lease on a claimed stage, renewed every third of it; a stage whose lease expires is queued again (default: {DEFAULT_LEASE_SECONDS:g}).")
+    parser.add_argument("--poll_seconds", type=float, default=2.0,
+                        help="Wait between two claims when the queue is empty, in seconds (default: 2).")
+    parser.add_argument("--max_jobs", type=int, default=None,
+                        help="Stop after running this many stages.")
+    parser.add_argument("--exit_when_idle", action="store_true",
+                        help="Stop when no stage is queued instead of waiting for new jobs.")
+
+    return parser.parse_args()
+
+
+def parse_submit_args():
+    """
+    Parses the options of submit_job.py.
+
+    Returns:
+        tuple[argparse.Namespace, list[str]]: The queue options and the remaining arguments,
+                                              which are the options of the video.
+    """
+    parser = argparse.ArgumentParser(
+        description="Queue a video job for the distributed workers. Other options are those of main.py."
+    )
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH,
+                        help=f"Path to the SQLite job queue (default: {DEFAULT_QUEUE_PATH}).")
+    parser.add_argument("--priority", type=int, default=0,
+                        help="Higher priorities are claimed first (default: 0).")
+    parser.add_argument("--max_attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help=f"Times a stage is claimed before its job fails, when workers crash (default: {DEFAULT_MAX_ATTEMPTS}).")
+    parser.add_argument("--list", action="store_true",
+                        help="List the jobs of the queue instead of queueing one.")
+
+    return parser.parse_known_args()
+
+
+def parse_gc_args():
+    parser = argparse.ArgumentParser(
+        description="Apply a retention policy to the rendered videos of the output folder and delete unused artifacts."
+    )
+    parser.add_argument("--output_dir", default="output",
+                        help="The folder containing the video folders (default: output).")
+    parser.add_argument("--retention", choices=list(RETENTION_POLICIES), default="sources",
+                        help="What to delete from the folders whose final video is verified: 'keep' only deduplicates, 'sources' deletes intermediates and caches, 'final' also the narration and images (default: sources).")
+    parser.add_argument("--older_than_days", type=float, default=0.0,
+                        help="Only clean videos rendered at least this many days ago (default: 0).")
+    parser.add_argument("--dry_run", action="store_true",
+                        help="Report the space that would be reclaimed without deleting or linking anything.")
+
+    return parser.parse_args()
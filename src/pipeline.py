@@ -0,0 +1,650 @@
+import os
+import json
+import uuid
+import logging
+from utils.file_handler import save_audio, save_subtitles, save_image, save_manifest, load_manifest, \
+    save_word_timings, load_word_timings
+from utils.speech_synthesis import stream_script_to_speech, synthesize_chunks
+from utils.subtitle_handler import align_words_with_punctuation, format_srt_from_aligned_words, format_subtitles, \
+    group_words_by_cue, parse_srt
+from utils.text_segmentation import split_text_into_chunks
+from utils.output_formats import crop_box, fit_image, format_size, master_size, parse_size, safe_area
+from utils.scene_planner import plan_scenes
+from utils.startup_timer import timed_import
+from utils.logger import JobFilter, JobLogger
+from config import settings
+
+
+# Added to the image prompts when the images are cropped to several aspect ratios
+SAFE_AREA_PROMPT = "Keep the main subject near the center of the frame."
+
+
+class PipelineError(Exception):
+    """
+    Raised when a stage of the video generation pipeline fails. The cause has already been logged.
+    """
+
+
+class StageStopped(Exception):
+    """
+    Raised by a checkpoint to stop a stage whose result would be discarded, e.g. when its worker
+    lost the lease.
+    """
+
+
+def _fail(logger, message):
+    logger.error(message)
+    raise PipelineError(message)
+
+
+def format_voice_instructions(voice_instructions_obj):
+    """
+    Formats the voice instructions returned by the language model for the OpenAI TTS API.
+
+    Args:
+        voice_instructions_obj (dict): The voice instructions object.
+
+    Returns:
+        str: The instructions as a single string.
+    """
+    return (
+        f"Accent/Affect: {voice_instructions_obj.get('accent_affect')}; "
+        f"Tone: {voice_instructions_obj.get('tone')}; "
+        f"Pacing: {voice_instructions_obj.get('pacing')}; "
+        f"Emotion: {voice_instructions_obj.get('emotion')}; "
+        f"Pronunciation: {voice_instructions_obj.get('pronunciation')}; "
+        f"Personality Affect: {voice_instructions_obj.get('personality_affect')}"
+    )
+
+
+def attach_log_file(logger, video_folder, mode='w'):
+    """
+    Adds a file handler to the logger to save logs in the video folder. For a JobLogger, the
+    handler only logs the records of its job.
+
+    Args:
+        logger: Logger instance for logging, or a JobLogger.
+        video_folder (str): The directory of the video.
+        mode (str): File mode of the log file ('w' to start a new log, 'a' to append).
+
+    Returns:
+        logging.FileHandler: The handler, to be removed with detach_log_file.
+    """
+    file_handler = logging.FileHandler(
+        f"{video_folder}/process.log", mode=mode, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    if isinstance(logger, JobLogger):
+        file_handler.addFilter(JobFilter(logger.extra["job_id"]))
+        logger = logger.logger
+    logger.addHandler(file_handler)
+    return file_handler
+
+
+def detach_log_file(logger, file_handler):
+    """
+    Removes and closes a file handler added with attach_log_file.
+    """
+    if isinstance(logger, JobLogger):
+        logger = logger.logger
+    logger.removeHandler(file_handler)
+    file_handler.close()
+
+
+def run_pipeline(args, services, logger, file_id=None, incremental=None):
+    """
+    Runs the whole generation pipeline for one video.
+    - Generates a script using OpenAI API.
+    - Converts the script to speech using Eleven Labs or OpenAI TTS API.
+    - Processes the audio if max_duration is specified.
+    - Generates subtitles from the audio using OpenAI's Whisper API.
+    - Generates images based on subtitle intervals using the Replicate API.
+    - Assembles the final video using the generated audio, images, subtitles, and animated transitions.
+    - Verifies the final video and applies the retention policy to the intermediates.
+    All outputs (audio, subtitles, images, and log file) are saved in a dedicated folder for each video.
+
+    Args:
+        args (argparse.Namespace): The options returned by parse_args.
+        services (ServiceRegistry): The registry providing the API clients.
+        logger: Logger instance for logging.
+        file_id (str, optional): Identifier of the video. A new UUID is used if not provided.
+        incremental (bool, optional): Overrides args.incremental_render.
+
+    Returns:
+        str: The path to the final video file.
+
+    Raises:
+        PipelineError: If any stage fails.
+    """
+    # Generate a unique file_id for this video and create a dedicated output folder
+    file_id = file_id or str(uuid.uuid4())
+    video_folder = f"output/{file_id}"
+    if not os.path.exists(video_folder):
+        os.makedirs(video_folder)
+
+    file_handler = attach_log_file(logger, video_folder)
+    try:
+        generate_assets(args, services, logger, file_id, video_folder)
+        if incremental is None:
+            incremental = args.incremental_render
+        final_video_path = render_video(video_folder, file_id, logger, incremental=incremental,
+                                        profile=args.profile_render, streaming=args.streaming_render)
+        clean_video_folder(video_folder, file_id, args.retention, logger)
+        return final_video_path
+    finally:
+        detach_log_file(logger, file_handler)
+
+
+def generate_assets(args, services, logger, file_id, video_folder, checkpoint=None):
+    """
+    Generates every asset of a video (narration, subtitles, images and music choice) and saves
+    the render settings next to them, so the video can be rendered later by render_video.
+
+    Args:
+        args (argparse.Namespace): The options returned by parse_args.
+        services (ServiceRegistry): The registry providing the API clients.
+        logger: Logger instance for logging.
+        file_id (str): Identifier of the video.
+        video_folder (str): The directory where the assets are saved.
+        checkpoint (callable, optional): Called between the stages and before each image; it
+                                         raises StageStopped to stop the generation.
+
+    Raises:
+        PipelineError: If any stage fails.
+        StageStopped: If the checkpoint stops the generation.
+    """
+    checkpoint = checkpoint or (lambda: None)
+    with timed_import("utils.audio_processing (pydub, numpy)"):
+        from utils.audio_processing import concatenate_audio_chunks, remap_time, reprocess_audio
+    openai_service = services.openai
+    # TTS and image requests go to the fastest healthy model of their equivalence set. The TTS
+    # model is chosen once per video, so every chunk of the narration has the same voice
+    if args.tts_service == "elevenlabs":
+        tts_router = services.router(
+            "elevenlabs", [settings.ELEVENLABS_MODEL_ID] + args.tts_models, hedge=args.hedge_requests)
+    else:
+        tts_router = services.router(
+            "openai_tts", [args.openai_tts_model] + args.tts_models, hedge=args.hedge_requests)
+    tts_router = tts_router.pin()
+    logger.debug(f"Narrating with the TTS model {tts_router.backend}.")
+    image_router = services.router(
+        "replicate", args.image_models or [settings.SANA_MODEL], hedge=args.hedge_requests)
+
+    if args.stream_script:
+        # Stream the script and synthesize each sentence as soon as it is complete
+        logger.info("Streaming script generation with OpenAI into TTS...")
+        try:
+            if args.tts_service == "elevenlabs":
+                events = openai_service.stream_script(
+                    theme=args.theme, language=args.language
+                )
+
+                def synthesize(sentence, voice_instructions):
+                    return tts_router.call(lambda model: services.elevenlabs.text_to_speech(
+                        voice_id=args.voice_id,
+                        text=sentence,
+                        stability=args.stability,
+                        similarity_boost=args.similarity_boost,
+                        model_id=model
+                    ))
+            else:
+                tts_service = services.openai_tts
+                events = openai_service.stream_script_and_voice_instructions(
+                    theme=args.theme, language=args.language
+                )
+
+                def synthesize(sentence, voice_instructions):
+                    return tts_router.call(lambda model: tts_service.text_to_speech(
+                        text=sentence,
+                        model=model,
+                        voice=args.openai_tts_voice,
+                        instructions=format_voice_instructions(
+                            voice_instructions)
+                    ))
+
+            script_text, voice_instructions_obj, audio_chunks = stream_script_to_speech(
+                events,
+                synthesize,
+                wait_for_instructions=args.tts_service == "openai",
+                max_workers=args.tts_workers,
+                logger=logger
+            )
+            logger.debug(f"Generated script: {script_text}")
+            if voice_instructions_obj:
+                logger.debug(
+                    f"Generated voice instructions: {format_voice_instructions(voice_instructions_obj)}")
+            logger.info(
+                f"Concatenating {len(audio_chunks)} streamed audio chunks...")
+            response = concatenate_audio_chunks(audio_chunks)
+        except Exception as e:
+            _fail(logger, f"Error generating streamed script and audio: {e}")
+    else:
+        # Generate script (and voice instructions if using OpenAI TTS)
+        if args.tts_service == "elevenlabs":
+            logger.info("Generating script with OpenAI...")
+            try:
+                script_text = openai_service.generate_script(
+                    theme=args.theme, language=args.language
+                )
+                logger.debug(f"Generated script: {script_text}")
+            except Exception as e:
+                _fail(logger, f"Error generating script: {e}")
+        else:
+            logger.info(
+                "Generating script and voice instructions with OpenAI TTS...")
+            try:
+                result = openai_service.generate_script_and_voice_instructions(
+                    theme=args.theme, language=args.language
+                )
+                script_text = result.get("script")
+                voice_instructions_obj = result.get("voice_instructions")
+                instructions_str = format_voice_instructions(
+                    voice_instructions_obj)
+                logger.debug(f"Generated script: {script_text}")
+                logger.debug(
+                    f"Generated voice instructions: {instructions_str}")
+            except Exception as e:
+                _fail(logger, f"Error generating script and voice instructions: {e}")
+
+        # Choose TTS service and convert script to audio
+        try:
+            if args.tts_chunked:
+                chunks = split_text_into_chunks(
+                    script_text, max_chars=args.tts_chunk_chars)
+                if args.tts_service == "elevenlabs":
+                    logger.info(
+                        f"Converting text to speech in {len(chunks)} chunks with Eleven Labs...")
+
+                    def synthesize(text, previous_text, next_text):
+                        return tts_router.call(lambda model: services.elevenlabs.text_to_speech(
+                            voice_id=args.voice_id,
+                            text=text,
+                            stability=args.stability,
+                            similarity_boost=args.similarity_boost,
+                            previous_text=previous_text,
+                            next_text=next_text,
+                            model_id=model
+                        ))
+                else:
+                    logger.info(
+                        f"Converting text to speech in {len(chunks)} chunks with OpenAI TTS...")
+                    tts_service = services.openai_tts
+
+                    def synthesize(text, previous_text, next_text):
+                        return tts_router.call(lambda model: tts_service.text_to_speech(
+                            text=text,
+                            model=model,
+                            voice=args.openai_tts_voice,
+                            instructions=instructions_str
+                        ))
+
+                audio_chunks = synthesize_chunks(
+                    chunks, synthesize, max_workers=args.tts_workers, logger=logger)
+                response = concatenate_audio_chunks(audio_chunks)
+            elif args.tts_service == "elevenlabs":
+                logger.info("Converting text to speech with Eleven Labs...")
+                response = tts_router.call(lambda model: services.elevenlabs.text_to_speech(
+                    voice_id=args.voice_id,
+                    text=script_text,
+                    stability=args.stability,
+                    similarity_boost=args.similarity_boost,
+                    model_id=model
+                ))
+            else:
+                logger.info("Converting text to speech with OpenAI TTS...")
+                tts_service = services.openai_tts
+                response = tts_router.call(lambda model: tts_service.text_to_speech(
+                    text=script_text,
+                    model=model,
+                    voice=args.openai_tts_voice,
+                    instructions=instructions_str
+                ))
+        except Exception as e:
+            _fail(logger, f"Error generating audio: {e}")
+
+    checkpoint()
+    try:
+        output_file = save_audio(
+            response, directory=video_folder, file_id=file_id)
+        logger.info(
+            f"Audio successfully generated and saved as {output_file}.")
+        logger.debug(f"TTS provider statistics:\n{tts_router.summary()}")
+    except Exception as e:
+        _fail(logger, f"Error generating audio: {e}")
+
+    # Process audio if max_duration is provided
+    # With --compress_pauses, the original narration is transcribed and the word timings are
+    # mapped onto the processed audio, which is exact unlike transcribing sped-up speech
+    time_map = None
+    transcription_file = output_file
+    if args.max_duration:
+        logger.info(
+            f"Processing audio to ensure it does not exceed {args.max_duration} seconds...")
+        try:
+            with open(output_file, 'rb') as f:
+                audio_bytes = f.read()
+
+            processed_bytes, time_map = reprocess_audio(
+                audio_data=audio_bytes,
+                max_duration=args.max_duration,
+                compress_pauses=args.compress_pauses,
+                pause_floor_ms=args.pause_floor_ms,
+                return_time_map=True,
+                logger=logger
+            )
+
+            if processed_bytes != audio_bytes:
+                if args.compress_pauses:
+                    transcription_file = os.path.join(
+                        video_folder, f"{file_id}_original_audio.mp3")
+                    with open(transcription_file, 'wb') as f:
+                        f.write(audio_bytes)
+                with open(output_file, 'wb') as f:
+                    f.write(processed_bytes)
+                logger.info(
+                    f"Audio processed successfully and saved as {output_file}.")
+                logger.debug(
+                    f"Original audio file {output_file} overwritten after processing.")
+            else:
+                logger.info(
+                    "Audio duration is within the maximum duration. No processing needed.")
+
+        except Exception as e:
+            _fail(logger, f"Error processing audio: {e}")
+
+    checkpoint()
+    # Generate subtitles from audio
+    logger.info("Generating subtitles with Whisper...")
+    try:
+        transcript = services.whisper.transcribe_audio(
+            audio_file_path=transcription_file)
+        if transcription_file != output_file:
+            os.remove(transcription_file)
+            for word in transcript.words:
+                word.start = round(remap_time(time_map, word.start), 3)
+                word.end = round(remap_time(time_map, word.end), 3)
+            logger.info("Word timings mapped from the original narration to the processed audio.")
+
+        logger.info("Timing data of all words returned by Whisper:")
+        for word in transcript.words:
+            logger.info("Word: '%s', start: %s, end: %s",
+                        word.word, word.start, word.end)
+
+        aligned_words = align_words_with_punctuation(
+            transcript.words, transcript.text)
+        srt_content, cues = format_srt_from_aligned_words(aligned_words)
+        subtitle_file = save_subtitles(
+            srt_content, directory=video_folder, file_id=file_id)
+        logger.info(f"Subtitles generated and saved as {subtitle_file}.")
+        # Word timings drive the karaoke highlighting, also when re-rendering later
+        words_file = save_word_timings(
+            aligned_words, directory=video_folder, file_id=file_id)
+        logger.debug(f"Word timings saved as {words_file}.")
+        cue_words = group_words_by_cue(
+            cues, aligned_words) if args.karaoke else None
+        # The SRT file is always written because the renderer reads it
+        for subtitle_format in args.subtitle_formats:
+            if subtitle_format == "srt":
+                continue
+            subtitle_file = save_subtitles(
+                format_subtitles(cues, subtitle_format, cue_words=cue_words),
+                directory=video_folder, file_id=file_id, extension=subtitle_format)
+            logger.info(
+                f"{subtitle_format.upper()} subtitles saved as {subtitle_file}.")
+    except Exception as e:
+        _fail(logger, f"Error generating subtitles: {e}")
+
+    checkpoint()
+    # Plan the scenes: groups of cues sharing an image, sized by duration and topic
+    scenes = plan_scenes(cues, min_seconds=args.min_scene_seconds,
+                         max_seconds=args.max_scene_seconds)
+    scenes_file = save_manifest(scenes, directory=video_folder, name=f"{file_id}_scenes.json")
+    logger.info(f"Planned {len(scenes)} scenes for {len(cues)} subtitle cues, saved as {scenes_file}.")
+
+    # Generate one image per scene, once at a master size covering every output size
+    logger.info(
+        "Generating images for the scenes using Replicate...")
+    output_sizes = [tuple(size) for size in args.output_sizes]
+    image_width, image_height = master_size(output_sizes)
+    cropped = len(output_sizes) > 1 or output_sizes[0] != (image_width, image_height)
+    with timed_import("utils.image_similarity (PIL, numpy)"):
+        from utils.image_library import get_image_library
+        from utils.image_similarity import find_near_duplicate, fingerprint_image
+    try:
+        replicate_service = services.replicate
+        # Initialize list to store prompts generated for images in this video
+        previous_image_prompts = []
+        # Fingerprints of the saved images, to catch near-duplicates as they arrive
+        fingerprints = []
+        regenerations_left = args.max_image_regenerations
+        regenerated = []
+        # Images of earlier videos with similar prompts can be reused or suggested
+        library = get_image_library(args.image_library_dir) if args.image_library else None
+        library_hits = 0
+        library_lookups = 0
+        suggestions = []
+        for image_number, scene in enumerate(scenes, start=1):
+            checkpoint()
+            group_text = scene["text"]
+            rejected_prompts = []
+            while True:
+                # Generate the image prompt using the language model with the required context and instructions
+                image_prompt = openai_service.generate_image_prompt(
+                    full_subtitles=srt_content,
+                    previous_prompts=previous_image_prompts + rejected_prompts,
+                    group_text=group_text
+                )
+                # Log the generated image prompt
+                logger.info(f"Image prompt for cue {image_number}: {image_prompt}")
+                match = None
+                if library is not None:
+                    embedding = openai_service.embed_texts([image_prompt])[0]
+                    match = library.lookup(embedding, (image_width, image_height),
+                                           threshold=args.image_library_threshold)
+                    library_lookups += 1
+                    library_hits += match is not None
+                reused = match is not None and args.image_library == "reuse"
+                if reused:
+                    entry, similarity = match
+                    with open(entry["image"], "rb") as f:
+                        image_data = f.read()
+                    logger.info(
+                        f"Reusing library image {entry['image']} for cue {image_number} "
+                        f"(prompt similarity {similarity:.3f}).")
+                else:
+                    if match:
+                        entry, similarity = match
+                        suggestions.append({"image": image_number, "library_image": entry["image"],
+                                            "similarity": round(similarity, 4)})
+                        logger.info(
+                            f"Library image {entry['image']} could replace image {image_number} "
+                            f"(prompt similarity {similarity:.3f}).")
+                    prompt = f"{image_prompt} {SAFE_AREA_PROMPT}" if cropped else image_prompt
+                    image_data = image_router.call(lambda model: replicate_service.generate_image(
+                        prompt, width=image_width, height=image_height, model=model))
+                fingerprint = fingerprint_image(image_data)
+                duplicate = find_near_duplicate(fingerprint, fingerprints)
+                if duplicate is None:
+                    break
+                if regenerations_left <= 0:
+                    logger.warning(
+                        f"Image {image_number} is a near-duplicate of image {duplicate + 1}, "
+                        f"but the regeneration budget is spent. Keeping it.")
+                    break
+                regenerations_left -= 1
+                regenerated.append(image_number)
+                rejected_prompts.append(image_prompt)
+                logger.warning(
+                    f"Image {image_number} is a near-duplicate of image {duplicate + 1} "
+                    f"(hash distance {fingerprint.distance(fingerprints[duplicate])}). Regenerating it "
+                    f"({regenerations_left} regenerations left).")
+            previous_image_prompts.append(image_prompt)
+            fingerprints.append(fingerprint)
+            # Models may round the requested size; the render expects every image at the master size
+            image_data = fit_image(image_data, (image_width, image_height))
+            image_file = save_image(
+                image_data,
+                directory=video_folder,
+                file_id=file_id,
+                suffix=f"img_{image_number}"
+            )
+            logger.info(
+                f"Image {'reused' if reused else 'generated'} and saved as {image_file}.")
+            if library is not None and not reused:
+                library.add(image_prompt, embedding, image_file, (image_width, image_height))
+        if library is not None:
+            library.save()
+            logger.info(
+                f"Image library: {library_hits} of {library_lookups} prompts matched "
+                f"({library_hits / library_lookups if library_lookups else 0:.0%} hit rate), "
+                f"{len(library)} images indexed.")
+        logger.debug(f"Image provider statistics:\n{image_router.summary()}")
+        # Where each output size is cropped from the images, and the area all of them show
+        image_size = (image_width, image_height)
+        save_manifest({
+            "master_size": list(image_size),
+            "safe_area": list(safe_area(image_size, output_sizes)),
+            "crops": {format_size(size): list(crop_box(image_size, size)) for size in output_sizes},
+            "prompts": previous_image_prompts,
+            "regenerated": regenerated,
+            "library_suggestions": suggestions
+        }, directory=video_folder, name=f"{file_id}_images.json")
+    except StageStopped:
+        raise
+    except Exception as e:
+        _fail(logger, f"Error generating images: {e}")
+
+    checkpoint()
+    # Select background music based on script, image prompts, and available songs
+    logger.info("Selecting background music using OpenAI...")
+    try:
+        # Load songs data from songs/songs.json
+        with open("songs/songs.json", "r", encoding="utf-8") as f:
+            songs_data = json.load(f)
+        # Convert songs_data to formatted JSON string
+        songs_json = json.dumps(songs_data, ensure_ascii=False, indent=2)
+        # Generate music choice using the language model
+        music_choice_response = openai_service.generate_music_choice(
+            script=script_text,
+            image_prompts=previous_image_prompts,
+            songs_json=songs_json
+        )
+        # Parse the response JSON
+        music_choice = music_choice_response.dict()
+        logger.info(f"Background music selected: {music_choice}")
+        # Find the chosen song in songs_data
+        chosen_song = next(
+            (song for song in songs_data if song["id"] == music_choice["id"]), None)
+        if not chosen_song:
+            raise ValueError("Invalid song ID returned by music selection.")
+        # Construct the path to the music file in songs/mp3 folder
+        background_music_path = os.path.join(
+            "songs", "mp3", chosen_song["file"])
+    except Exception as e:
+        _fail(logger, f"Error selecting background music: {e}")
+
+    checkpoint()
+    # Keep the render settings so the video can be (re-)rendered from its folder
+    save_manifest({
+        "background_music_path": background_music_path,
+        "max_duration": args.max_duration,
+        "watermark": args.watermark,
+        "karaoke": args.karaoke,
+        "ducking": args.ducking,
+        "poster_cue": args.poster_cue,
+        "proxy": args.proxy,
+        "output_sizes": [format_size(size) for size in output_sizes]
+    }, directory=video_folder)
+
+
+def render_video(video_folder, file_id, logger, incremental=False, watermark=None, profile=False,
+                 streaming=False, output_sizes=None):
+    """
+    Assembles the final video from the assets and render settings saved in a video folder.
+
+    Args:
+        video_folder (str): The directory of the video.
+        file_id (str): Identifier of the video.
+        logger: Logger instance for logging.
+        incremental (bool): Only re-encode the segments whose inputs changed.
+        watermark (str, optional): Overrides the watermark saved with the render settings.
+        profile (bool): Write a profile of the render to the video folder.
+        streaming (bool): Render with bounded memory (see assemble_video).
+        output_sizes (list[tuple[int, int]], optional): Overrides the video sizes saved with the
+                                                        render settings.
+
+    Returns:
+        str: The path to the final video file.
+
+    Raises:
+        PipelineError: If the assets cannot be loaded or the render fails.
+    """
+    try:
+        render_settings = load_manifest(video_folder)
+        with open(f"{video_folder}/{file_id}.srt", "r", encoding="utf-8") as f:
+            cues = parse_srt(f.read())
+        # Videos generated before scene planning have one image per two cues
+        scenes = load_manifest(video_folder, name=f"{file_id}_scenes.json") or None
+        cue_words = None
+        if render_settings.get("karaoke"):
+            words = load_word_timings(video_folder, file_id)
+            if words is None:
+                logger.warning(
+                    "Word timings not found. Rendering subtitles without karaoke highlighting.")
+            else:
+                cue_words = group_words_by_cue(cues, words)
+        if output_sizes is None:
+            output_sizes = [parse_size(size)
+                            for size in render_settings.get("output_sizes", [])] or None
+    except Exception as e:
+        _fail(logger, f"Error loading video assets: {e}")
+
+    # Assemble the final video using audio, images, subtitles, and transitions
+    logger.info(
+        "Assembling final video with audio, images, subtitles, and transitions...")
+    try:
+        with timed_import("services.video_editor (moviepy)"):
+            from services.video_editor import assemble_video
+        final_video_path = assemble_video(
+            video_folder=video_folder,
+            file_id=file_id,
+            cues=cues,
+            background_music_path=render_settings.get(
+                "background_music_path"),
+            max_duration=render_settings.get("max_duration"),
+            watermark=watermark or render_settings.get("watermark"),
+            incremental=incremental,
+            cue_words=cue_words,
+            profile=profile,
+            streaming=streaming,
+            output_sizes=output_sizes,
+            scenes=scenes,
+            ducking=render_settings.get("ducking", False),
+            poster_cue=render_settings.get("poster_cue"),
+            proxy=render_settings.get("proxy", False),
+            logger=logger
+        )
+        logger.info(f"Final video assembled and saved as {final_video_path}.")
+    except Exception as e:
+        _fail(logger, f"Error assembling final video: {e}")
+
+    return final_video_path
+
+
+def clean_video_folder(video_folder, file_id, retention, logger):
+    """
+    Applies a retention policy to a rendered video folder (see apply_retention). Errors are only
+    logged, as the video is already saved.
+
+    Args:
+        video_folder (str): The directory of the video.
+        file_id (str): Identifier of the video.
+        retention (str): A key of RETENTION_POLICIES.
+        logger: Logger instance for logging.
+    """
+    from moviepy.config import FFMPEG_BINARY
+    from utils.artifact_store import apply_retention
+    try:
+        apply_retention(video_folder, file_id, retention, ffmpeg_binary=FFMPEG_BINARY, logger=logger)
+    except Exception as e:
+        logger.warning(f"Error applying the '{retention}' retention policy to {video_folder}: {e}")
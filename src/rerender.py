@@ -0,0 +1,32 @@
+import sys
+import os
+from parsers.arguments import parse_rerender_args
+from pipeline import PipelineError, attach_log_file, render_video
+from utils.logger import setup_logger
+
+
+def main():
+    """
+    Re-renders the final video of an existing output folder.
+    - Reads the (possibly edited) subtitles and the render settings saved with the video.
+    - Re-encodes only the segments whose images, subtitles, font or effects changed and
+      stitches them with the unchanged segments kept from the previous render.
+    """
+    logger = setup_logger()
+    args = parse_rerender_args()
+
+    video_folder = os.path.normpath(args.video_folder)
+    file_id = os.path.basename(video_folder)
+    attach_log_file(logger, video_folder, mode='a')
+
+    logger.info(f"Re-rendering video in {video_folder}...")
+    try:
+        render_video(video_folder, file_id, logger,
+                     incremental=True, watermark=args.watermark, profile=args.profile_render,
+                     streaming=args.streaming_render, output_sizes=args.output_sizes)
+    except PipelineError:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
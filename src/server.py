@@ -0,0 +1,253 @@
+import collections
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+from parsers.arguments import parse_args, parse_server_args
+from pipeline import PipelineError, run_pipeline
+from services.registry import ServiceRegistry, required_services
+from utils.logger import JobLogger, setup_logger
+
+
+def job_fields_to_argv(fields):
+    """
+    Converts the JSON fields of a job into command-line arguments for parse_args.
+
+    Args:
+        fields (dict): Job fields named like the command-line options (e.g. {"theme": "..."}).
+
+    Returns:
+        list[str]: The equivalent command-line arguments.
+    """
+    argv = []
+    for name, value in fields.items():
+        option = f"--{name}"
+        if value is None or value is False:
+            continue
+        if value is True:
+            argv.append(option)
+        elif isinstance(value, (list, tuple)):
+            argv.append(option)
+            argv.extend(str(v) for v in value)
+        else:
+            argv.extend([option, str(value)])
+    return argv
+
+
+class JobManager:
+    """
+    Queues video generation jobs by priority and runs them on a pool of worker threads that
+    share one ServiceRegistry, so API clients and render caches stay warm between jobs.
+    Only the last max_finished_jobs finished jobs are kept in memory; their files stay in the
+    output folder.
+    """
+
+    def __init__(self, workers=1, max_finished_jobs=1000, logger=None):
+        self.services = ServiceRegistry()
+        self.logger = logger or logging.getLogger("rapidclip_generator")
+        self.jobs = {}
+        self.max_finished_jobs = max_finished_jobs
+        self._finished = collections.deque()
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"job-worker-{i + 1}",
+                             daemon=True).start()
+
+    def submit(self, fields):
+        """
+        Validates and queues a job.
+
+        Args:
+            fields (dict): Job fields; the same options as the command line plus an optional
+                           integer "priority" (higher runs first, default 0).
+
+        Returns:
+            dict: The queued job.
+
+        Raises:
+            ValueError: If the fields are not valid options.
+        """
+        fields = dict(fields)
+        priority = fields.pop("priority", 0)
+        if isinstance(priority, bool) or not isinstance(priority, int):
+            raise ValueError("priority must be an integer.")
+        args = parse_args(job_fields_to_argv(fields), exit_on_error=False)
+        self.services.validate(required_services(args))
+
+        job_id = str(uuid.uuid4())
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "priority": priority,
+            "fields": fields,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "video_folder": f"output/{job_id}",
+            "final_video": None,
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+        self._queue.put((-priority, next(self._counter), job_id, args))
+        self.logger.info(f"Queued job {job_id} with priority {priority}.")
+        return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self):
+        with self._lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def artifacts(self, job_id):
+        """
+        Lists the files produced so far by a job.
+        """
+        job = self.get(job_id)
+        if not job or not os.path.isdir(job["video_folder"]):
+            return []
+        return [
+            {"name": name, "size": os.path.getsize(
+                os.path.join(job["video_folder"], name))}
+            for name in sorted(os.listdir(job["video_folder"]))
+            if os.path.isfile(os.path.join(job["video_folder"], name))
+        ]
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            self.jobs[job_id].update(changes)
+
+    def _finish(self, job_id, **changes):
+        """
+        Records the end of a job and forgets the oldest finished jobs beyond max_finished_jobs.
+        """
+        with self._lock:
+            self.jobs[job_id].update(changes, finished_at=time.time())
+            self._finished.append(job_id)
+            while len(self._finished) > self.max_finished_jobs:
+                del self.jobs[self._finished.popleft()]
+
+    def _work(self):
+        while True:
+            _, _, job_id, args = self._queue.get()
+            self._update(job_id, status="running", started_at=time.time())
+            # Tagging the records with the job keeps each process.log limited to its own job
+            job_logger = JobLogger(job_id)
+            try:
+                final_video = run_pipeline(
+                    args, self.services, job_logger, file_id=job_id)
+                self._finish(job_id, status="succeeded", final_video=final_video)
+            except Exception as e:
+                if not isinstance(e, PipelineError):
+                    job_logger.exception(f"Unexpected error in job {job_id}")
+                self._finish(job_id, status="failed", error=str(e))
+            finally:
+                self._queue.task_done()
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP API of the job server:
+    - POST /jobs: queue a job (JSON body with the command-line options and "priority").
+    - GET /jobs: list all jobs.
+    - GET /jobs/<id>: status of a job.
+    - GET /jobs/<id>/artifacts: files produced by a job.
+    - GET /jobs/<id>/artifacts/<name>: download a file produced by a job.
+    - GET /health: liveness check.
+    """
+
+    manager = None
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                self.wfile.write(block)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send_json(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            fields = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(fields, dict):
+                raise ValueError("The job must be a JSON object.")
+            job = self.manager.submit(fields)
+        except (ValueError, json.JSONDecodeError) as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(202, job)
+
+    def do_GET(self):
+        parts = [unquote(p) for p in self.path.split("?")[0].split("/") if p]
+        if parts == ["health"]:
+            return self._send_json(200, {"status": "ok"})
+        if parts == ["jobs"]:
+            return self._send_json(200, self.manager.list())
+        if len(parts) < 2 or parts[0] != "jobs":
+            return self._send_json(404, {"error": "Not found"})
+
+        job = self.manager.get(parts[1])
+        if not job:
+            return self._send_json(404, {"error": "Job not found"})
+        if len(parts) == 2:
+            return self._send_json(200, job)
+        if parts[2:] == ["artifacts"]:
+            return self._send_json(200, self.manager.artifacts(job["id"]))
+        if len(parts) == 4 and parts[2] == "artifacts":
+            name = os.path.basename(parts[3])
+            path = os.path.join(job["video_folder"], name)
+            if name and os.path.isfile(path):
+                return self._send_file(path)
+        self._send_json(404, {"error": "Not found"})
+
+    def log_message(self, format, *args):
+        self.manager.logger.debug("HTTP %s - %s", self.address_string(), format % args)
+
+
+def main():
+    """
+    Runs the generator as a long-running local job server.
+    - Keeps API clients, render caches and worker threads resident between jobs.
+    - Accepts jobs over HTTP with the same fields as the command line, queued by priority.
+    - Exposes the status and the output files of every job.
+    """
+    logger = setup_logger()
+    args = parse_server_args()
+
+    JobRequestHandler.manager = JobManager(workers=args.workers,
+                                           max_finished_jobs=args.max_finished_jobs, logger=logger)
+    server = ThreadingHTTPServer((args.host, args.port), JobRequestHandler)
+    logger.info(
+        f"Job server listening on http://{args.host}:{args.port} with {args.workers} worker(s).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down job server...")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
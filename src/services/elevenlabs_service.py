@@ -1,5 +1,6 @@
 from elevenlabs import ElevenLabs, VoiceSettings
 from io import BytesIO
+from config import settings
 
 
 class ElevenLabsService:
@@ -16,7 +17,8 @@ class ElevenLabsService:
         """
         self.client = ElevenLabs(api_key=api_key)
 
-    def text_to_speech(self, voice_id, text, stability=0.75, similarity_boost=0.85):
+    def text_to_speech(self, voice_id, text, stability=0.75, similarity_boost=0.85,
+                       previous_text=None, next_text=None, model_id=None):
         """
         Convert text to speech using the specified voice and settings.
 
@@ -25,20 +27,33 @@ class ElevenLabsService:
             text (str): The text to convert.
             stability (float): Stability of the generated voice.
             similarity_boost (float): How much the voice matches the provided style.
+            previous_text (str, optional): Text spoken right before `text`, used by Eleven Labs
+                                           to keep the prosody continuous across requests.
+            next_text (str, optional): Text spoken right after `text`.
+            model_id (str, optional): The Eleven Labs model (default: ELEVENLABS_MODEL_ID,
+                                      eleven_multilingual_v2).
 
         Returns:
             bytes: The raw audio data in MP3 format.
         """
+        # Request stitching context is only sent when synthesizing a script in pieces
+        context = {}
+        if previous_text:
+            context["previous_text"] = previous_text
+        if next_text:
+            context["next_text"] = next_text
+
         # Get the raw response from Eleven Labs as a stream of bytes
         response = self.client.text_to_speech.convert(
             voice_id=voice_id,
             output_format="mp3_44100_128",
             text=text,
-            model_id="eleven_multilingual_v2",
+            model_id=model_id or settings.ELEVENLABS_MODEL_ID,
             voice_settings=VoiceSettings(
                 stability=stability,
                 similarity_boost=similarity_boost
-            )
+            ),
+            **context
         )
 
         # Combine the streamed chunks into a single BytesIO object
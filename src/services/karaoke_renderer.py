@@ -0,0 +1,182 @@
+from moviepy import VideoClip
+from PIL import Image, ImageDraw, ImageFont
+from collections import OrderedDict
+from functools import lru_cache
+import bisect
+import numpy as np
+from utils.subtitle_handler import word_separator
+
+
+@lru_cache(maxsize=8)
+def _load_font(font_path, font_size):
+    return ImageFont.truetype(font_path, font_size)
+
+
+@lru_cache(maxsize=4096)
+def _text_width(font_path, font_size, text):
+    """
+    Advance width of a piece of text, cached so repeated words are measured once.
+    """
+    return _load_font(font_path, font_size).getlength(text)
+
+
+class CueLayout:
+    """
+    A subtitle cue laid out once: the cue drawn in the base color and in the highlight color,
+    its opacity mask, and the bounding box of every word.
+    """
+
+    def __init__(self, texts, font_path, font_size, color, highlight_color, stroke_color,
+                 stroke_width, max_width, line_spacing=8):
+        """
+        Lays out the words of a cue, wrapping lines at max_width and centering each line.
+
+        Args:
+            texts (list[str]): The words of the cue, in order.
+            font_path (str): Path to the TrueType font.
+            font_size (int): Font size in pixels.
+            color (str): Color of the words that are not being spoken.
+            highlight_color (str): Color of the word being spoken.
+            stroke_color (str): Color of the text outline.
+            stroke_width (int): Width of the text outline in pixels.
+            max_width (int): Width of the subtitle box in pixels.
+            line_spacing (int): Extra space between lines in pixels.
+        """
+        font = _load_font(font_path, font_size)
+        ascent, descent = font.getmetrics()
+        line_height = ascent + descent + line_spacing
+        usable_width = max_width - 2 * stroke_width
+
+        # Greedy line wrapping: (word index, x offset in the line) per line
+        lines = [[]]
+        line_widths = [0.0]
+        for i, text in enumerate(texts):
+            width = _text_width(font_path, font_size, text)
+            separator = word_separator(texts[i - 1], text) if lines[-1] else ""
+            gap = _text_width(font_path, font_size, separator) if separator else 0.0
+            if lines[-1] and line_widths[-1] + gap + width > usable_width:
+                lines.append([])
+                line_widths.append(0.0)
+                gap = 0.0
+            lines[-1].append((i, line_widths[-1] + gap))
+            line_widths[-1] += gap + width
+
+        height = len(lines) * line_height + 2 * stroke_width
+        base = Image.new("RGBA", (max_width, height), (0, 0, 0, 0))
+        highlight = Image.new("RGBA", (max_width, height), (0, 0, 0, 0))
+        base_draw = ImageDraw.Draw(base)
+        highlight_draw = ImageDraw.Draw(highlight)
+
+        self.boxes = [None] * len(texts)
+        for row, (line, line_width) in enumerate(zip(lines, line_widths)):
+            left = (max_width - line_width) / 2
+            top = stroke_width + row * line_height
+            for i, x in line:
+                position = (left + x, top)
+                for draw, fill in ((base_draw, color), (highlight_draw, highlight_color)):
+                    draw.text(position, texts[i], font=font, fill=fill,
+                              stroke_width=stroke_width, stroke_fill=stroke_color)
+                x0 = max(0, int(left + x) - stroke_width)
+                x1 = min(max_width, int(left + x + _text_width(
+                    font_path, font_size, texts[i])) + stroke_width + 1)
+                self.boxes[i] = (x0, top - stroke_width, x1, top + line_height)
+
+        base = np.asarray(base)
+        self.base = np.ascontiguousarray(base[:, :, :3])
+        self.highlight = np.asarray(highlight)[:, :, :3]
+        self.mask = base[:, :, 3] / 255.0
+
+    def frame(self, active_word=None):
+        """
+        Returns the RGB frame of the cue with the active word recolored.
+
+        Args:
+            active_word (int, optional): Index of the word being spoken.
+
+        Returns:
+            numpy.ndarray: The frame.
+        """
+        if active_word is None:
+            return self.base
+        x0, y0, x1, y1 = self.boxes[active_word]
+        frame = self.base.copy()
+        frame[y0:y1, x0:x1] = self.highlight[y0:y1, x0:x1]
+        return frame
+
+
+class KaraokeSubtitlesClip(VideoClip):
+    """
+    Subtitles that highlight the word being spoken.
+
+    Each cue is laid out once, the first time it is shown; every frame then only recolors the
+    bounding box of the active word, instead of creating a TextClip per word state.
+    """
+
+    def __init__(self, cues, cue_words, font_path, font_size=50, color="yellow",
+                 highlight_color="white", stroke_color="black", stroke_width=2, max_width=1000,
+                 max_cached_layouts=None):
+        """
+        Args:
+            cues (list): A list of cues, where each cue is a tuple (start, end, text).
+            cue_words (list[list[tuple]]): The timed words (start, end, text) of each cue.
+            font_path (str): Path to the TrueType font.
+            font_size (int): Font size in pixels.
+            color (str): Color of the words that are not being spoken.
+            highlight_color (str): Color of the word being spoken.
+            stroke_color (str): Color of the text outline.
+            stroke_width (int): Width of the text outline in pixels.
+            max_width (int): Width of the subtitle box in pixels.
+            max_cached_layouts (int, optional): Number of cue layouts kept in memory. By default
+                                                every cue stays cached for the whole render.
+        """
+        VideoClip.__init__(self, has_constant_size=False)
+        self.cues = cues
+        # Cues whose words are unknown are shown without highlighting
+        self.cue_words = [
+            words or [(end, end, text) for text in cue_text.split()]
+            for (_, end, cue_text), words in zip(cues, cue_words)
+        ]
+        self.layout_options = dict(
+            font_path=font_path, font_size=font_size, color=color,
+            highlight_color=highlight_color, stroke_color=stroke_color,
+            stroke_width=stroke_width, max_width=max_width)
+        self.layouts = OrderedDict()
+        self.max_cached_layouts = max_cached_layouts
+        self._cue_starts = [start for start, _, _ in cues]
+        self._empty_frame = np.zeros((1, 1, 3), dtype=np.uint8)
+        self._empty_mask = np.zeros((1, 1))
+
+        self.start = 0
+        self.duration = max((end for _, end, _ in cues), default=0)
+        self.end = self.duration
+        self.frame_function = lambda t: self._frame(t)[0]
+        self.mask = VideoClip(lambda t: self._frame(t)[1], is_mask=True,
+                              has_constant_size=False).with_duration(self.duration)
+
+    def _layout(self, index):
+        if index in self.layouts:
+            self.layouts.move_to_end(index)
+        else:
+            texts = [word[2] for word in self.cue_words[index]]
+            self.layouts[index] = CueLayout(texts, **self.layout_options)
+            if self.max_cached_layouts and len(self.layouts) > self.max_cached_layouts:
+                self.layouts.popitem(last=False)
+        return self.layouts[index]
+
+    def _frame(self, t):
+        """
+        Returns the (frame, mask) of the subtitles at time t.
+        """
+        index = bisect.bisect_right(self._cue_starts, t) - 1
+        if index < 0 or t >= self.cues[index][1]:
+            return self._empty_frame, self._empty_mask
+
+        # A word stays highlighted until the next word starts, so short gaps do not flicker
+        words = self.cue_words[index]
+        word_starts = [word[0] for word in words]
+        active = bisect.bisect_right(word_starts, t) - 1
+        if active < 0 or (active == len(words) - 1 and t >= words[active][1]):
+            active = None
+
+        layout = self._layout(index)
+        return layout.frame(active), layout.mask
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from openai import OpenAI
 import json
+import re
 
 
 class MusicChoiceResponse(BaseModel):
@@ -23,6 +24,54 @@ class OpenAIService:
         """
         self.openai_client = OpenAI(api_key=api_key)
 
+    @staticmethod
+    def _build_script_prompt(theme: str, language: str) -> str:
+        """
+        Build the prompt used to generate a plain narration script.
+        """
+        return (
+            f"You are a skilled scriptwriter specialized in writing engaging, informal, and conversational scripts "
+            f"for short videos (up to 60 seconds), such as YouTube Shorts, Reels, and TikTok. "
+            f"Write a natural and authentic narration script about '{theme}' in {language}. "
+            f"Include informal expressions, brief pauses (indicated by ellipses '...'), thoughtful interjections "
+            f"('hmmm', 'you know'), casual laughter ('haha'), and other conversational elements to make the script "
+            f"feel genuinely human and relatable. Do not include any scene directions or notes—only provide the narration text."
+        )
+
+    @staticmethod
+    def _build_script_and_voice_instructions_prompt(theme: str, language: str) -> str:
+        """
+        Build the prompt used to generate a script together with voice instructions.
+        """
+        return (
+            f"You are a creative scriptwriter specializing in engaging short video narrations "
+            f"for short videos (up to 60 seconds), such as YouTube Shorts, Reels, and TikTok. "
+            f"Write a natural, conversational narration script about '{theme}' in {language}. "
+            f"Include realistic speech nuances sparingly and naturally, such as occasional short pauses (indicated by ellipses '...'), "
+            f"thoughtful interjections ('hmmm...', 'well...', 'you know...'), or light laughter ('haha') only when truly appropriate. "
+            f"Do NOT overuse pauses or expressions; keep them subtle and realistic, as in a genuine casual conversation. "
+            f"Along with the script, provide detailed voice instructions under the key 'voice_instructions', specifying:\n"
+            f"- 'accent_affect': brief description of accent nuances\n"
+            f"- 'tone': overall mood (friendly, humorous, thoughtful, etc.)\n"
+            f"- 'pacing': speech speed and rhythm (relaxed, dynamic, steady, etc.)\n"
+            f"- 'emotion': primary emotional tone (enthusiastic, curious, playful, etc.)\n"
+            f"- 'pronunciation': specific pronunciation notes if needed\n"
+            f"- 'personality_affect': influence of personality on voice style\n\n"
+            "Respond strictly as a JSON object without explanations or additional text, "
+            "writing 'voice_instructions' before 'script'. Example:\n"
+            "{\n"
+            '  "voice_instructions": {\n'
+            '    "accent_affect": "neutral American accent, conversational",\n'
+            '    "tone": "friendly and informative",\n'
+            '    "pacing": "steady with occasional natural pauses",\n'
+            '    "emotion": "enthusiastic yet natural",\n'
+            '    "pronunciation": "clear, standard pronunciation",\n'
+            '    "personality_affect": "warm, approachable, genuine"\n'
+            "  },\n"
+            '  "script": "Your balanced narration text here"\n'
+            "}"
+        )
+
     def generate_script(self, theme: str, language: str) -> str:
         """
         Generate a humanized, conversational short video script.
@@ -34,14 +83,7 @@ class OpenAIService:
         Returns:
             str: The generated script with natural speech elements.
         """
-        prompt = (
-            f"You are a skilled scriptwriter specialized in writing engaging, informal, and conversational scripts "
-            f"for short videos (up to 60 seconds), such as YouTube Shorts, Reels, and TikTok. "
-            f"Write a natural and authentic narration script about '{theme}' in {language}. "
-            f"Include informal expressions, brief pauses (indicated by ellipses '...'), thoughtful interjections "
-            f"('hmmm', 'you know'), casual laughter ('haha'), and other conversational elements to make the script "
-            f"feel genuinely human and relatable. Do not include any scene directions or notes—only provide the narration text."
-        )
+        prompt = self._build_script_prompt(theme, language)
 
         # Calls the Chat Completions endpoint
         completion = self.openai_client.chat.completions.create(
@@ -106,6 +148,20 @@ class OpenAIService:
         choice = completion.choices[0]
         return choice.message.content
 
+    def embed_texts(self, texts: list, model: str = "text-embedding-3-small") -> list:
+        """
+        Compute embeddings of texts, in a single request.
+
+        Args:
+            texts (list): The texts to embed.
+            model (str): The embedding model.
+
+        Returns:
+            list: One embedding (list of floats) per text, in the same order.
+        """
+        response = self.openai_client.embeddings.create(model=model, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
     def generate_music_choice(
         self, script: str, image_prompts: list, songs_json: str
     ) -> MusicChoiceResponse:
@@ -172,33 +228,8 @@ class OpenAIService:
         Returns:
             dict: Object with the keys "script" and "voice_instructions".
         """
-        prompt = (
-            f"You are a creative scriptwriter specializing in engaging short video narrations "
-            f"for short videos (up to 60 seconds), such as YouTube Shorts, Reels, and TikTok. "
-            f"Write a natural, conversational narration script about '{theme}' in {language}. "
-            f"Include realistic speech nuances sparingly and naturally, such as occasional short pauses (indicated by ellipses '...'), "
-            f"thoughtful interjections ('hmmm...', 'well...', 'you know...'), or light laughter ('haha') only when truly appropriate. "
-            f"Do NOT overuse pauses or expressions; keep them subtle and realistic, as in a genuine casual conversation. "
-            f"Along with the script, provide detailed voice instructions under the key 'voice_instructions', specifying:\n"
-            f"- 'accent_affect': brief description of accent nuances\n"
-            f"- 'tone': overall mood (friendly, humorous, thoughtful, etc.)\n"
-            f"- 'pacing': speech speed and rhythm (relaxed, dynamic, steady, etc.)\n"
-            f"- 'emotion': primary emotional tone (enthusiastic, curious, playful, etc.)\n"
-            f"- 'pronunciation': specific pronunciation notes if needed\n"
-            f"- 'personality_affect': influence of personality on voice style\n\n"
-            "Respond strictly as a JSON object without explanations or additional text. Example:\n"
-            "{\n"
-            '  "script": "Your balanced narration text here",\n'
-            '  "voice_instructions": {\n'
-            '    "accent_affect": "neutral American accent, conversational",\n'
-            '    "tone": "friendly and informative",\n'
-            '    "pacing": "steady with occasional natural pauses",\n'
-            '    "emotion": "enthusiastic yet natural",\n'
-            '    "pronunciation": "clear, standard pronunciation",\n'
-            '    "personality_affect": "warm, approachable, genuine"\n'
-            "  }\n"
-            "}"
-        )
+        prompt = self._build_script_and_voice_instructions_prompt(
+            theme, language)
 
         # Force JSON response
         completion = self.openai_client.chat.completions.create(
@@ -228,3 +259,146 @@ class OpenAIService:
             )
 
         return result_data
+
+    def _stream_completion_text(self, prompt: str, **kwargs):
+        """
+        Stream a chat completion and yield its content as it arrives.
+
+        Args:
+            prompt (str): The user prompt.
+            **kwargs: Extra arguments for the Chat Completions endpoint.
+
+        Yields:
+            str: Pieces of the generated content, in order.
+        """
+        stream = self.openai_client.chat.completions.create(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.5,
+            stream=True,
+            **kwargs
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    def stream_script(self, theme: str, language: str):
+        """
+        Stream the generation of a short video script (see `generate_script`).
+
+        Args:
+            theme (str): The subject of the script.
+            language (str): The language in which the script is written.
+
+        Yields:
+            tuple: ("script", text) events carrying the script as it is generated.
+        """
+        prompt = self._build_script_prompt(theme, language)
+        for delta in self._stream_completion_text(prompt):
+            yield "script", delta
+
+    def stream_script_and_voice_instructions(self, theme: str, language: str):
+        """
+        Stream the generation of a script with voice instructions
+        (see `generate_script_and_voice_instructions`).
+
+        The JSON response is parsed incrementally: the voice instructions are emitted as soon
+        as their object is complete, then the script is emitted piece by piece while the model
+        is still writing it.
+
+        Args:
+            theme (str): The theme for the script.
+            language (str): The language for the script.
+
+        Yields:
+            tuple: One ("voice_instructions", dict) event and ("script", text) events.
+        """
+        prompt = self._build_script_and_voice_instructions_prompt(
+            theme, language)
+        parser = _StreamedScriptParser()
+        for delta in self._stream_completion_text(
+                prompt, response_format={"type": "json_object"}):
+            yield from parser.feed(delta)
+        yield from parser.close()
+
+
+class _StreamedScriptParser:
+    """
+    Incremental parser for the {"voice_instructions": {...}, "script": "..."} response.
+    """
+
+    _SCRIPT_KEY = re.compile(r'"script"\s*:\s*"')
+    _INSTRUCTIONS_KEY = re.compile(r'"voice_instructions"\s*:\s*')
+
+    def __init__(self):
+        self._buffer = ""
+        self._script_pos = None
+        self._script_done = False
+        self._instructions_sent = False
+
+    def _try_instructions(self):
+        match = self._INSTRUCTIONS_KEY.search(self._buffer)
+        if not match:
+            return None
+        try:
+            instructions, _ = json.JSONDecoder().raw_decode(
+                self._buffer, match.end())
+        except json.JSONDecodeError:
+            return None
+        return instructions if isinstance(instructions, dict) else None
+
+    def feed(self, text: str):
+        self._buffer += text
+        events = []
+
+        if not self._instructions_sent:
+            instructions = self._try_instructions()
+            if instructions is not None:
+                self._instructions_sent = True
+                events.append(("voice_instructions", instructions))
+
+        if self._script_pos is None:
+            match = self._SCRIPT_KEY.search(self._buffer)
+            if match:
+                self._script_pos = match.end()
+
+        if self._script_pos is not None and not self._script_done:
+            # Decode up to the last complete escape sequence or the closing quote
+            pos = self._script_pos
+            end = pos
+            while end < len(self._buffer):
+                char = self._buffer[end]
+                if char == '"':
+                    self._script_done = True
+                    break
+                if char == "\\":
+                    size = 2
+                    if self._buffer[end + 1:end + 2] == "u":
+                        # Keep surrogate pairs (😀) together
+                        high = self._buffer[end + 2:end + 4].lower()
+                        size = 12 if high in ("d8", "d9", "da", "db") else 6
+                    if end + size > len(self._buffer):
+                        break
+                    end += size
+                else:
+                    end += 1
+            if end > pos:
+                events.append(
+                    ("script", json.loads('"' + self._buffer[pos:end] + '"')))
+            self._script_pos = end
+        return events
+
+    def close(self):
+        if self._instructions_sent:
+            return []
+        # The model wrote the script first: the instructions are only known at the end
+        try:
+            result_data = json.loads(self._buffer)
+        except json.JSONDecodeError as e:
+            raise ValueError(
+                f"Could not decode JSON from the model response:\n{self._buffer}\n\nError: {e}"
+            )
+        return [("voice_instructions", result_data.get("voice_instructions") or {})]
@@ -0,0 +1,261 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Calls kept per backend for the rolling statistics
+STATS_WINDOW = 50
+# Calls needed before a backend's latency is trusted; until then it is tried first
+MIN_SAMPLES = 5
+# Consecutive failures after which a backend is skipped for HEALTH_COOLDOWN_SECONDS
+MAX_CONSECUTIVE_FAILURES = 3
+HEALTH_COOLDOWN_SECONDS = 30.0
+# Share of calls sent to another healthy backend, so a recovered backend is noticed
+EXPLORATION_RATE = 0.05
+HEDGE_QUANTILE = 0.95
+MAX_WORKERS = 32
+
+
+class BackendStats:
+    """
+    Rolling latency and error statistics of one backend.
+    """
+
+    def __init__(self, window=STATS_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.calls = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok, now=None):
+        """
+        Records the outcome of a call.
+
+        Returns:
+            bool: True if this failure made the backend unhealthy.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.calls += 1
+            self.outcomes.append(ok)
+            if ok:
+                self.latencies.append(latency)
+                self.consecutive_failures = 0
+                return False
+            self.consecutive_failures += 1
+            if self.consecutive_failures == MAX_CONSECUTIVE_FAILURES:
+                self.unhealthy_until = now + HEALTH_COOLDOWN_SECONDS
+                return True
+            if self.consecutive_failures > MAX_CONSECUTIVE_FAILURES:
+                # A failed probe after the cooldown keeps the backend out for another cooldown
+                self.unhealthy_until = now + HEALTH_COOLDOWN_SECONDS
+            return False
+
+    def healthy(self, now=None):
+        now = time.monotonic() if now is None else now
+        return now >= self.unhealthy_until
+
+    def quantile(self, q):
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def error_rate(self):
+        with self._lock:
+            outcomes = list(self.outcomes)
+        return outcomes.count(False) / len(outcomes) if outcomes else 0.0
+
+    def expected_latency(self):
+        """
+        Median latency divided by the success rate: the expected time to a successful result
+        when failed calls are retried. 0 until MIN_SAMPLES calls succeeded, so new backends
+        are measured first.
+        """
+        if len(self.latencies) < MIN_SAMPLES:
+            return 0.0
+        success_rate = max(1.0 - self.error_rate(), 0.05)
+        return self.quantile(0.5) / success_rate
+
+
+class ProviderRouter:
+    """
+    Routes the requests of a stage to the fastest healthy backend of a set of equivalent ones
+    (e.g. TTS models, or image models taking the same inputs).
+
+    Every call is timed per backend; backends are ranked by median latency inflated by their
+    error rate, and skipped for a cooldown after repeated failures. A failed request is sent to
+    the next backend. With hedging, a request still running after the p95 latency of its
+    backend is duplicated on the next backend (or the same one if it is alone), and the first
+    result is used; the slower request still completes and is measured, and its result is
+    discarded.
+    """
+
+    def __init__(self, name, backends, hedge=False, stats=None, logger=None):
+        """
+        Args:
+            name (str): Name of the routed stage, used as prefix of the statistics keys.
+            backends (list[str]): The equivalent backends, in order of preference.
+            hedge (bool): Duplicate requests slower than the p95 latency of their backend.
+            stats (dict, optional): Statistics shared with other routers, keyed by
+                                    "<name>:<backend>".
+            logger: Logger instance for logging.
+        """
+        if not backends:
+            raise ValueError(f"No backend to route {name} requests to.")
+        self.name = name
+        self.backends = list(dict.fromkeys(backends))
+        self.hedge = hedge
+        self.stats = stats if stats is not None else {}
+        self.logger = logger or logging.getLogger("rapidclip_generator")
+        for backend in self.backends:
+            self.stats.setdefault(self._key(backend), BackendStats())
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _key(self, backend):
+        return f"{self.name}:{backend}"
+
+    def backend_stats(self, backend):
+        return self.stats[self._key(backend)]
+
+    def ranked_backends(self):
+        """
+        Orders the backends for the next request: healthy backends by expected latency (ties
+        in order of preference), then unhealthy ones by the end of their cooldown.
+        """
+        now = time.monotonic()
+        healthy = [b for b in self.backends if self.backend_stats(b).healthy(now)]
+        unhealthy = sorted((b for b in self.backends if b not in healthy),
+                           key=lambda b: self.backend_stats(b).unhealthy_until)
+        healthy.sort(key=lambda b: self.backend_stats(b).expected_latency())
+        if len(healthy) > 1 and random.random() < EXPLORATION_RATE:
+            healthy.insert(0, healthy.pop(random.randrange(1, len(healthy))))
+        return healthy + unhealthy
+
+    def _timed(self, request, backend):
+        start = time.monotonic()
+        try:
+            result = request(backend)
+        except Exception as e:
+            if self.backend_stats(backend).record(time.monotonic() - start, ok=False):
+                self.logger.warning(
+                    f"{self._key(backend)} failed {MAX_CONSECUTIVE_FAILURES} times in a row; "
+                    f"skipping it for {HEALTH_COOLDOWN_SECONDS:g} seconds ({e}).")
+            raise
+        self.backend_stats(backend).record(time.monotonic() - start, ok=True)
+        return result
+
+    def _submit(self, request, backend):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=MAX_WORKERS, thread_name_prefix=f"{self.name}-router")
+        return self._executor.submit(self._timed, request, backend)
+
+    def pin(self):
+        """
+        Chooses a backend once, like for a single request, for requests that must all use the
+        same backend (e.g. the chunks of one narration, which must keep the same voice).
+
+        Returns:
+            PinnedRouter: A router sending every request to the chosen backend.
+        """
+        return PinnedRouter(self, self.ranked_backends()[0])
+
+    def call(self, request, pinned=None):
+        """
+        Runs a request on the best backend.
+
+        Args:
+            request (callable): Function taking the backend (e.g. the model name) and running
+                                the request with it.
+            pinned (str, optional): Backend to run the request on, whatever the ranking. Hedges
+                                    go to the same backend; other backends are only tried
+                                    if it fails.
+
+        Returns:
+            The result of the first successful request.
+
+        Raises:
+            Exception: The error of the last backend tried, if every backend failed.
+        """
+        order = self.ranked_backends()
+        if pinned is not None:
+            order = [pinned] + [backend for backend in order if backend != pinned]
+        if not self.hedge:
+            for i, backend in enumerate(order):
+                try:
+                    return self._timed(request, backend)
+                except Exception as e:
+                    if i + 1 == len(order):
+                        raise
+                    self.logger.warning(
+                        f"{self._key(backend)} failed ({e}); retrying with {order[i + 1]}.")
+
+        remaining = order[1:]
+        futures = {self._submit(request, order[0]): order[0]}
+        hedge_after = self.backend_stats(order[0]).quantile(HEDGE_QUANTILE) \
+            if len(self.backend_stats(order[0]).latencies) >= MIN_SAMPLES else None
+        error = None
+        while futures:
+            done, _ = wait(futures, timeout=hedge_after, return_when=FIRST_COMPLETED)
+            if not done:
+                # Only one duplicate per request
+                hedge_after = None
+                backend = remaining.pop(0) if remaining and pinned is None else order[0]
+                self.backend_stats(backend).hedges += 1
+                self.logger.info(
+                    f"{self._key(order[0])} is slower than its p95; hedging with {backend}.")
+                futures[self._submit(request, backend)] = backend
+                continue
+            for future in done:
+                backend = futures.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+                    if not futures and remaining:
+                        next_backend = remaining.pop(0)
+                        self.logger.warning(
+                            f"{self._key(backend)} failed ({e}); retrying with {next_backend}.")
+                        futures[self._submit(request, next_backend)] = next_backend
+        raise error
+
+    def summary(self):
+        """
+        Describes the statistics of every backend, one line each.
+        """
+        lines = []
+        for backend in self.backends:
+            stats = self.backend_stats(backend)
+            p50, p95 = stats.quantile(0.5), stats.quantile(HEDGE_QUANTILE)
+            latency = f"p50 {p50:.2f}s, p95 {p95:.2f}s" if p50 is not None else "no latency yet"
+            lines.append(
+                f"{self._key(backend)}: {stats.calls} calls, {latency}, "
+                f"{stats.error_rate():.0%} errors, {stats.hedges} hedges"
+                + ("" if stats.healthy() else ", unhealthy"))
+        return "\n".join(lines)
+
+
+class PinnedRouter:
+    """
+    Sends every request to one backend of a ProviderRouter (see ProviderRouter.pin). The
+    request fails over to the other backends only when that backend fails.
+    """
+
+    def __init__(self, router, backend):
+        self.router = router
+        self.backend = backend
+
+    def call(self, request):
+        return self.router.call(request, pinned=self.backend)
+
+    def summary(self):
+        return self.router.summary()
@@ -0,0 +1,118 @@
+import importlib
+import threading
+from config import settings
+from services.provider_router import ProviderRouter
+from utils.startup_timer import timed_import
+
+# Service name -> (module, class, credential setting, constructor keyword)
+SERVICE_SPECS = {
+    "openai": ("services.openai_service", "OpenAIService", "OPENAI_API_KEY", "api_key"),
+    "elevenlabs": ("services.elevenlabs_service", "ElevenLabsService", "ELEVENLABS_API_KEY", "api_key"),
+    "whisper": ("services.whisper_service", "WhisperService", "OPENAI_API_KEY", "api_key"),
+    "openai_tts": ("services.openai_tts_service", "OpenAITTSService", "OPENAI_API_KEY", "api_key"),
+    "replicate": ("services.replicate_service", "ReplicateService", "REPLICATE_API_TOKEN", "api_token"),
+}
+
+
+def required_services(args):
+    """
+    Lists the services a run will use.
+
+    Args:
+        args (argparse.Namespace): The options returned by parse_args.
+
+    Returns:
+        list[str]: Names of the services (keys of SERVICE_SPECS).
+    """
+    names = ["openai", "whisper", "replicate"]
+    names.append("elevenlabs" if args.tts_service ==
+                 "elevenlabs" else "openai_tts")
+    return names
+
+
+class ServiceRegistry:
+    """
+    Holds the API clients used by the pipeline. A provider SDK is only imported when its
+    service is first used, and each client is then reused, so a long-running process keeps its
+    clients (and their connection pools) warm while short CLI runs skip unused imports.
+    """
+
+    def __init__(self):
+        self._services = {}
+        self._routers = {}
+        # Backend statistics outlive the routers, so every job learns from the previous ones
+        self._provider_stats = {}
+        self._lock = threading.Lock()
+
+    def validate(self, names):
+        """
+        Checks that the credentials of the given services are configured.
+
+        Args:
+            names (list[str]): Names of the services (see required_services).
+
+        Raises:
+            ValueError: If a credential is missing.
+        """
+        for name in names:
+            settings.require(SERVICE_SPECS[name][2])
+
+    def get(self, name):
+        """
+        Returns the client of a service, importing and creating it on first use.
+
+        Args:
+            name (str): Name of the service (a key of SERVICE_SPECS).
+
+        Returns:
+            The service instance.
+        """
+        with self._lock:
+            if name not in self._services:
+                module_name, class_name, credential, keyword = SERVICE_SPECS[name]
+                with timed_import(module_name):
+                    module = importlib.import_module(module_name)
+                service_class = getattr(module, class_name)
+                self._services[name] = service_class(
+                    **{keyword: settings.require(credential)})
+            return self._services[name]
+
+    def router(self, name, backends, hedge=False):
+        """
+        Returns the router of a stage over a set of equivalent backends, sharing the latency
+        and error statistics of every backend with the other routers of the registry.
+
+        Args:
+            name (str): Name of the routed stage (e.g. "openai_tts").
+            backends (list[str]): The equivalent backends, in order of preference.
+            hedge (bool): Duplicate requests slower than the p95 latency of their backend.
+
+        Returns:
+            ProviderRouter: The router.
+        """
+        key = (name, tuple(backends), hedge)
+        with self._lock:
+            if key not in self._routers:
+                self._routers[key] = ProviderRouter(
+                    name, backends, hedge=hedge, stats=self._provider_stats)
+            return self._routers[key]
+
+    @property
+    def openai(self):
+        return self.get("openai")
+
+    @property
+    def elevenlabs(self):
+        return self.get("elevenlabs")
+
+    @property
+    def whisper(self):
+        return self.get("whisper")
+
+    @property
+    def openai_tts(self):
+        return self.get("openai_tts")
+
+    @property
+    def replicate(self):
+        return self.get("replicate")
@@ -17,7 +17,7 @@ class ReplicateService:
         """
         self.api_token = api_token
 
-    def generate_image(self, prompt, width=1080, height=1920):
+    def generate_image(self, prompt, width=1080, height=1920, model=None):
         """
         Generate an image based on the given prompt using the nvidia/sana model.
 
@@ -25,6 +25,8 @@ class ReplicateService:
             prompt (str): The prompt describing the image to generate.
             width (int): The width of the generated image.
             height (int): The height of the generated image.
+            model (str, optional): Replicate model ID taking the same inputs as nvidia/sana
+                                   (default: nvidia/sana at SANA_MODEL_VERSION).
 
         Returns:
             bytes: The generated image data.
@@ -34,9 +36,8 @@ class ReplicateService:
             "width": width,
             "height": height
         }
-        model_id = f"nvidia/sana:{settings.SANA_MODEL_VERSION}"
         output = replicate.run(
-            model_id,
+            model or settings.SANA_MODEL,
             input=input_data
         )
         try:
@@ -1,15 +1,55 @@
 from moviepy import (
     AudioFileClip,
     ImageClip,
+    VideoClip,
     CompositeVideoClip,
     TextClip,
     CompositeAudioClip,
     concatenate_audioclips
 )
+from moviepy.config import FFMPEG_BINARY
 from moviepy.video.fx import FadeIn, FadeOut, Resize
 from moviepy.video.tools.subtitles import SubtitlesClip
+from imageio.v2 import imread
+from PIL import Image
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import lru_cache
+import hashlib
+import json
 import os
+import subprocess
+import numpy as np
+from utils.artifact_store import get_artifact_store
 from utils.audio_processing import adjust_background_music_volume
+from utils.audio_stream import stream_mix_background_music
+from utils.delivery import DeliveryWriter, extract_poster, poster_path, proxy_path
+from services.karaoke_renderer import KaraokeSubtitlesClip
+from utils.output_formats import crop_box, format_size
+from utils.render_profiler import RenderProfiler
+
+VIDEO_SIZE = (1080, 1920)
+FPS = 24
+FONT_PATH = "fonts/Helvetica.ttf"
+SUBTITLE_POSITION = ("center", 1620)
+ZOOM_RATE = 0.02
+FADE_DURATION = 0.5
+BACKGROUND_MUSIC_DIFF = -15.0
+KARAOKE_HIGHLIGHT_COLOR = "white"
+
+# Bump whenever the way a segment is drawn changes, so cached segments are re-encoded
+RENDER_VERSION = 2
+MAX_SEGMENT_SECONDS = 10.0
+
+# Decoded images kept in memory, so repeated renders of the same assets skip decoding
+IMAGE_CACHE_SIZE = 16
+
+# Images and subtitle layouts held at once by a streaming render: the background, the current
+# image and the one fading in
+STREAMING_IMAGE_CAPACITY = 3
+STREAMING_LAYOUT_CAPACITY = 2
+
+_DIGEST_CACHE = {}
 
 
 def make_textclip(txt):
@@ -24,7 +64,7 @@ def make_textclip(txt):
     """
     return TextClip(
         text=txt,
-        font="fonts/Helvetica.ttf",
+        font=FONT_PATH,
         font_size=50,
         color="yellow",
         stroke_color="black",
@@ -34,88 +74,211 @@ def make_textclip(txt):
     )
 
 
-def assemble_video(video_folder, file_id, cues, background_music_path=None, max_duration=None, watermark=None):
+def image_windows(cues, video_duration, scenes=None):
     """
-    Assembles a final video by combining narration audio, images, subtitles, and optional background music.
-    Optionally adds a textual watermark if 'watermark' is provided.
+    Computes when each generated image is on screen.
+
+    The first image is the zooming background for the whole video; every following image
+    covers a scene of the scene plan or, for videos generated without one, a group of two
+    subtitle cues.
 
     Args:
-        video_folder (str): The directory where video assets are stored.
-        file_id (str): The unique identifier for the video.
-        cues (list): Subtitle cues defining the timing of text overlays.
-        background_music_path (str, optional): Path to the background music file. Defaults to None.
-        max_duration (float, optional): The maximum allowed duration for the video.
-        watermark (str, optional): Optional text to overlay as a watermark. Defaults to None.
+        cues (list): Subtitle cues as (start, end, text) tuples.
+        video_duration (float): Duration of the narration in seconds.
+        scenes (list[dict], optional): The scenes planned by plan_scenes.
 
     Returns:
-        str: The path to the final video file.
+        list[tuple]: (image_number, start, end) for every image, starting at image 1.
     """
+    windows = [(1, 0.0, video_duration)]
+    if scenes is not None:
+        for i, scene in enumerate(scenes[1:], start=2):
+            windows.append((i, scene["start"], scene["end"]))
+        return windows
 
-    # Load narration audio
-    audio_path = os.path.join(video_folder, f"{file_id}.mp3")
-    narration_audio = AudioFileClip(audio_path)
+    num_images = (len(cues) + 1) // 2
+    for i in range(1, num_images):
+        group = cues[i * 2: i * 2 + 2]
+        windows.append((i + 1, group[0][0], group[-1][1]))
+    return windows
+
+
+def _image_path(video_folder, file_id, image_number):
+    return os.path.join(video_folder, f"{file_id}_img_{image_number}.png")
+
+
+@lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def _decode_image(path, mtime_ns):
+    return imread(path)
+
+
+def load_image(path):
+    """
+    Decodes an image file, reusing the decoded pixels while the file is unchanged.
+
+    Args:
+        path (str): Path to the image file.
+
+    Returns:
+        numpy.ndarray: The image pixels.
+    """
+    return _decode_image(os.path.abspath(path), os.stat(path).st_mtime_ns)
+
+
+def _profiled(profiler, clip, name, frame_root=False):
+    """
+    Wraps the frame function of a clip with the render profiler, if profiling.
+    """
+    return profiler.wrap(clip, name, frame_root=frame_root) if profiler else clip
+
+
+class _ImageWindowCache:
+    """
+    Holds the decoded pixels of at most `capacity` images. An image is decoded when its window
+    starts and dropped once newer images need the room, so a streaming render keeps only the
+    images on screen in memory, however many the video has.
+    """
+
+    def __init__(self, capacity=STREAMING_IMAGE_CAPACITY):
+        self.capacity = capacity
+        self._images = OrderedDict()
+
+    def get(self, path):
+        if path in self._images:
+            self._images.move_to_end(path)
+        else:
+            self._images[path] = imread(path)
+            if len(self._images) > self.capacity:
+                self._images.popitem(last=False)
+        return self._images[path]
+
+
+def _streamed_image_clip(path, duration, cache):
+    """
+    Creates an image clip that reads its pixels from the cache on demand instead of holding them.
+    """
+    clip = VideoClip(duration=duration)
+    with Image.open(path) as image:
+        clip.size = image.size
+    clip.frame_function = lambda t: cache.get(path)
+    return clip
+
+
+def _build_audio(audio_path, background_music_path, video_folder, profiler=None, streaming=False,
+                 ducking=False):
+    """
+    Builds the narration track, mixed with the volume-adjusted background music if provided.
+    In streaming mode, or when the music is ducked under the narration, the mix is computed
+    block by block into a WAV file read back as one track.
+    """
+    narration_audio = _profiled(
+        profiler, AudioFileClip(audio_path), "audio_narration")
     video_duration = narration_audio.duration
 
-    # Process background music if provided
-    if background_music_path:
+    if not background_music_path:
+        return narration_audio
+
+    if streaming or ducking:
+        narration_audio.close()
+        with profiler.section("audio_stream_mix") if profiler else nullcontext():
+            mix_path = stream_mix_background_music(
+                audio_path, background_music_path, os.path.join(
+                    video_folder, "background_mix.wav"),
+                target_diff=BACKGROUND_MUSIC_DIFF, duration=video_duration,
+                ffmpeg_binary=FFMPEG_BINARY, ducking=ducking
+            )
+        return _profiled(profiler, AudioFileClip(mix_path), "audio_mix")
+
+    with profiler.section("audio_music_volume") if profiler else nullcontext():
         adjusted_bg_music_path = adjust_background_music_volume(
-            audio_path, background_music_path, target_diff=-15.0, output_dir=video_folder
+            audio_path, background_music_path, target_diff=BACKGROUND_MUSIC_DIFF, output_dir=video_folder,
+            store=get_artifact_store()
         )
 
-        bg_music = AudioFileClip(adjusted_bg_music_path)
-        if bg_music.duration < video_duration:
-            loops = int(video_duration // bg_music.duration) + 1
-            bg_music = concatenate_audioclips([bg_music] * loops)
-        if bg_music.duration > video_duration:
-            bg_music = bg_music.with_duration(video_duration)
-        combined_audio = CompositeAudioClip([narration_audio, bg_music])
-    else:
-        combined_audio = narration_audio
+    bg_music = AudioFileClip(adjusted_bg_music_path)
+    if bg_music.duration < video_duration:
+        loops = int(video_duration // bg_music.duration) + 1
+        bg_music = concatenate_audioclips([bg_music] * loops)
+    if bg_music.duration > video_duration:
+        bg_music = bg_music.with_duration(video_duration)
+    bg_music = _profiled(profiler, bg_music, "audio_music")
+    return _profiled(profiler, CompositeAudioClip([narration_audio, bg_music]), "audio_mix")
+
+
+def _build_images(video_folder, file_id, windows, size=VIDEO_SIZE, profiler=None, streaming=False):
+    """
+    Builds the image layer: the zooming background image and the following images with fade
+    transitions. In streaming mode images are only decoded while on screen.
+    """
+    image_cache = _ImageWindowCache() if streaming else None
+
+    def image_clip(image_number, duration):
+        path = _image_path(video_folder, file_id, image_number)
+        if streaming:
+            return _streamed_image_clip(path, duration, image_cache)
+        return ImageClip(load_image(path)).with_duration(duration)
 
     # Create the base video with zoom effect on the first image
-    first_image = os.path.join(video_folder, f"{file_id}_img_1.png")
-    background = ImageClip(first_image).with_duration(video_duration)
-    background = background.with_effects([Resize(lambda t: 1 + 0.02 * t)])
+    _, _, video_duration = windows[0]
+    background = image_clip(1, video_duration)
+    background = background.with_effects(
+        [Resize(lambda t: 1 + ZOOM_RATE * t)])
+    background = _profiled(profiler, background, "image_1")
 
     # Add additional images with transitions
     image_clips = []
-    num_images = (len(cues) + 1) // 2
-    for i in range(1, num_images):
-        group = cues[i * 2: i * 2 + 2]
-        start = group[0][0]
-        end = group[-1][1]
-        duration = end - start
-
-        img_path = os.path.join(video_folder, f"{file_id}_img_{i+1}.png")
-        clip = ImageClip(img_path).with_duration(duration)
+    for image_number, start, end in windows[1:]:
+        clip = image_clip(image_number, end - start)
         clip = clip.with_start(start)
         clip = clip.with_effects([
-            FadeIn(0.5),
-            FadeOut(0.5),
-            Resize(lambda t: 1 + 0.02 * t)
+            FadeIn(FADE_DURATION),
+            FadeOut(FADE_DURATION),
+            Resize(lambda t: 1 + ZOOM_RATE * t)
         ])
-        image_clips.append(clip)
+        image_clips.append(_profiled(profiler, clip, f"image_{image_number}"))
 
     # Create the video composition with images and transitions
-    video = CompositeVideoClip([background] + image_clips, size=(1080, 1920))
+    return _profiled(profiler, CompositeVideoClip(
+        [background] + image_clips, size=size), "compose_images")
 
-    # Add subtitles
-    srt_path = os.path.join(video_folder, f"{file_id}.srt")
-    subtitles = SubtitlesClip(
-        subtitles=srt_path, make_textclip=make_textclip
-    ).with_position(("center", 1620))
+
+def _add_overlays(video, video_folder, file_id, watermark, size=VIDEO_SIZE, cues=None,
+                  cue_words=None, profiler=None, streaming=False, suffix=""):
+    """
+    Adds the subtitles and the watermark on top of the image layer, scaled to the video size.
+    Subtitles highlight the spoken word when cue_words is given.
+    """
+    scale = min(size) / min(VIDEO_SIZE)
+    position = (SUBTITLE_POSITION[0],
+                round(SUBTITLE_POSITION[1] * size[1] / VIDEO_SIZE[1]))
+
+    # Add subtitles (SubtitlesClip keeps every cue it has drawn and only draws at the default
+    # size, so streaming and resized renders use the layout renderer, without highlighting
+    # when there are no word timings)
+    if cue_words or streaming or size != VIDEO_SIZE:
+        subtitles = KaraokeSubtitlesClip(
+            cues, cue_words or [[] for _ in cues], font_path=FONT_PATH,
+            font_size=round(50 * scale), color="yellow", highlight_color=KARAOKE_HIGHLIGHT_COLOR,
+            stroke_color="black", stroke_width=2, max_width=min(round(1000 * scale), size[0] - 40),
+            max_cached_layouts=STREAMING_LAYOUT_CAPACITY if streaming else None
+        ).with_position(position)
+    else:
+        srt_path = os.path.join(video_folder, f"{file_id}.srt")
+        subtitles = SubtitlesClip(
+            subtitles=srt_path, make_textclip=make_textclip
+        ).with_position(position)
+    subtitles = _profiled(profiler, subtitles, f"subtitles{suffix}")
 
     # Merge all elements together
-    final = CompositeVideoClip([video, subtitles], size=(1080, 1920))
-    final = final.with_audio(combined_audio)
+    final = CompositeVideoClip([video, subtitles], size=size)
 
     # If a watermark was provided, overlay it at the bottom-right
     if watermark:
         watermark_clip = (
             TextClip(
                 text=watermark,
-                font="fonts/Helvetica.ttf",
-                font_size=48,
+                font=FONT_PATH,
+                font_size=round(48 * scale),
                 color="white",
                 stroke_color="black",
                 stroke_width=1,
@@ -125,9 +288,190 @@ def assemble_video(video_folder, file_id, cues, background_music_path=None, max_
             .with_position(("center", "center"))
             .with_opacity(0.5)
         )
-        final = CompositeVideoClip([final, watermark_clip], size=(1080, 1920))
+        final = _profiled(profiler, final, f"compose_subtitles{suffix}")
+        watermark_clip = _profiled(profiler, watermark_clip, f"watermark{suffix}")
+        final = CompositeVideoClip([final, watermark_clip], size=size)
+        return _profiled(profiler, final, f"compose_watermark{suffix}", frame_root=True)
+
+    return _profiled(profiler, final, f"compose_subtitles{suffix}", frame_root=True)
+
+
+def _build_video(video_folder, file_id, windows, watermark, cues=None, cue_words=None, profiler=None,
+                 streaming=False):
+    """
+    Builds the silent video: zooming images with fade transitions, subtitles and watermark.
+    """
+    video = _build_images(video_folder, file_id, windows,
+                          profiler=profiler, streaming=streaming)
+    return _add_overlays(video, video_folder, file_id, watermark, cues=cues, cue_words=cue_words,
+                         profiler=profiler, streaming=streaming)
+
+
+class _SharedFrame:
+    """
+    Remembers the last frame of a clip, so that every output size of a multi-size render
+    reuses the same composed frame.
+    """
+
+    def __init__(self, clip):
+        self.clip = clip
+        self._t = None
+        self._frame = None
+
+    def get(self, t):
+        if t != self._t:
+            self._frame = self.clip.get_frame(t)
+            self._t = t
+        return self._frame
+
+
+def _cropped_clip(shared, image_size, size, duration):
+    """
+    Creates a clip showing the centered crop of a shared clip with the aspect ratio of `size`,
+    scaled to `size`.
+    """
+    left, top, right, bottom = crop_box(image_size, size)
+
+    def frame_function(t):
+        region = shared.get(t)[top:bottom, left:right]
+        if (right - left, bottom - top) == size:
+            return region
+        return np.asarray(Image.fromarray(region.astype("uint8")).resize(size, Image.BILINEAR))
+
+    clip = VideoClip(duration=duration)
+    clip.size = size
+    clip.frame_function = frame_function
+    return clip
+
+
+def _image_size(video_folder, file_id):
+    """
+    Returns the size the images of a video were generated at: the master size saved in
+    <id>_images.json, or else the size of the first image.
+    """
+    manifest_path = os.path.join(video_folder, f"{file_id}_images.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            master = json.load(f).get("master_size")
+        if master:
+            return tuple(master)
+    with Image.open(_image_path(video_folder, file_id, 1)) as image:
+        return image.size
+
 
-    # Determine the final duration:
+def _check_sizes(image_size, sizes):
+    """
+    Raises ValueError if an output size would be upscaled from its crop of the images.
+    """
+    for size in sizes:
+        left, top, right, bottom = crop_box(image_size, size)
+        if right - left < size[0] or bottom - top < size[1]:
+            raise ValueError(
+                f"The images ({format_size(image_size)}) are too small to render {format_size(size)}: "
+                f"its crop is only {right - left}x{bottom - top}.")
+
+
+def _output_path(video_folder, file_id, size, primary):
+    if primary:
+        return os.path.join(video_folder, f"{file_id}_final.mp4")
+    return os.path.join(video_folder, f"{file_id}_final_{format_size(size)}.mp4")
+
+
+def _write_sizes(video, build_audio, video_folder, file_id, sizes, watermark, duration, cues,
+                 cue_words=None, profiler=None, streaming=False, poster_time=None, proxy=False,
+                 logger=None):
+    """
+    Renders the video at several sizes in one pass: every frame of the image layer is composed
+    once, at the size of the images, then cropped, subtitled and encoded for each output size.
+    The audio track is mixed and encoded once for all outputs.
+    """
+    shared = _SharedFrame(video)
+    image_size = tuple(video.size)
+    outputs = []
+    for index, size in enumerate(sizes):
+        cropped = _cropped_clip(shared, image_size, size, duration)
+        final = _add_overlays(
+            cropped, video_folder, file_id, watermark, size=size, cues=cues, cue_words=cue_words,
+            profiler=profiler, streaming=streaming, suffix=f"_{format_size(size)}")
+        outputs.append((_output_path(video_folder, file_id, size, index == 0), final))
+
+    if logger:
+        logger.info(
+            f"Rendering {len(outputs)} sizes in one pass: {', '.join(format_size(s) for s in sizes)}.")
+    _write_outputs(outputs, build_audio, video_folder, file_id, duration, poster_time=poster_time,
+                   proxy=proxy, profiler=profiler)
+    return [path for path, _ in outputs]
+
+
+def _close_writers(writers):
+    """
+    Closes every writer, even when some fail, so no ffmpeg process is left running.
+
+    Returns:
+        Exception | None: The first error, to raise unless another error is already raised.
+    """
+    first_error = None
+    for writer in writers:
+        try:
+            writer.close()
+        except Exception as e:
+            first_error = first_error or e
+    return first_error
+
+
+def _write_outputs(outputs, build_audio, video_folder, file_id, duration, poster_time=None,
+                   proxy=False, profiler=None):
+    """
+    Mixes the audio track once, then encodes the frames of every (path, clip) output as a
+    faststart MP4. The poster frame and the proxy of the first output are encoded from the same
+    frames by its ffmpeg process.
+    """
+    audio_path = os.path.join(video_folder, f"{file_id}_final_audio.mp3")
+    audio = build_audio()
+    audio = audio.with_duration(min(duration, audio.duration))
+    with profiler.encoding("write_audiofile") if profiler else nullcontext():
+        audio.write_audiofile(audio_path, fps=44100, codec="libmp3lame", logger=None)
+
+    writers = [
+        DeliveryWriter(path, final.size, FPS, audiofile=audio_path,
+                       poster_time=poster_time if index == 0 else None,
+                       proxy=proxy and index == 0, ffmpeg_binary=FFMPEG_BINARY)
+        for index, (path, final) in enumerate(outputs)
+    ]
+    try:
+        with profiler.encoding() if profiler else nullcontext():
+            for frame_index in range(_frame_count(duration)):
+                t = frame_index / FPS
+                for (_, final), writer in zip(outputs, writers):
+                    frame = final.get_frame(t)
+                    if frame.dtype != np.uint8:
+                        frame = frame.astype(np.uint8)
+                    writer.write_frame(frame)
+    finally:
+        error = _close_writers(writers)
+        os.remove(audio_path)
+    if error:
+        raise error
+
+
+def _poster_time(windows, cues, duration, poster_cue=None):
+    """
+    Picks the time of the poster frame: the middle of the selected cue (1-based), or else of
+    the time the first image is shown alone.
+    """
+    if poster_cue:
+        start, end = cues[poster_cue - 1][:2]
+    elif len(windows) > 1 and windows[1][1] > 0:
+        start, end = 0.0, windows[1][1]
+    else:
+        start, end = 0.0, duration
+    return max(min((start + end) / 2, duration - 1.0 / FPS), 0.0)
+
+
+def _desired_duration(cues, video_duration, max_duration):
+    """
+    Computes the final duration of the video.
+    """
     # Get the end time of the last subtitle cue.
     if cues:
         last_subtitle_end = cues[-1][1]
@@ -139,11 +483,309 @@ def assemble_video(video_folder, file_id, cues, background_music_path=None, max_
     desired_duration = max(video_duration, last_subtitle_end)
     if max_duration is not None:
         desired_duration = min(desired_duration, max_duration)
+    return desired_duration
+
+
+def _file_digest(path):
+    """
+    Returns the SHA-256 digest of a file, cached by path, size and modification time.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _DIGEST_CACHE:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        _DIGEST_CACHE[key] = digest.hexdigest()
+    return _DIGEST_CACHE[key]
+
 
-    final = final.with_duration(desired_duration)
+def _fingerprint(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
 
-    # Export the final video
+
+def _frame_count(duration, fps=FPS):
+    """
+    Returns the number of frames of a video of the given duration, the same for full and
+    incremental renders.
+    """
+    return int(round(duration * fps))
+
+
+def _segment_bounds(windows, duration, fps):
+    """
+    Splits the timeline at image boundaries (and at least every MAX_SEGMENT_SECONDS) into
+    segments given as (first, last) frame indices, last excluded, so the encoded segments join
+    without losing frames.
+    """
+    frame_count = _frame_count(duration, fps)
+    cuts = {0, frame_count}
+    for _, start, _ in windows[1:]:
+        cuts.add(int(round(start * fps)))
+    cuts = sorted(c for c in cuts if 0 <= c <= frame_count)
+
+    max_frames = int(MAX_SEGMENT_SECONDS * fps)
+    bounds = []
+    for first, last in zip(cuts, cuts[1:]):
+        while last - first > max_frames:
+            bounds.append((first, first + max_frames))
+            first += max_frames
+        if last > first:
+            bounds.append((first, last))
+    if sum(last - first for first, last in bounds) != frame_count:
+        raise RuntimeError(f"The segments do not cover the {frame_count} frames of the video.")
+    return bounds
+
+
+def _count_frames(path):
+    """
+    Counts the video frames of a file from its packets (one framecrc line each), without
+    decoding them.
+    """
+    result = subprocess.run(
+        [FFMPEG_BINARY, "-v", "error", "-i", path, "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"],
+        capture_output=True, text=True, check=True)
+    return sum(1 for line in result.stdout.splitlines() if line and not line.startswith("#"))
+
+
+def _write_incremental(final, build_audio, audio_inputs, video_folder, file_id, cues, windows,
+                       watermark, duration, output_path, cue_words=None, profiler=None, streaming=False,
+                       ducking=False, logger=None):
+    """
+    Encodes the video as independent segments, re-encoding only the segments whose inputs
+    changed since the last render, and stitches them with the audio track without re-encoding.
+    """
+    segment_dir = os.path.join(video_folder, "segments")
+    os.makedirs(segment_dir, exist_ok=True)
+
+    common = {
+        "version": RENDER_VERSION,
+        "size": VIDEO_SIZE,
+        "fps": FPS,
+        "font": _file_digest(FONT_PATH),
+        "zoom_rate": ZOOM_RATE,
+        "fade": FADE_DURATION,
+        "subtitle_position": SUBTITLE_POSITION,
+        "watermark": watermark,
+    }
+    if cue_words:
+        common["karaoke_highlight"] = KARAOKE_HIGHLIGHT_COLOR
+    elif streaming:
+        # Streaming renders draw plain subtitles with the layout renderer
+        common["subtitle_renderer"] = "layout"
+    image_digests = {
+        n: _file_digest(_image_path(video_folder, file_id, n)) for n, _, _ in windows
+    }
+
+    segment_paths = []
+    reused = 0
+    frame_count = _frame_count(duration)
+    for index, (first, last) in enumerate(_segment_bounds(windows, duration, FPS)):
+        start, end = first / FPS, last / FPS
+        visible = [i for i, cue in enumerate(cues) if cue[0] < end and cue[1] > start]
+        segment_inputs = {
+            **common,
+            "frames": [first, last],
+            "images": [(n, s, e, image_digests[n]) for n, s, e in windows if s < end and e > start],
+            "cues": [cues[i] for i in visible],
+        }
+        if cue_words:
+            segment_inputs["words"] = [cue_words[i] for i in visible]
+        fingerprint = _fingerprint(segment_inputs)
+        segment_path = os.path.join(
+            segment_dir, f"seg_{index:04d}_{fingerprint[:16]}.mp4")
+        if os.path.exists(segment_path):
+            reused += 1
+        else:
+            partial_path = segment_path[:-len(".mp4")] + ".part.mp4"
+            # Exactly last - first frames, at the same times as a full render
+            writer = DeliveryWriter(partial_path, final.size, FPS, ffmpeg_binary=FFMPEG_BINARY)
+            try:
+                with profiler.encoding() if profiler else nullcontext():
+                    for frame_index in range(first, last):
+                        frame = final.get_frame(frame_index / FPS)
+                        if frame.dtype != np.uint8:
+                            frame = frame.astype(np.uint8)
+                        writer.write_frame(frame)
+            finally:
+                error = _close_writers([writer])
+            if error:
+                raise error
+            os.replace(partial_path, segment_path)
+        segment_paths.append(segment_path)
+
+    audio_fingerprint = _fingerprint({
+        "inputs": [_file_digest(path) for path in audio_inputs],
+        "music_diff": BACKGROUND_MUSIC_DIFF,
+        "ducking": ducking,
+        "duration": duration,
+    })
+    audio_file = os.path.join(
+        segment_dir, f"audio_{audio_fingerprint[:16]}.m4a")
+    if os.path.exists(audio_file):
+        reused += 1
+    else:
+        audio = build_audio()
+        audio = audio.with_duration(min(duration, audio.duration))
+        with profiler.encoding("write_audiofile") if profiler else nullcontext():
+            audio.write_audiofile(audio_file, fps=44100,
+                                  codec="aac", logger=None)
+    segment_paths.append(audio_file)
+
+    if logger:
+        logger.info(
+            f"Incremental render: reused {reused} of {len(segment_paths)} cached segments.")
+
+    # Drop segments left over from previous renders
+    keep = set(segment_paths)
+    for name in os.listdir(segment_dir):
+        path = os.path.join(segment_dir, name)
+        if path not in keep and name != "segments.txt":
+            os.remove(path)
+
+    list_path = os.path.join(segment_dir, "segments.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths[:-1]:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+
+    subprocess.run([
+        FFMPEG_BINARY, "-y", "-loglevel", "error",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-i", audio_file,
+        "-map", "0:v", "-map", "1:a",
+        "-c", "copy",
+        "-movflags", "+faststart",
+        output_path
+    ], check=True)
+    written = _count_frames(output_path)
+    if written != frame_count:
+        raise RuntimeError(
+            f"The incremental render has {written} frames instead of {frame_count}.")
+
+    return output_path
+
+
+def assemble_video(video_folder, file_id, cues, background_music_path=None, max_duration=None, watermark=None,
+                   incremental=False, cue_words=None, profile=False, streaming=False, output_sizes=None,
+                   scenes=None, ducking=False, poster_cue=None, proxy=False, logger=None):
+    """
+    Assembles a final video by combining narration audio, images, subtitles, and optional background music.
+    Optionally adds a textual watermark if 'watermark' is provided.
+
+    The video is written with its index at the start (faststart) for web playback, and a poster
+    frame is saved next to it as <id>_final_poster.jpg, encoded from the same frames.
+
+    Args:
+        video_folder (str): The directory where video assets are stored.
+        file_id (str): The unique identifier for the video.
+        cues (list): Subtitle cues defining the timing of text overlays.
+        background_music_path (str, optional): Path to the background music file. Defaults to None.
+        max_duration (float, optional): The maximum allowed duration for the video.
+        watermark (str, optional): Optional text to overlay as a watermark. Defaults to None.
+        incremental (bool): Encode the video as fingerprinted segments kept in the video folder,
+                            so that a later render only re-encodes the segments whose image,
+                            subtitles, font or effects changed.
+        cue_words (list[list[tuple]], optional): The timed words of each cue. When given, the
+                                                 subtitles highlight the word being spoken.
+        profile (bool): Time every layer of every frame, the audio mix and the encoder, and write
+                        a flamegraph-compatible profile, per-frame timings and a summary table
+                        to the video folder.
+        streaming (bool): Keep memory use flat however long the video is: images are decoded
+                          only while on screen, and the background music is mixed block by
+                          block instead of being loaded and looped in memory.
+        output_sizes (list[tuple[int, int]], optional): Sizes to render in a single pass, each
+                                                        cropped from the center of the images.
+                                                        The first is saved as <id>_final.mp4,
+                                                        the others as <id>_final_<W>x<H>.mp4.
+                                                        Defaults to 1080x1920 only. Sizes the
+                                                        images are too small for are rejected.
+        scenes (list[dict], optional): The scene plan of the images (see plan_scenes). Without
+                                       it, each image covers two cues.
+        ducking (bool): Lower the background music while the narration speaks and raise it in
+                        its pauses, instead of applying one gain to the whole track.
+        poster_cue (int, optional): The cue (1-based) whose middle frame is the poster. Defaults
+                                    to the middle of the time the first image is shown alone.
+        proxy (bool): Also write a low-resolution review copy, <id>_final_proxy.mp4, in the
+                      same encode pass. Not available for incremental renders.
+        logger: Logger instance for logging.
+
+    Returns:
+        str: The path to the final video file (of the first size).
+
+    Raises:
+        ValueError: If the images are too small for an output size.
+    """
+
+    # Load narration audio
+    audio_path = os.path.join(video_folder, f"{file_id}.mp3")
+    with AudioFileClip(audio_path) as narration_audio:
+        video_duration = narration_audio.duration
+
+    profiler = RenderProfiler() if profile else None
+    windows = image_windows(cues, video_duration, scenes=scenes)
+    desired_duration = _desired_duration(cues, video_duration, max_duration)
     output_path = os.path.join(video_folder, f"{file_id}_final.mp4")
-    final.write_videofile(output_path, fps=24)
+    sizes = [tuple(size) for size in output_sizes or [VIDEO_SIZE]]
+    # Sizes are cropped from the images as generated, whatever sizes they were generated for
+    image_size = _image_size(video_folder, file_id)
+    _check_sizes(image_size, sizes)
+    if poster_cue and not 1 <= poster_cue <= len(cues):
+        if logger:
+            logger.warning(f"There is no cue {poster_cue}; using the first image as poster.")
+        poster_cue = None
+    poster_time = _poster_time(windows, cues, desired_duration, poster_cue=poster_cue)
+    delivery_files = [poster_path(output_path)] + ([proxy_path(output_path)] if proxy else [])
+
+    def build_audio():
+        return _build_audio(audio_path, background_music_path, video_folder,
+                            profiler=profiler, streaming=streaming, ducking=ducking)
+
+    if sizes != [VIDEO_SIZE] or image_size != VIDEO_SIZE:
+        # Images generated at a master size are cropped for every output size
+        if incremental and logger:
+            logger.info(
+                "Incremental rendering is not available for videos cropped from their images; rendering every size.")
+        video = _build_images(video_folder, file_id, windows, size=image_size,
+                              profiler=profiler, streaming=streaming)
+        output_paths = _write_sizes(
+            video, build_audio, video_folder, file_id, sizes, watermark, desired_duration, cues,
+            cue_words=cue_words, profiler=profiler, streaming=streaming, poster_time=poster_time,
+            proxy=proxy, logger=logger
+        )
+        output_path = output_paths[0]
+        if logger:
+            logger.info(f"Videos saved as {', '.join(output_paths)}.")
+    elif incremental:
+        final = _build_video(video_folder, file_id, windows, watermark,
+                             cues=cues, cue_words=cue_words, profiler=profiler, streaming=streaming)
+        audio_inputs = [audio_path] + \
+            ([background_music_path] if background_music_path else [])
+        _write_incremental(
+            final, build_audio, audio_inputs, video_folder, file_id, cues, windows,
+            watermark, desired_duration, output_path, cue_words=cue_words, profiler=profiler,
+            streaming=streaming, ducking=ducking, logger=logger
+        )
+        # Reused segments are not decoded again: seek to the poster frame in the final video
+        extract_poster(output_path, poster_time, ffmpeg_binary=FFMPEG_BINARY)
+        if proxy:
+            delivery_files.remove(proxy_path(output_path))
+            if logger:
+                logger.info("Proxy renditions are not available for incremental renders.")
+    else:
+        final = _build_video(video_folder, file_id, windows, watermark,
+                             cues=cues, cue_words=cue_words, profiler=profiler, streaming=streaming)
+        final = final.with_duration(desired_duration)
+        _write_outputs([(output_path, final)], build_audio, video_folder, file_id,
+                       desired_duration, poster_time=poster_time, proxy=proxy, profiler=profiler)
+
+    if logger:
+        logger.info(f"Delivery files saved as {', '.join(delivery_files)}.")
+
+    if profiler:
+        profile_files = profiler.save(video_folder, file_id)
+        if logger:
+            logger.info(f"Render profile:\n{profiler.summary()}")
+            logger.info(f"Render profile saved as {', '.join(profile_files)}.")
 
     return output_path
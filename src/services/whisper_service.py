@@ -1,4 +1,5 @@
 from openai import OpenAI
+from utils.transcription_audio import MAX_UPLOAD_BYTES, transcribe_in_chunks
 
 
 class WhisperService:
@@ -12,19 +13,30 @@ class WhisperService:
         """
         self.client = OpenAI(api_key=api_key)
 
-    def transcribe_audio(self, audio_file_path: str):
+    def _transcribe_upload(self, upload):
+        return self.client.audio.transcriptions.create(
+            model="whisper-1",
+            file=upload,
+            response_format="verbose_json",
+            # request word-level timestamps
+            timestamp_granularities=["word"]
+        )
+
+    def transcribe_audio(self, audio_file_path: str, max_upload_bytes: int = MAX_UPLOAD_BYTES,
+                         max_workers: int = 4):
         """
         Transcribe the provided audio file into a verbose JSON format with word-level timestamps.
+
+        The audio is uploaded as 16 kHz mono Opus encoded in memory; audio still over the upload
+        limit is split into overlapping chunks transcribed in parallel, whose words are merged
+        with their timestamps shifted to the whole file.
         """
         try:
-            with open(audio_file_path, "rb") as audio_file:
-                transcription = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    response_format="verbose_json",
-                    # request word-level timestamps
-                    timestamp_granularities=["word"]
-                )
-            return transcription
+            return transcribe_in_chunks(
+                audio_file_path,
+                self._transcribe_upload,
+                max_bytes=max_upload_bytes,
+                max_workers=max_workers
+            )
         except Exception as e:
             raise RuntimeError(f"Error transcribing audio: {e}")
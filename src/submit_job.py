@@ -0,0 +1,37 @@
+from parsers.arguments import parse_args, parse_submit_args
+from utils.job_queue import JobQueue
+from utils.logger import setup_logger
+
+
+def main():
+    """
+    Queues a video job for the distributed workers (see worker.py), or lists the queued jobs.
+    - Takes the same options as main.py, validated before queueing.
+    - Prints the job ID, which is also the name of its output folder.
+    """
+    logger = setup_logger()
+    args, pipeline_argv = parse_submit_args()
+    job_queue = JobQueue(args.queue)
+
+    if args.list:
+        for job in job_queue.list():
+            line = f"{job['id']}  {job['stage']:<8}  {job['status']:<9}  priority {job['priority']}"
+            if job["worker"]:
+                line += f"  worker {job['worker']}"
+            if job["error"]:
+                line += f"  error: {job['error']}"
+            if job["final_video"]:
+                line += f"  {job['final_video']}"
+            print(line)
+        return
+
+    # Exits with a usage error if the options are not valid
+    parse_args(pipeline_argv)
+    job = job_queue.submit(pipeline_argv, priority=args.priority,
+                           max_attempts=args.max_attempts)
+    logger.info(f"Queued job {job['id']} with priority {job['priority']}.")
+    print(job["id"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from utils.option_defaults import RETENTION_POLICIES
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where files are not deduplicated
+    fcntl = None
+
+DEFAULT_STORE_DIR = "output/.store"
+OBJECTS_DIR = "objects"
+DERIVED_DIR = "derived"
+# The files of the video folders cloned from the objects, with the state they were cloned in
+CLONES_INDEX = "clones.json"
+# Locked by the processes updating the index (the index itself is replaced on every save)
+CLONES_LOCK = "clones.lock"
+# ioctl cloning a file's data copy-on-write (Linux FICLONE)
+FICLONE = 0x40049409
+# Derived artifacts (e.g. volume-adjusted music) unused for this long are collected
+DERIVED_MAX_AGE_DAYS = 30
+
+# Files of a video folder whose data is shared with identical files of other folders
+DEDUPLICATED_FILES = ["{id}.mp3", "{id}_img_*.png"]
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def file_digest(path):
+    """
+    Returns the SHA-256 of a file's content, read in blocks.
+    """
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _reflink(source, destination):
+    """
+    Creates destination as a copy-on-write clone of source: both share their data blocks until
+    either is written to (Btrfs, XFS, bcachefs, ...).
+
+    Raises:
+        OSError: If the filesystem cannot clone files.
+    """
+    if fcntl is None:
+        raise OSError("Cloning files is not supported on this platform.")
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+class ArtifactStore:
+    """
+    A content-addressed store of the artifacts of the video folders.
+
+    Objects are named after the SHA-256 of their content. Identical files of the video folders
+    (e.g. a library image reused by several videos) are replaced by copy-on-write clones of one
+    object, so their data takes space once. Clones are independent files: overwriting one,
+    even in place, never changes the object or the other videos. On filesystems that cannot
+    clone files, nothing is deduplicated. An object no clone refers to anymore is garbage.
+    Derived artifacts, such as the background music adjusted to a narration level, are cached
+    under a key of their inputs.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        """
+        Args:
+            root (str): Directory of the store, on the same filesystem as the video folders.
+        """
+        self.root = root
+        self._lock = threading.Lock()
+        self._reflinks = None
+        self._clones = {}
+        # Objects a dry run would have stored, so later duplicates are reported
+        self._dry_run_objects = set()
+
+    def _object_path(self, digest, extension):
+        return os.path.join(self.root, OBJECTS_DIR, digest[:2], digest + extension)
+
+    def supports_reflinks(self):
+        """
+        Whether the filesystem of the store can clone files, checked once.
+        """
+        if self._reflinks is None:
+            os.makedirs(self.root, exist_ok=True)
+            probe = os.path.join(self.root, f".reflink.{os.getpid()}.{threading.get_ident()}")
+            try:
+                with open(probe, "wb") as f:
+                    f.write(b"probe")
+                _reflink(probe, probe + ".clone")
+                self._reflinks = True
+            except OSError:
+                self._reflinks = False
+            finally:
+                for path in (probe, probe + ".clone"):
+                    if os.path.exists(path):
+                        os.remove(path)
+        return self._reflinks
+
+    @contextmanager
+    def _locked(self):
+        """
+        Holds the index of clones for the threads of this process and, with an exclusive
+        flock, for the other processes (workers) sharing the store, from loading it to saving
+        it.
+        """
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, CLONES_LOCK), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_clones(self):
+        """
+        Returns the index of clones ({path: [object, mtime_ns, size]}), read again as other
+        processes may have changed it. Call with _locked held.
+        """
+        path = os.path.join(self.root, CLONES_INDEX)
+        self._clones = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._clones = json.load(f)
+        return self._clones
+
+    def _save_clones(self):
+        path = os.path.join(self.root, CLONES_INDEX)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self._clones, f)
+        os.replace(temporary, path)
+
+    def is_clone(self, path):
+        """
+        Whether a file still shares its data with an object (it was not replaced since).
+        """
+        with self._locked():
+            entry = self._load_clones().get(os.path.abspath(path))
+        if entry is None:
+            return False
+        stat = os.stat(path)
+        return entry[1:] == [stat.st_mtime_ns, stat.st_size]
+
+    def add(self, path, dry_run=False):
+        """
+        Stores a file as a clone, or replaces it with a clone of the stored copy if the content
+        is already stored.
+
+        Args:
+            path (str): Path to the file.
+            dry_run (bool): Only report what would be saved.
+
+        Returns:
+            int: Bytes saved by deduplicating the file (0 if it was new, already a clone, or
+                 the filesystem cannot clone files).
+        """
+        if self.is_clone(path) or not self.supports_reflinks():
+            return 0
+        digest = file_digest(path)
+        stored = self._object_path(digest, os.path.splitext(path)[1])
+        size = os.path.getsize(path)
+        with self._locked():
+            if dry_run:
+                if stored in self._dry_run_objects or os.path.exists(stored):
+                    return size
+                self._dry_run_objects.add(stored)
+                return 0
+            os.makedirs(os.path.dirname(stored), exist_ok=True)
+            if os.path.exists(stored):
+                # Clone beside the file then rename over it, so it is never missing
+                temporary = path + ".clone.tmp"
+                _reflink(stored, temporary)
+                os.replace(temporary, path)
+                saved = size
+            else:
+                _reflink(path, stored)
+                saved = 0
+            stat = os.stat(path)
+            self._load_clones()[os.path.abspath(path)] = [
+                os.path.relpath(stored, self.root), stat.st_mtime_ns, stat.st_size]
+            self._save_clones()
+            return saved
+
+    def derived_path(self, key, extension):
+        """
+        Returns where the derived artifact of a key is (or would be) stored.
+
+        Args:
+            key (str): Identifies the inputs of the artifact (see derived_key).
+            extension (str): The file extension, with its dot.
+        """
+        return os.path.join(self.root, DERIVED_DIR, key[:2], key + extension)
+
+    def lookup_derived(self, key, extension):
+        """
+        Returns the path of a cached derived artifact, or None; a hit refreshes its age.
+        """
+        path = self.derived_path(key, extension)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return path
+
+    def collect(self, max_derived_age_days=DERIVED_MAX_AGE_DAYS, dry_run=False):
+        """
+        Deletes the objects no clone refers to anymore (their files were deleted or replaced)
+        and the derived artifacts unused for max_derived_age_days.
+
+        Returns:
+            int: Bytes reclaimed.
+        """
+        reclaimed = 0
+        with self._locked():
+            clones = self._load_clones()
+            referenced = set()
+            for path, (name, mtime_ns, size) in list(clones.items()):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    stat = None
+                if stat is not None and [stat.st_mtime_ns, stat.st_size] == [mtime_ns, size]:
+                    referenced.add(name)
+                elif not dry_run:
+                    del clones[path]
+            if not dry_run and os.path.exists(os.path.join(self.root, CLONES_INDEX)):
+                self._save_clones()
+
+            for directory, _, names in os.walk(os.path.join(self.root, OBJECTS_DIR)):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    if os.path.relpath(path, self.root) not in referenced:
+                        reclaimed += os.path.getsize(path)
+                        if not dry_run:
+                            os.remove(path)
+
+        oldest = time.time() - max_derived_age_days * 86400
+        for directory, _, names in os.walk(os.path.join(self.root, DERIVED_DIR)):
+            for name in names:
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                if stat.st_mtime < oldest:
+                    reclaimed += stat.st_size
+                    if not dry_run:
+                        os.remove(path)
+        return reclaimed
+
+
+def derived_key(*parts):
+    """
+    Builds the key of a derived artifact from its inputs (digests, parameters).
+    """
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def get_artifact_store(root=DEFAULT_STORE_DIR):
+    """
+    Returns the store of a directory, shared by the jobs of the process.
+    """
+    key = os.path.abspath(root)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ArtifactStore(root)
+        return _stores[key]
+
+
+def verify_video(path, ffmpeg_binary="ffmpeg"):
+    """
+    Checks that a video file is complete: it has a video stream and all its packets can be
+    read (a truncated MP4 or one without index fails), without decoding it.
+
+    Returns:
+        bool: Whether the video is valid.
+    """
+    if not os.path.isfile(path) or not os.path.getsize(path):
+        return False
+    result = subprocess.run(
+        [ffmpeg_binary, "-v", "error", "-i", path, "-map", "0:v:0", "-c", "copy", "-f", "null", "-"],
+        capture_output=True)
+    return result.returncode == 0 and not result.stderr.strip()
+
+
+def _matching(video_folder, file_id, patterns):
+    patterns = [pattern.format(id=file_id) for pattern in patterns]
+    return [
+        os.path.join(video_folder, name) for name in sorted(os.listdir(video_folder))
+        if os.path.isfile(os.path.join(video_folder, name))
+        and any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+    ]
+
+
+def _tree_size(path):
+    return sum(os.path.getsize(os.path.join(directory, name))
+               for directory, _, names in os.walk(path) for name in names)
+
+
+def apply_retention(video_folder, file_id, policy="sources", store=None, dry_run=False,
+                    ffmpeg_binary="ffmpeg", logger=None):
+    """
+    Cleans a video folder once its final video is verified: deletes the files of the retention
+    policy and deduplicates the remaining files of DEDUPLICATED_FILES through the store.
+
+    Args:
+        video_folder (str): The directory of the video.
+        file_id (str): Identifier of the video.
+        policy (str): A key of RETENTION_POLICIES.
+        store (ArtifactStore, optional): The store deduplicating files. Defaults to the
+                                         store of DEFAULT_STORE_DIR.
+        dry_run (bool): Only report what would be reclaimed.
+        ffmpeg_binary (str): The ffmpeg executable.
+        logger: Logger instance for logging.
+
+    Returns:
+        dict: "verified" (bool), "deleted_bytes" and "deduplicated_bytes".
+    """
+    report = {"verified": False, "deleted_bytes": 0, "deduplicated_bytes": 0}
+    if not verify_video(os.path.join(video_folder, f"{file_id}_final.mp4"), ffmpeg_binary):
+        if logger:
+            logger.warning(f"The final video of {video_folder} is missing or incomplete; "
+                           f"keeping all its files.")
+        return report
+    report["verified"] = True
+    store = store if store is not None else get_artifact_store()
+
+    patterns, cache_dirs = RETENTION_POLICIES[policy]
+    for path in _matching(video_folder, file_id, patterns):
+        # The data of a clone is freed when its object is collected
+        if not store.is_clone(path):
+            report["deleted_bytes"] += os.path.getsize(path)
+        if not dry_run:
+            os.remove(path)
+    for name in cache_dirs:
+        path = os.path.join(video_folder, name)
+        if os.path.isdir(path):
+            report["deleted_bytes"] += _tree_size(path)
+            if not dry_run:
+                shutil.rmtree(path)
+
+    deleted = set(_matching(video_folder, file_id, patterns)) if dry_run else set()
+    for path in _matching(video_folder, file_id, DEDUPLICATED_FILES):
+        if path not in deleted:
+            report["deduplicated_bytes"] += store.add(path, dry_run=dry_run)
+
+    if logger:
+        logger.info(
+            f"Retention '{policy}' on {video_folder}: {report['deleted_bytes'] / 1e6:.1f} MB deleted, "
+            f"{report['deduplicated_bytes'] / 1e6:.1f} MB deduplicated.")
+    return report
+
+
+def collect_garbage(output_dir="output", policy="sources", store=None, older_than_days=0.0,
+                    dry_run=False, ffmpeg_binary="ffmpeg", logger=None):
+    """
+    Applies a retention policy to every video folder whose final video is verified and older
+    than older_than_days, then deletes the unused objects of the store.
+
+    Args:
+        output_dir (str): The folder containing the video folders.
+        policy (str): A key of RETENTION_POLICIES.
+        store (ArtifactStore, optional): The store. Defaults to <output_dir>/.store.
+        older_than_days (float): Only clean videos rendered at least this long ago.
+        dry_run (bool): Only report what would be reclaimed.
+        ffmpeg_binary (str): The ffmpeg executable.
+        logger: Logger instance for logging.
+
+    Returns:
+        dict: "videos", "cleaned" (verified and old enough), "deleted_bytes",
+              "deduplicated_bytes" and "store_bytes" (reclaimed from the store).
+    """
+    store = store if store is not None else get_artifact_store(os.path.join(output_dir, ".store"))
+    report = {"videos": 0, "cleaned": 0, "deleted_bytes": 0, "deduplicated_bytes": 0,
+              "store_bytes": 0}
+    oldest = time.time() - older_than_days * 86400
+    for name in sorted(os.listdir(output_dir)):
+        video_folder = os.path.join(output_dir, name)
+        final_video = os.path.join(video_folder, f"{name}_final.mp4")
+        if name.startswith(".") or not os.path.isdir(video_folder) or not os.path.exists(final_video):
+            continue
+        report["videos"] += 1
+        if os.path.getmtime(final_video) > oldest:
+            continue
+        folder_report = apply_retention(video_folder, name, policy, store=store, dry_run=dry_run,
+                                        ffmpeg_binary=ffmpeg_binary, logger=logger)
+        report["cleaned"] += folder_report["verified"]
+        report["deleted_bytes"] += folder_report["deleted_bytes"]
+        report["deduplicated_bytes"] += folder_report["deduplicated_bytes"]
+    report["store_bytes"] = store.collect(dry_run=dry_run)
+    return report
@@ -1,6 +1,128 @@
 from pydub import AudioSegment
+from pydub.silence import detect_leading_silence
 from io import BytesIO
+import numpy as np
 import os
+import threading
+
+from utils.artifact_store import derived_key, file_digest
+
+
+def detect_pauses(audio: AudioSegment,
+                  min_pause_ms: int = 300,
+                  silence_threshold: float = -45.0,
+                  frame_ms: int = 10):
+    """
+    Finds the pauses between phrases: runs of silent frames of at least min_pause_ms, not
+    touching the start or the end of the audio.
+
+    Args:
+        audio (AudioSegment): The audio.
+        min_pause_ms (int): Minimum duration of a pause, in milliseconds.
+        silence_threshold (float): Level in dBFS below which a frame is silent.
+        frame_ms (int): Duration of the frames whose level is measured, in milliseconds.
+
+    Returns:
+        np.ndarray: (start, end) sample indices of every pause, shape (n, 2).
+    """
+    frame = max(1, audio.frame_rate * frame_ms // 1000)
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32).reshape(-1, audio.channels)
+    count = len(samples) // frame
+    if count == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    frames = samples[:count * frame].reshape(count, -1)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1)) / audio.max_possible_amplitude
+    silent = 20 * np.log10(np.maximum(rms, 1e-10)) < silence_threshold
+
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = (starts > 0) & (ends < count) & ((ends - starts) * frame_ms >= min_pause_ms)
+    return np.stack([starts[keep], ends[keep]], axis=1).astype(np.int64) * frame
+
+
+def shorten_pauses(audio: AudioSegment,
+                   excess_ms: float,
+                   floor_ms: int = 250,
+                   min_pause_ms: int = 300,
+                   silence_threshold: float = -45.0):
+    """
+    Shortens the pauses between phrases to remove up to excess_ms of audio.
+
+    The longest pauses are shortened first, all down to the same length, which never goes
+    below floor_ms; each pause is cut in its middle so the breath before and after it is kept.
+
+    Args:
+        audio (AudioSegment): The audio.
+        excess_ms (float): Duration to remove, in milliseconds.
+        floor_ms (int): Minimum duration of a shortened pause, in milliseconds.
+        min_pause_ms (int): Minimum duration of a pause, in milliseconds.
+        silence_threshold (float): Level in dBFS below which audio is silent.
+
+    Returns:
+        tuple[AudioSegment, list[tuple[float, float]]]: The shortened audio and the time map
+        from the original audio to it, as (original_seconds, new_seconds) breakpoints.
+    """
+    rate = audio.frame_rate
+    total = int(audio.frame_count())
+    identity = [(0.0, 0.0), (total / rate, total / rate)]
+    pauses = detect_pauses(audio, min_pause_ms, silence_threshold)
+    lengths = pauses[:, 1] - pauses[:, 0]
+    floor = int(rate * floor_ms / 1000)
+    excess = int(rate * excess_ms / 1000)
+    if excess <= 0 or not np.any(lengths > floor):
+        return audio, identity
+
+    # Shorten the pauses longer than a common level until the excess is removed: the level is
+    # found by bisection, since the removed duration decreases with it
+    if np.sum(np.maximum(lengths - floor, 0)) <= excess:
+        level = floor
+    else:
+        low, high = float(floor), float(lengths.max())
+        for _ in range(50):
+            level = (low + high) / 2
+            if np.sum(np.maximum(lengths - level, 0)) > excess:
+                low = level
+            else:
+                high = level
+        level = high
+    removed = np.maximum(lengths - np.ceil(level), 0).astype(np.int64)
+    cut_starts = pauses[:, 0] + (lengths - removed) // 2
+    cut_ends = cut_starts + removed
+    cut = removed > 0
+    cut_starts, cut_ends, removed = cut_starts[cut], cut_ends[cut], removed[cut]
+
+    samples = np.array(audio.get_array_of_samples()).reshape(-1, audio.channels)
+    keep = np.ones(len(samples), dtype=bool)
+    for start, end in zip(cut_starts, cut_ends):
+        keep[start:end] = False
+    shortened = audio._spawn(samples[keep].tobytes())
+
+    # Every cut maps its whole span to a single point of the shortened audio
+    removed_before = np.concatenate(([0], np.cumsum(removed)[:-1]))
+    time_map = [(0.0, 0.0)]
+    for start, end, before in zip(cut_starts, cut_ends, removed_before):
+        time_map.append((start / rate, (start - before) / rate))
+        time_map.append((end / rate, (start - before) / rate))
+    time_map.append((total / rate, (total - int(removed.sum())) / rate))
+    return shortened, time_map
+
+
+def remap_time(time_map, seconds):
+    """
+    Maps a time of the original audio to the processed audio.
+
+    Args:
+        time_map (list[tuple[float, float]]): (original_seconds, new_seconds) breakpoints, as
+                                              returned by reprocess_audio.
+        seconds (float | np.ndarray): Time(s) in the original audio.
+
+    Returns:
+        float | np.ndarray: Time(s) in the processed audio.
+    """
+    original, new = zip(*time_map)
+    mapped = np.interp(seconds, original, new)
+    return float(mapped) if np.ndim(mapped) == 0 else mapped
 
 
 def reprocess_audio(audio_data: bytes,
@@ -8,7 +130,12 @@ def reprocess_audio(audio_data: bytes,
                     speedup_chunk: int = 150,
                     speedup_crossfade: int = 25,
                     target_bitrate: str = "320k",
-                    logger=None) -> bytes:
+                    compress_pauses: bool = False,
+                    pause_floor_ms: int = 250,
+                    min_pause_ms: int = 300,
+                    silence_threshold: float = -45.0,
+                    return_time_map: bool = False,
+                    logger=None):
     """
     Reprocess the audio to optionally adjust duration and export with a specified bitrate.
 
@@ -19,32 +146,63 @@ def reprocess_audio(audio_data: bytes,
         speedup_chunk (int): Chunk size parameter for the speedup function.
         speedup_crossfade (int): Crossfade parameter for smoothing transitions in speedup.
         target_bitrate (str): Desired MP3 bitrate (e.g., "320k" for higher quality).
+        compress_pauses (bool): Whether to shorten the pauses between phrases before speeding
+                                up, so only the remaining excess is removed by speeding up.
+        pause_floor_ms (int): Minimum duration of a shortened pause, in milliseconds.
+        min_pause_ms (int): Minimum duration of a silence considered a pause, in milliseconds.
+        silence_threshold (float): Level in dBFS below which audio is silent.
+        return_time_map (bool): Whether to also return the time map from the original audio
+                                to the processed audio.
         logger: Logger instance for logging.
 
     Returns:
-        bytes: The processed audio data in MP3 format.
+        bytes: The processed audio data in MP3 format, or a tuple of it and the time map as
+               (original_seconds, new_seconds) breakpoints if return_time_map is set.
     """
     # Load the audio from the byte stream
     audio = AudioSegment.from_file(BytesIO(audio_data), format="mp3")
+    original_duration = len(audio) / 1000.0
+    time_map = [(0.0, 0.0), (original_duration, original_duration)]
+
+    def result(data):
+        return (data, time_map) if return_time_map else data
 
     # If max_duration is defined, check the duration and speed up if necessary
     if max_duration is not None:
         # Convert milliseconds to seconds
         current_duration = len(audio) / 1000.0
+        if current_duration > max_duration:
+            if compress_pauses:
+                audio, time_map = shorten_pauses(
+                    audio,
+                    excess_ms=(current_duration - max_duration) * 1000,
+                    floor_ms=pause_floor_ms,
+                    min_pause_ms=min_pause_ms,
+                    silence_threshold=silence_threshold
+                )
+                shortened_duration = len(audio) / 1000.0
+                if logger:
+                    logger.info(f"Shortened pauses by {current_duration - shortened_duration:.2f} seconds "
+                                f"({(len(time_map) - 2) // 2} pauses).")
+                current_duration = shortened_duration
         if current_duration > max_duration:
             speed_factor = current_duration / max_duration
             if logger:
                 logger.info(f"Current duration {current_duration} exceeds max duration {max_duration}. "
                             f"Speeding up by a factor of {speed_factor}.")
             # Adjust playback speed with chunking and crossfade for smoother transitions
-            audio = audio.speedup(
+            sped_up = audio.speedup(
                 playback_speed=speed_factor,
                 chunk_size=speedup_chunk,
                 crossfade=speedup_crossfade
             )
-        else:
+            # The chunked speedup is uniform, but not exactly by speed_factor
+            actual_factor = len(audio) / len(sped_up)
+            time_map = [(original, new / actual_factor) for original, new in time_map]
+            audio = sped_up
+        elif current_duration == original_duration:
             # If no processing is needed, return the original data
-            return audio_data
+            return result(audio_data)
 
     # Re-export the audio with the specified bitrate
     output_data = BytesIO()
@@ -52,10 +210,11 @@ def reprocess_audio(audio_data: bytes,
                  parameters=["-b:a", target_bitrate])
     output_data.seek(0)
 
-    return output_data.read()
+    return result(output_data.read())
 
 
-def adjust_background_music_volume(narration_path: str, bg_music_path: str, target_diff: float = -10.0, output_dir: str = None) -> str:
+def adjust_background_music_volume(narration_path: str, bg_music_path: str, target_diff: float = -10.0, output_dir: str = None,
+                                   store=None) -> str:
     """
     Adjusts the volume of the background music so that it is target_diff dB quieter than the narration.
 
@@ -64,19 +223,39 @@ def adjust_background_music_volume(narration_path: str, bg_music_path: str, targ
         bg_music_path (str): Path to the background music file (MP3).
         target_diff (float): Desired difference in dBFS (default: -10.0 dB, meaning background is 10 dB quieter than narration).
         output_dir (str, optional): Directory to save the adjusted background music file. If not provided, uses the directory of bg_music_path.
+        store (ArtifactStore, optional): Caches the adjusted music by song, narration level and target_diff, so videos with
+                                         the same song and a narration level within half a dB reuse one file instead of
+                                         decoding and encoding the music again. output_dir is then not used.
 
     Returns:
-        str: Path to the adjusted background music audio file (temporary).
+        str: Path to the adjusted background music audio file (temporary, or in the store).
     """
     narration_audio = AudioSegment.from_file(narration_path, format="mp3")
-    bg_music = AudioSegment.from_file(bg_music_path, format="mp3")
-
     narration_dbfs = narration_audio.dBFS
+
+    cache_key = None
+    if store is not None:
+        narration_dbfs = round(narration_dbfs * 2) / 2
+        cache_key = derived_key("adjusted_bg_music", file_digest(bg_music_path), narration_dbfs, target_diff)
+        cached_path = store.lookup_derived(cache_key, ".mp3")
+        if cached_path:
+            return cached_path
+
+    bg_music = AudioSegment.from_file(bg_music_path, format="mp3")
     bg_music_dbfs = bg_music.dBFS
     current_diff = bg_music_dbfs - narration_dbfs
     gain_adjustment = target_diff - current_diff
     adjusted_bg_music = bg_music.apply_gain(gain_adjustment)
 
+    if cache_key is not None:
+        cached_path = store.derived_path(cache_key, ".mp3")
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        # Renders sharing the store may export the same file; each writes its own copy first
+        temp_path = f"{cached_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        adjusted_bg_music.export(temp_path, format="mp3")
+        os.replace(temp_path, cached_path)
+        return cached_path
+
     # Use output_dir if provided; otherwise, use the directory of bg_music_path
     if output_dir is None:
         output_dir = os.path.dirname(bg_music_path)
@@ -84,3 +263,74 @@ def adjust_background_music_volume(narration_path: str, bg_music_path: str, targ
     temp_path = os.path.join(output_dir, "adjusted_bg_music.mp3")
     adjusted_bg_music.export(temp_path, format="mp3")
     return temp_path
+
+
+def _trim_silence(segment: AudioSegment, silence_threshold: float, keep_silence_ms: int) -> AudioSegment:
+    """
+    Trims leading and trailing silence, keeping at most keep_silence_ms on each side.
+    """
+    leading = detect_leading_silence(
+        segment, silence_threshold=silence_threshold)
+    trailing = detect_leading_silence(
+        segment.reverse(), silence_threshold=silence_threshold)
+    start = max(0, leading - keep_silence_ms)
+    end = len(segment) - max(0, trailing - keep_silence_ms)
+    if end <= start:
+        return segment
+    return segment[start:end]
+
+
+def concatenate_audio_chunks(chunks: list,
+                             keep_silence_ms: int = 150,
+                             crossfade_ms: int = 20,
+                             match_loudness: bool = True,
+                             max_gain_db: float = 6.0,
+                             silence_threshold: float = -50.0,
+                             target_bitrate: str = "320k") -> bytes:
+    """
+    Stitches separately synthesized MP3 chunks into a single gapless narration.
+
+    Each chunk is decoded and the encoder padding and silence at its edges are trimmed down to
+    keep_silence_ms, so that the pause between chunks sounds like a natural sentence break
+    instead of a gap. Chunks are optionally gain-matched to the median loudness of all chunks
+    and joined with a short crossfade to avoid clicks at the seams.
+
+    Args:
+        chunks (list[bytes]): The MP3 chunks, in order.
+        keep_silence_ms (int): Silence kept at each edge of a chunk, in milliseconds.
+        crossfade_ms (int): Crossfade between consecutive chunks, in milliseconds.
+        match_loudness (bool): Whether to match the loudness of the chunks.
+        max_gain_db (float): Maximum gain correction applied to a chunk, in dB.
+        silence_threshold (float): Level in dBFS below which audio is considered silence.
+        target_bitrate (str): Desired MP3 bitrate of the result.
+
+    Returns:
+        bytes: The concatenated audio data in MP3 format.
+    """
+    segments = []
+    for chunk in chunks:
+        segment = AudioSegment.from_file(BytesIO(chunk), format="mp3")
+        segments.append(_trim_silence(
+            segment, silence_threshold, keep_silence_ms))
+
+    if match_loudness:
+        levels = sorted(s.dBFS for s in segments if s.dBFS != float("-inf"))
+        if levels:
+            target_dbfs = levels[len(levels) // 2]
+            segments = [
+                s if s.dBFS == float("-inf") else s.apply_gain(
+                    max(-max_gain_db, min(max_gain_db, target_dbfs - s.dBFS)))
+                for s in segments
+            ]
+
+    narration = AudioSegment.empty()
+    for segment in segments:
+        crossfade = min(crossfade_ms, len(narration), len(segment))
+        narration = narration.append(segment, crossfade=crossfade)
+
+    output_data = BytesIO()
+    narration.export(output_data, format="mp3",
+                     parameters=["-b:a", target_bitrate])
+    output_data.seek(0)
+
+    return output_data.read()
@@ -0,0 +1,235 @@
+import math
+import subprocess
+import numpy as np
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+BLOCK_SECONDS = 1.0
+
+# The narration envelope is measured on a mono 16 kHz decode, in 10 ms frames
+ENVELOPE_SAMPLE_RATE = 16000
+ENVELOPE_FRAME_SECONDS = 0.01
+# Frames quieter than the narration's average loudness by more than this are pauses
+SPEECH_THRESHOLD_DB = -20.0
+# How much louder the music gets in the pauses of the narration
+DUCK_DB = 8.0
+# The music is lowered this long before speech starts, and raised again this long after it
+# stops; gain changes are then smoothed over DUCK_SMOOTHING_SECONDS
+DUCK_LOOKAHEAD_SECONDS = 0.2
+DUCK_HOLD_SECONDS = 0.3
+DUCK_SMOOTHING_SECONDS = 0.25
+
+
+def _decoder(path, ffmpeg_binary="ffmpeg", loop=False, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    """
+    Starts an ffmpeg process decoding an audio file to 16-bit PCM on its stdout.
+    """
+    command = [ffmpeg_binary, "-v", "error"]
+    if loop:
+        command += ["-stream_loop", "-1"]
+    command += ["-i", path, "-f", "s16le", "-acodec", "pcm_s16le",
+                "-ar", str(sample_rate), "-ac", str(channels), "-"]
+    return subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+
+def _read_block(process, frames, channels=CHANNELS):
+    """
+    Reads up to `frames` PCM frames from a decoder as floats in [-1, 1).
+    """
+    data = process.stdout.read(frames * channels * 2)
+    samples = np.frombuffer(data[:len(data) - len(data) % (channels * 2)], dtype=np.int16)
+    return samples.reshape(-1, channels).astype(np.float32) / 32768.0
+
+
+def _close(process):
+    process.stdout.close()
+    if process.poll() is None:
+        process.kill()
+    process.wait()
+
+
+def measure_dbfs(path, ffmpeg_binary="ffmpeg", block_seconds=BLOCK_SECONDS):
+    """
+    Measures the loudness of an audio file (RMS in dBFS, as pydub's AudioSegment.dBFS) by
+    decoding it in blocks, without loading the whole file in memory.
+
+    Args:
+        path (str): Path to the audio file.
+        ffmpeg_binary (str): The ffmpeg executable.
+        block_seconds (float): Duration of a decoded block in seconds.
+
+    Returns:
+        float: The loudness in dBFS (-inf for silence).
+    """
+    process = _decoder(path, ffmpeg_binary)
+    frames = int(SAMPLE_RATE * block_seconds)
+    total = 0.0
+    count = 0
+    try:
+        while True:
+            block = _read_block(process, frames)
+            if not len(block):
+                break
+            total += float(np.square(block, dtype=np.float64).sum())
+            count += block.size
+    finally:
+        _close(process)
+    if not count or not total:
+        return -math.inf
+    return 20 * math.log10(math.sqrt(total / count))
+
+
+def narration_envelope(path, ffmpeg_binary="ffmpeg", frame_seconds=ENVELOPE_FRAME_SECONDS,
+                       block_seconds=BLOCK_SECONDS):
+    """
+    Measures the power of an audio file in short frames, decoding it in blocks.
+
+    Args:
+        path (str): Path to the audio file.
+        ffmpeg_binary (str): The ffmpeg executable.
+        frame_seconds (float): Duration of a frame in seconds.
+        block_seconds (float): Duration of a decoded block in seconds.
+
+    Returns:
+        np.ndarray: Mean square amplitude of every frame (1.0 for a full-scale square wave).
+    """
+    process = _decoder(path, ffmpeg_binary, sample_rate=ENVELOPE_SAMPLE_RATE, channels=1)
+    frame = int(ENVELOPE_SAMPLE_RATE * frame_seconds)
+    frames = max(1, int(block_seconds / frame_seconds)) * frame
+    powers = []
+    try:
+        while True:
+            block = _read_block(process, frames, channels=1)[:, 0]
+            if not len(block):
+                break
+            block = np.pad(block, (0, -len(block) % frame))
+            powers.append(np.square(block).reshape(-1, frame).mean(axis=1))
+    finally:
+        _close(process)
+    return np.concatenate(powers) if powers else np.zeros(0, dtype=np.float32)
+
+
+def _sliding_max(values, before, after):
+    padded = np.pad(values, (before, after), mode="edge")
+    return np.lib.stride_tricks.sliding_window_view(padded, before + after + 1).max(axis=1)
+
+
+def ducking_gain_curve(envelope, narration_dbfs, gain_db, duck_db=DUCK_DB,
+                       frame_seconds=ENVELOPE_FRAME_SECONDS):
+    """
+    Computes the gain of the background music for every frame of the narration envelope: gain_db
+    while the narration speaks and duck_db more in its pauses, with smooth transitions that
+    complete before speech starts.
+
+    Args:
+        envelope (np.ndarray): Power of the narration in every frame (see narration_envelope).
+        narration_dbfs (float): Average loudness of the narration in dBFS.
+        gain_db (float): Gain of the music under speech, in dB.
+        duck_db (float): Extra gain of the music in pauses, in dB.
+        frame_seconds (float): Duration of a frame in seconds.
+
+    Returns:
+        np.ndarray: The linear gain of every frame.
+    """
+    if not len(envelope):
+        return np.full(1, 10 ** ((gain_db + duck_db) / 20))
+    level_db = 10 * np.log10(np.maximum(envelope, 1e-10))
+    speech = (level_db > narration_dbfs + SPEECH_THRESHOLD_DB).astype(np.float32)
+    # Keep the music down from a little before speech starts until a little after it stops
+    speech = _sliding_max(speech, before=int(round(DUCK_HOLD_SECONDS / frame_seconds)),
+                          after=int(round(DUCK_LOOKAHEAD_SECONDS / frame_seconds)))
+    curve_db = gain_db + duck_db * (1.0 - speech)
+    width = max(1, int(round(DUCK_SMOOTHING_SECONDS / frame_seconds)))
+    padded = np.pad(curve_db, (width // 2, width - 1 - width // 2), mode="edge")
+    curve_db = np.convolve(padded, np.full(width, 1.0 / width), mode="valid")
+    return (10 ** (curve_db / 20)).astype(np.float32)
+
+
+def stream_mix_background_music(narration_path, music_path, output_path, target_diff=-10.0,
+                                duration=None, ffmpeg_binary="ffmpeg", block_seconds=BLOCK_SECONDS,
+                                ducking=False, duck_db=DUCK_DB, logger=None):
+    """
+    Mixes the narration with looped background music, target_diff dB quieter than the
+    narration, streaming both tracks block by block through ffmpeg.
+
+    With ducking, the music is target_diff dB quieter than the narration only while it speaks
+    and rises by duck_db in its pauses, following a gain curve computed from the narration's
+    envelope before mixing.
+
+    Memory use is bounded by the block size, whatever the length of the video (the envelope
+    takes 100 values per second).
+
+    Args:
+        narration_path (str): Path to the narration audio file.
+        music_path (str): Path to the background music file.
+        output_path (str): Path of the mixed file (WAV).
+        target_diff (float): Desired loudness of the music relative to the narration, in dB.
+        duration (float, optional): Duration of the mix in seconds. Defaults to the narration's.
+        ffmpeg_binary (str): The ffmpeg executable.
+        block_seconds (float): Duration of a mixed block in seconds.
+        ducking (bool): Whether to raise the music in the pauses of the narration.
+        duck_db (float): How much louder the music gets in pauses, in dB.
+        logger: Logger instance for logging.
+
+    Returns:
+        str: The path to the mixed audio file.
+    """
+    if ducking:
+        envelope = narration_envelope(narration_path, ffmpeg_binary, block_seconds=block_seconds)
+        mean_power = float(envelope.mean()) if len(envelope) else 0.0
+        narration_dbfs = 10 * math.log10(mean_power) if mean_power else -math.inf
+    else:
+        narration_dbfs = measure_dbfs(narration_path, ffmpeg_binary, block_seconds)
+    music_dbfs = measure_dbfs(music_path, ffmpeg_binary, block_seconds)
+    gain_db = target_diff - (music_dbfs - narration_dbfs)
+    if not math.isfinite(gain_db):
+        gain_db = 0.0
+    gain = 10 ** (gain_db / 20)
+    if ducking:
+        curve = ducking_gain_curve(envelope, narration_dbfs, gain_db, duck_db)
+        curve_times = (np.arange(len(curve)) + 0.5) * ENVELOPE_FRAME_SECONDS
+    if logger:
+        logger.debug(f"Background music gain: {gain_db:.1f} dB"
+                     + (f", {gain_db + duck_db:.1f} dB in pauses." if ducking else "."))
+
+    narration = _decoder(narration_path, ffmpeg_binary)
+    music = _decoder(music_path, ffmpeg_binary, loop=True)
+    encoder = subprocess.Popen([
+        ffmpeg_binary, "-v", "error", "-y",
+        "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS), "-i", "-",
+        "-acodec", "pcm_s16le", output_path
+    ], stdin=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    frames = int(SAMPLE_RATE * block_seconds)
+    remaining = int(round(duration * SAMPLE_RATE)) if duration is not None else None
+    position = 0
+    try:
+        while remaining is None or remaining > 0:
+            size = frames if remaining is None else min(frames, remaining)
+            voice = _read_block(narration, size)
+            if not len(voice):
+                if remaining is None:
+                    break
+                # The narration ended before the requested duration: keep the music alone
+                voice = np.zeros((size, CHANNELS), dtype=np.float32)
+            background = _read_block(music, len(voice))
+            if ducking:
+                times = (position + np.arange(len(background))) / SAMPLE_RATE
+                background *= np.interp(times, curve_times, curve).astype(np.float32)[:, None]
+            else:
+                background *= gain
+            mixed = voice
+            mixed[:len(background)] += background
+            np.clip(mixed, -1.0, 32767 / 32768, out=mixed)
+            encoder.stdin.write((mixed * 32768).astype(np.int16).tobytes())
+            position += len(voice)
+            if remaining is not None:
+                remaining -= len(voice)
+    finally:
+        _close(narration)
+        _close(music)
+        encoder.stdin.close()
+        encoder.wait()
+    if encoder.returncode:
+        raise RuntimeError(f"ffmpeg failed to write {output_path}.")
+    return output_path
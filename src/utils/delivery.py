@@ -0,0 +1,140 @@
+import subprocess
+import tempfile
+
+# The proxy is a low-resolution review copy: this many pixels high, at a low quality
+PROXY_HEIGHT = 640
+PROXY_CRF = 32
+PROXY_AUDIO_BITRATE = "64k"
+POSTER_QUALITY = 2
+
+
+def poster_path(output_path):
+    return output_path[:-len(".mp4")] + "_poster.jpg"
+
+
+def proxy_path(output_path):
+    return output_path[:-len(".mp4")] + "_proxy.mp4"
+
+
+def delivery_outputs(output_path, audiofile=None, poster_time=None, proxy=False,
+                     preset="medium"):
+    """
+    Builds the ffmpeg output options of a delivery encode, reading the frames from input 0 and
+    the audio track (if any) from input 1.
+    - The video, H.264 with its index at the start of the file (faststart), so players and
+      browsers can start it before it is downloaded. The audio track is copied.
+    - With poster_time, the frame at that time as a JPEG poster, <name>_poster.jpg.
+    - With proxy, a low-resolution, low-bitrate copy for review, <name>_proxy.mp4, also faststart.
+
+    Returns:
+        list[str]: The options, to append after the inputs.
+    """
+    audio = ["-map", "1:a"] if audiofile else []
+    options = ["-map", "0:v"] + audio + (["-c:a", "copy"] if audiofile else []) + [
+        "-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p",
+        "-movflags", "+faststart", output_path]
+    if poster_time is not None:
+        # Frames before poster_time are dropped without being encoded
+        options += ["-map", "0:v", "-ss", f"{poster_time:.3f}", "-frames:v", "1",
+                    "-q:v", str(POSTER_QUALITY), "-pix_fmt", "yuvj420p", "-update", "1",
+                    poster_path(output_path)]
+    if proxy:
+        options += ["-map", "0:v"] + audio + (
+            ["-c:a", "aac", "-b:a", PROXY_AUDIO_BITRATE] if audiofile else []) + [
+            "-vf", f"scale=-2:{PROXY_HEIGHT}", "-c:v", "libx264", "-preset", "veryfast",
+            "-crf", str(PROXY_CRF), "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+            proxy_path(output_path)]
+    return options
+
+
+class DeliveryWriter:
+    """
+    Encodes RGB frames into a delivery-ready video and, from the same frames and in the same
+    ffmpeg process, its poster frame and low-resolution proxy (see delivery_outputs). Every
+    frame is sent to ffmpeg once, so the extra outputs need no pass over the finished video.
+    Used like moviepy's FFMPEG_VideoWriter.
+    """
+
+    def __init__(self, output_path, size, fps, audiofile=None, poster_time=None, proxy=False,
+                 preset="medium", ffmpeg_binary="ffmpeg"):
+        """
+        Args:
+            output_path (str): Path to the MP4 file.
+            size (tuple[int, int]): Width and height of the frames.
+            fps (float): Frame rate.
+            audiofile (str, optional): Audio track to copy into the video.
+            poster_time (float, optional): Time of the frame saved as poster.
+            proxy (bool): Also write a low-resolution proxy.
+            preset (str): The x264 preset of the video.
+            ffmpeg_binary (str): The ffmpeg executable.
+        """
+        self.output_path = output_path
+        command = [
+            ffmpeg_binary, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-vcodec", "rawvideo", "-s", f"{size[0]}x{size[1]}",
+            "-pix_fmt", "rgb24", "-r", f"{fps:.02f}", "-an", "-i", "-",
+        ]
+        if audiofile:
+            command += ["-i", audiofile]
+        command += delivery_outputs(output_path, audiofile=audiofile, poster_time=poster_time,
+                                    proxy=proxy, preset=preset)
+        # A file rather than a pipe: nothing reads stderr while the frames are written, and a
+        # full pipe would block ffmpeg
+        self._stderr = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                     stderr=self._stderr)
+
+    def _error(self):
+        self._stderr.seek(0)
+        error = self._stderr.read().decode(errors="replace")
+        self._stderr.close()
+        return RuntimeError(f"ffmpeg failed to write {self.output_path}: {error}")
+
+    def write_frame(self, frame):
+        """
+        Writes one frame (a uint8 RGB array).
+        """
+        try:
+            self.proc.stdin.write(frame.tobytes())
+        except OSError:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+            self.proc.wait()
+            raise self._error()
+
+    def close(self):
+        """
+        Finishes the outputs; moving the index of the MP4 files to their start happens here.
+
+        Raises:
+            RuntimeError: If ffmpeg failed.
+        """
+        if self.proc.returncode is not None:
+            # Already reported by write_frame
+            return
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc.wait()
+        if self.proc.returncode:
+            raise self._error()
+        self._stderr.close()
+
+
+def extract_poster(video_path, time, ffmpeg_binary="ffmpeg"):
+    """
+    Saves the frame of an existing video at a given time as its poster, seeking to the nearest
+    keyframe so only a few frames are decoded. Used when the frames are not encoded in one pass.
+
+    Returns:
+        str: Path to the poster.
+    """
+    path = poster_path(video_path)
+    subprocess.run([
+        ffmpeg_binary, "-y", "-loglevel", "error", "-ss", f"{time:.3f}", "-i", video_path,
+        "-frames:v", "1", "-q:v", str(POSTER_QUALITY), "-update", "1", path
+    ], check=True)
+    return path
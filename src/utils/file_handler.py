@@ -1,7 +1,21 @@
+import json
 import os
 import uuid
 
 
+def _replace_file(path, data):
+    """
+    Writes bytes to a new file renamed over path, so readers never see a partial file.
+
+    :param path: Path to the file.
+    :param data: The content (bytes).
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
 def save_audio(response, directory="output", file_id=None):
     """
     Saves audio data to a file.
@@ -19,20 +33,20 @@ def save_audio(response, directory="output", file_id=None):
 
     output_file = f"{directory}/{file_id}.mp3"
 
-    with open(output_file, "wb") as f:
-        f.write(response)
+    _replace_file(output_file, response)
 
     return output_file
 
 
-def save_subtitles(srt_content, directory="output", file_id=None):
+def save_subtitles(srt_content, directory="output", file_id=None, extension="srt"):
     """
-    Saves subtitle data to an SRT file.
+    Saves subtitle data to an SRT (or VTT/ASS) file.
 
     :param srt_content: The subtitle content.
-    :param directory: The directory where the SRT file will be saved.
+    :param directory: The directory where the subtitle file will be saved.
     :param file_id: An optional unique identifier to name the file.
-    :return: Path to the saved SRT file.
+    :param extension: The subtitle format extension ("srt", "vtt" or "ass").
+    :return: Path to the saved subtitle file.
     """
     if not os.path.exists(directory):
         os.makedirs(directory)
@@ -40,7 +54,7 @@ def save_subtitles(srt_content, directory="output", file_id=None):
     if not file_id:
         file_id = str(uuid.uuid4())
 
-    subtitle_file = f"{directory}/{file_id}.srt"
+    subtitle_file = f"{directory}/{file_id}.{extension}"
 
     with open(subtitle_file, "w", encoding="utf-8") as f:
         f.write(srt_content)
@@ -67,7 +81,81 @@ def save_image(image_data, directory="output", file_id=None, suffix="image", wat
     output_file = f"{directory}/{file_id}_{suffix}.png"
 
     # Save raw image data
-    with open(output_file, "wb") as f:
-        f.write(image_data)
+    _replace_file(output_file, image_data)
 
     return output_file
+
+
+def save_manifest(data, directory="output", name="render.json"):
+    """
+    Saves a JSON manifest describing how the assets of a video were produced.
+
+    :param data: JSON-serializable data to save.
+    :param directory: The directory where the manifest will be saved.
+    :param name: The file name of the manifest.
+    :return: Path to the saved manifest file.
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    manifest_file = f"{directory}/{name}"
+
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    return manifest_file
+
+
+def load_manifest(directory="output", name="render.json"):
+    """
+    Loads a JSON manifest previously written with save_manifest.
+
+    :param directory: The directory containing the manifest.
+    :param name: The file name of the manifest.
+    :return: The manifest data, or an empty dict if the manifest does not exist.
+    """
+    manifest_file = f"{directory}/{name}"
+    if not os.path.exists(manifest_file):
+        return {}
+
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_word_timings(aligned_words, directory="output", file_id=None):
+    """
+    Saves the timed words of the subtitles to a JSON file.
+
+    :param aligned_words: A list of (start, end, word_with_punctuation) tuples.
+    :param directory: The directory where the file will be saved.
+    :param file_id: An optional unique identifier to name the file.
+    :return: Path to the saved file.
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    if not file_id:
+        file_id = str(uuid.uuid4())
+
+    words_file = f"{directory}/{file_id}_words.json"
+
+    with open(words_file, "w", encoding="utf-8") as f:
+        json.dump([list(word) for word in aligned_words], f, ensure_ascii=False)
+
+    return words_file
+
+
+def load_word_timings(directory="output", file_id=None):
+    """
+    Loads the timed words saved with save_word_timings.
+
+    :param directory: The directory containing the file.
+    :param file_id: The identifier of the video.
+    :return: A list of (start, end, word_with_punctuation) tuples, or None if the file does not exist.
+    """
+    words_file = f"{directory}/{file_id}_words.json"
+    if not os.path.exists(words_file):
+        return None
+
+    with open(words_file, "r", encoding="utf-8") as f:
+        return [tuple(word) for word in json.load(f)]
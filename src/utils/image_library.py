@@ -0,0 +1,298 @@
+import glob
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+from PIL import Image
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where only the threads of one process are synchronized
+    fcntl = None
+
+DEFAULT_LIBRARY_DIR = "output/image_library"
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_THRESHOLD = 0.92
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_BATCH_SIZE = 100
+
+INDEX_FILE = "index.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+# Locked by the processes saving the index (the index files are replaced on every save)
+LOCK_FILE = "index.lock"
+
+LOG_PROMPT_PATTERN = re.compile(r"Image prompt for cue (\d+): (.*)$")
+
+_libraries = {}
+_libraries_lock = threading.Lock()
+
+
+class ImageLibrary:
+    """
+    A cross-video library of generated images, keyed on the embedding of their prompt.
+
+    The library only indexes images already saved in the video folders: a prompt whose
+    embedding is close enough to an indexed prompt can reuse its image instead of paying for a
+    new generation. Entries are evicted least recently used first, and entries whose image was
+    deleted are dropped when met. Saving merges the entries other processes saved meanwhile.
+    """
+
+    def __init__(self, directory=DEFAULT_LIBRARY_DIR, max_entries=DEFAULT_MAX_ENTRIES,
+                 model=EMBEDDING_MODEL):
+        """
+        Args:
+            directory (str): Where the index is stored.
+            max_entries (int): Maximum number of indexed images.
+            model (str): The embedding model of the index.
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.model = model
+        self.entries = []
+        self.embeddings = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _read(self):
+        """
+        Reads the saved index.
+
+        Returns:
+            tuple[list[dict], numpy.ndarray | None]: The entries and their embeddings, empty if
+                                                     there is no index of this model.
+        """
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        embeddings_path = os.path.join(self.directory, EMBEDDINGS_FILE)
+        if not os.path.exists(index_path) or not os.path.exists(embeddings_path):
+            return [], None
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("model") != self.model:
+            # Embeddings of another model cannot be compared; the index must be rebuilt
+            return [], None
+        embeddings = np.load(embeddings_path)
+        if len(embeddings) != len(index["entries"]) or not len(embeddings):
+            return [], None
+        return index["entries"], embeddings
+
+    def _load(self):
+        self.entries, self.embeddings = self._read()
+
+    def _merge_saved(self):
+        """
+        Adds the entries saved by other processes since this library was loaded, keyed on the
+        image path; of two entries of the same image, the most recently used is kept.
+        """
+        entries, embeddings = self._read()
+        if embeddings is None or (self.embeddings is not None
+                                  and embeddings.shape[1] != self.embeddings.shape[1]):
+            return
+        positions = {entry["image"]: i for i, entry in enumerate(self.entries)}
+        added = []
+        for entry, embedding in zip(entries, embeddings):
+            i = positions.get(entry["image"])
+            if i is None:
+                if os.path.exists(entry["image"]):
+                    positions[entry["image"]] = len(self.entries)
+                    self.entries.append(entry)
+                    added.append(embedding)
+            elif entry["last_used"] > self.entries[i]["last_used"]:
+                self.entries[i] = entry
+        if added:
+            added = np.asarray(added, dtype=np.float32)
+            self.embeddings = added if self.embeddings is None else np.vstack(
+                [self.embeddings, added])
+        self._evict()
+
+    def _evict(self):
+        if len(self.entries) > self.max_entries:
+            oldest = sorted(range(len(self.entries)),
+                            key=lambda i: self.entries[i]["last_used"])
+            self._remove(oldest[:len(self.entries) - self.max_entries])
+
+    def save(self, merge=True):
+        """
+        Writes the index to the library directory, replacing the previous one atomically.
+
+        Args:
+            merge (bool): First add the entries saved by other processes (CLI runs or workers
+                          sharing the library), under a lock held until the index is written.
+                          Otherwise the saved index is replaced by this one.
+        """
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, LOCK_FILE), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                if merge:
+                    self._merge_saved()
+                self._write()
+
+    def _write(self):
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        embeddings_path = os.path.join(self.directory, EMBEDDINGS_FILE)
+        embeddings = self.embeddings if self.embeddings is not None else np.zeros(
+            (0, 0), dtype=np.float32)
+        with open(embeddings_path + ".tmp", "wb") as f:
+            np.save(f, embeddings)
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "entries": self.entries},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(embeddings_path + ".tmp", embeddings_path)
+        os.replace(index_path + ".tmp", index_path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _remove(self, indices):
+        removed = set(indices)
+        keep = [i for i in range(len(self.entries)) if i not in removed]
+        self.entries = [self.entries[i] for i in keep]
+        self.embeddings = self.embeddings[keep] if keep else None
+
+    def lookup(self, embedding, size, threshold=DEFAULT_THRESHOLD):
+        """
+        Finds the indexed image whose prompt is the most similar to a prompt.
+
+        Args:
+            embedding (list[float]): The embedding of the prompt.
+            size (tuple[int, int]): The required image size.
+            threshold (float): Minimum cosine similarity of the prompts.
+
+        Returns:
+            tuple[dict, float] | None: The library entry and its similarity, or None.
+        """
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        with self._lock:
+            while self.embeddings is not None and self.embeddings.shape[1] == len(query):
+                similarities = self.embeddings @ query
+                sizes = np.array([entry["size"] == list(size) for entry in self.entries])
+                similarities[~sizes] = -1.0
+                best = int(np.argmax(similarities))
+                if similarities[best] < threshold:
+                    return None
+                entry = self.entries[best]
+                if not os.path.exists(entry["image"]):
+                    self._remove([best])
+                    continue
+                entry["last_used"] = time.time()
+                entry["hits"] += 1
+                return entry, float(similarities[best])
+        return None
+
+    def add(self, prompt, embedding, image_path, size):
+        """
+        Indexes a generated image, evicting the least recently used entries if the library is
+        full.
+
+        Args:
+            prompt (str): The prompt of the image.
+            embedding (list[float]): The embedding of the prompt.
+            image_path (str): Path to the image file.
+            size (tuple[int, int]): The image size.
+        """
+        vector = _normalize(np.asarray(embedding, dtype=np.float32))[None, :]
+        with self._lock:
+            if self.embeddings is not None and self.embeddings.shape[1] != vector.shape[1]:
+                self.entries, self.embeddings = [], None
+            now = time.time()
+            self.entries.append({"prompt": prompt, "image": image_path, "size": list(size),
+                                 "added": now, "last_used": now, "hits": 0})
+            self.embeddings = vector if self.embeddings is None else np.vstack(
+                [self.embeddings, vector])
+            self._evict()
+
+
+def _normalize(vector):
+    norm = np.linalg.norm(vector, axis=-1, keepdims=True)
+    return vector / np.where(norm == 0, 1.0, norm)
+
+
+def get_image_library(directory=DEFAULT_LIBRARY_DIR, max_entries=DEFAULT_MAX_ENTRIES):
+    """
+    Returns the library stored in a directory, loading it once per process so concurrent jobs
+    of the job server share it.
+    """
+    key = os.path.abspath(directory)
+    with _libraries_lock:
+        if key not in _libraries:
+            _libraries[key] = ImageLibrary(directory, max_entries=max_entries)
+        return _libraries[key]
+
+
+def find_generated_images(output_dir="output"):
+    """
+    Lists the generated images of every video folder with their prompts, read from
+    <id>_images.json or, for older videos, from the image prompts in process.log.
+
+    Args:
+        output_dir (str): The folder containing the video folders.
+
+    Returns:
+        list[tuple[str, str]]: (prompt, image path) pairs.
+    """
+    images = []
+    for video_folder in sorted(glob.glob(os.path.join(output_dir, "*", ""))):
+        video_folder = os.path.normpath(video_folder)
+        file_id = os.path.basename(video_folder)
+        metadata_path = os.path.join(video_folder, f"{file_id}_images.json")
+        log_path = os.path.join(video_folder, "process.log")
+        prompts = {}
+        if os.path.exists(metadata_path):
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                prompts = {i + 1: prompt for i, prompt in enumerate(json.load(f).get("prompts", []))}
+        elif os.path.exists(log_path):
+            with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    match = LOG_PROMPT_PATTERN.search(line.rstrip("\n"))
+                    if match:
+                        # The last prompt of a slot is the one whose image was kept
+                        prompts[int(match.group(1))] = match.group(2)
+        for number, prompt in sorted(prompts.items()):
+            image_path = os.path.join(video_folder, f"{file_id}_img_{number}.png")
+            if os.path.exists(image_path):
+                images.append((prompt, image_path))
+    return images
+
+
+def rebuild_image_library(embed_texts, output_dir="output", directory=DEFAULT_LIBRARY_DIR,
+                          max_entries=DEFAULT_MAX_ENTRIES, model=EMBEDDING_MODEL, logger=None):
+    """
+    Rebuilds the library index from the images of every video folder.
+
+    Args:
+        embed_texts (callable): Function embedding a list of texts (OpenAIService.embed_texts).
+        output_dir (str): The folder containing the video folders.
+        directory (str): Where the index is stored.
+        max_entries (int): Maximum number of indexed images; the most recent images are kept.
+        model (str): The embedding model.
+        logger: Logger instance for logging.
+
+    Returns:
+        ImageLibrary: The rebuilt library.
+    """
+    images = find_generated_images(output_dir)
+    # The most recent images are kept when there are more than max_entries
+    images.sort(key=lambda image: os.path.getmtime(image[1]))
+    images = images[-max_entries:] if max_entries else images
+
+    library = ImageLibrary(directory, max_entries=max_entries, model=model)
+    library.entries, library.embeddings = [], None
+    for start in range(0, len(images), EMBEDDING_BATCH_SIZE):
+        batch = images[start:start + EMBEDDING_BATCH_SIZE]
+        embeddings = embed_texts([prompt for prompt, _ in batch], model=model)
+        for (prompt, image_path), embedding in zip(batch, embeddings):
+            with Image.open(image_path) as image:
+                size = image.size
+            library.add(prompt, embedding, image_path, size)
+            library.entries[-1]["added"] = library.entries[-1]["last_used"] = \
+                os.path.getmtime(image_path)
+        if logger:
+            logger.info(f"Indexed {min(start + EMBEDDING_BATCH_SIZE, len(images))} of {len(images)} images.")
+    library.save(merge=False)
+    with _libraries_lock:
+        _libraries[os.path.abspath(directory)] = library
+    return library
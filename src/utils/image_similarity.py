@@ -0,0 +1,125 @@
+import io
+import numpy as np
+from PIL import Image
+
+# The perceptual hash keeps the 8x8 lowest frequencies of the DCT of a 32x32 thumbnail
+HASH_SIZE = 8
+DCT_SIZE = 32
+HUE_BINS = 12
+SATURATION_BINS = 4
+HISTOGRAM_THUMBNAIL = (64, 64)
+
+# Two images are near-duplicates when both their structure (hash bits) and their colors
+# (histogram intersection) match. Requiring both avoids flagging images that only share a
+# composition or a palette.
+MAX_HASH_DISTANCE = 10
+MIN_HISTOGRAM_SIMILARITY = 0.85
+
+_n = np.arange(DCT_SIZE)
+_DCT_MATRIX = np.cos(np.pi * (2 * _n[None, :] + 1) * _n[:, None] / (2 * DCT_SIZE))
+
+
+class ImageFingerprint:
+    """
+    The perceptual hash and color histogram of an image.
+    """
+
+    def __init__(self, phash, histogram):
+        """
+        Args:
+            phash (int): 64-bit DCT perceptual hash.
+            histogram (numpy.ndarray): Normalized hue/saturation histogram (sums to 1).
+        """
+        self.phash = phash
+        self.histogram = histogram
+
+    def distance(self, other):
+        """
+        Number of differing hash bits (0 for identical structure, up to 64).
+        """
+        return bin(self.phash ^ other.phash).count("1")
+
+    def color_similarity(self, other):
+        """
+        Histogram intersection (1.0 for identical color distributions, 0.0 for disjoint).
+        """
+        return float(np.minimum(self.histogram, other.histogram).sum())
+
+    def is_near_duplicate(self, other, max_distance=MAX_HASH_DISTANCE,
+                          min_color_similarity=MIN_HISTOGRAM_SIMILARITY):
+        return (self.distance(other) <= max_distance
+                and self.color_similarity(other) >= min_color_similarity)
+
+
+def perceptual_hash(image):
+    """
+    Computes the DCT perceptual hash of an image: the sign of its lowest frequencies compared
+    with their median, which survives rescaling, recompression and small color shifts.
+
+    Args:
+        image (PIL.Image.Image): The image.
+
+    Returns:
+        int: The 64-bit hash.
+    """
+    pixels = np.asarray(image.convert("L").resize(
+        (DCT_SIZE, DCT_SIZE), Image.LANCZOS), dtype=np.float64)
+    frequencies = (_DCT_MATRIX @ pixels @ _DCT_MATRIX.T)[:HASH_SIZE, :HASH_SIZE]
+    # The DC term only reflects the average brightness
+    median = np.median(frequencies.flatten()[1:])
+    bits = (frequencies > median).flatten()
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def color_histogram(image, hue_bins=HUE_BINS, saturation_bins=SATURATION_BINS):
+    """
+    Computes the normalized hue/saturation histogram of a thumbnail of an image. Brightness is
+    left out, so a regenerated image with another exposure still matches.
+
+    Args:
+        image (PIL.Image.Image): The image.
+        hue_bins (int): Number of hue bins.
+        saturation_bins (int): Number of saturation bins.
+
+    Returns:
+        numpy.ndarray: The histogram, summing to 1.
+    """
+    pixels = np.asarray(image.convert("RGB").resize(
+        HISTOGRAM_THUMBNAIL, Image.BILINEAR).convert("HSV"), dtype=np.int32)
+    hue = pixels[:, :, 0] * hue_bins // 256
+    saturation = pixels[:, :, 1] * saturation_bins // 256
+    histogram = np.bincount((hue * saturation_bins + saturation).ravel(),
+                            minlength=hue_bins * saturation_bins).astype(np.float64)
+    return histogram / histogram.sum()
+
+
+def fingerprint_image(image):
+    """
+    Computes the fingerprint of an image.
+
+    Args:
+        image (bytes | str): The encoded image data or the path to an image file.
+
+    Returns:
+        ImageFingerprint: The fingerprint.
+    """
+    with Image.open(io.BytesIO(image) if isinstance(image, bytes) else image) as opened:
+        # Lets JPEG images decode at a reduced scale
+        opened.draft("RGB", (DCT_SIZE * 4, DCT_SIZE * 4))
+        return ImageFingerprint(perceptual_hash(opened), color_histogram(opened))
+
+
+def find_near_duplicate(fingerprint, previous):
+    """
+    Looks for a near-duplicate of an image among the previous images.
+
+    Args:
+        fingerprint (ImageFingerprint): The fingerprint of the new image.
+        previous (list[ImageFingerprint]): The fingerprints of the previous images.
+
+    Returns:
+        int | None: The index of the closest near-duplicate in previous, or None.
+    """
+    duplicates = [(fingerprint.distance(other), index) for index, other in enumerate(previous)
+                  if fingerprint.is_near_duplicate(other)]
+    return min(duplicates)[1] if duplicates else None
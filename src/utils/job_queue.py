@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from utils.option_defaults import DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS, DEFAULT_QUEUE_PATH, STAGES
+
+SCHEMA = ("""
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    argv TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    error TEXT,
+    final_video TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)""", """
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, stage, priority)
+""")
+
+
+class JobQueue:
+    """
+    A work queue of video jobs stored in a SQLite database, shared by worker processes on one
+    or several hosts (with the database and the output folder on shared storage).
+
+    Every job goes through the stages of STAGES. A worker claims the queued stage of highest
+    priority among those it is able to run and holds a lease on it, which it renews while it
+    works. A stage whose lease expires, because its worker crashed or lost its connection, is
+    queued again for another worker, up to max_attempts times.
+
+    Every operation runs in its own short transaction, so a JobQueue can be used from several
+    threads. The database uses SQLite's default rollback journal rather than WAL, which does
+    not work over network filesystems.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH):
+        """
+        Args:
+            path (str): Path to the database file, created if needed.
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._transaction() as db:
+            for statement in SCHEMA:
+                db.execute(statement)
+
+    @contextmanager
+    def _transaction(self):
+        db = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            # Take the write lock at once, so two workers never claim the same stage
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    @staticmethod
+    def _to_dict(row):
+        job = dict(row)
+        job["argv"] = json.loads(job["argv"])
+        return job
+
+    def submit(self, argv, priority=0, max_attempts=DEFAULT_MAX_ATTEMPTS, job_id=None):
+        """
+        Queues a job at its first stage.
+
+        Args:
+            argv (list[str]): The command-line options of the video (for parse_args).
+            priority (int): Higher priorities are claimed first.
+            max_attempts (int): Number of times a stage is claimed before its job fails.
+            job_id (str, optional): Identifier of the job, also its output folder name.
+                                    A new UUID is used if not provided.
+
+        Returns:
+            dict: The queued job.
+        """
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO jobs (id, stage, status, priority, argv, max_attempts, created_at, "
+                "updated_at) VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, STAGES[0], priority, json.dumps(argv), max_attempts, now, now))
+            return self._to_dict(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def _requeue_expired(self, db, now):
+        """
+        Queues again the stages whose lease expired, or fails their job after max_attempts.
+        """
+        db.execute(
+            "UPDATE jobs SET status = 'failed', worker = NULL, lease_expires = NULL, "
+            "error = 'The lease of the ' || stage || ' stage expired ' || attempts || ' times.', "
+            "updated_at = ? "
+            "WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts",
+            (now, now))
+        db.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE status = 'running' AND lease_expires < ?",
+            (now, now))
+
+    def claim(self, worker, capabilities=STAGES, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Claims the queued stage of highest priority (oldest first) among the given stages.
+
+        Args:
+            worker (str): Identifier of the worker.
+            capabilities (tuple[str]): The stages the worker is able to run.
+            lease_seconds (float): Duration of the lease; renew it before it expires.
+
+        Returns:
+            dict | None: The claimed job, or None if no stage is queued.
+        """
+        now = time.time()
+        stages = list(capabilities)
+        with self._transaction() as db:
+            self._requeue_expired(db, now)
+            row = db.execute(
+                f"SELECT id FROM jobs WHERE status = 'queued' "
+                f"AND stage IN ({', '.join('?' * len(stages))}) "
+                f"ORDER BY priority DESC, created_at, id LIMIT 1",
+                stages).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker, now + lease_seconds, now, row["id"]))
+            return self._to_dict(db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+
+    def renew(self, job_id, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Extends the lease of a claimed stage.
+
+        Returns:
+            bool: False if the worker no longer holds the lease (it expired and the stage was
+                  queued again), in which case its result will be discarded.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + lease_seconds, now, job_id, worker))
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, final_video=None):
+        """
+        Marks a claimed stage as done: the job is queued at its next stage, or succeeds after
+        its last one.
+
+        Returns:
+            bool: False if the worker no longer held the lease.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT stage FROM jobs WHERE id = ? AND worker = ? AND status = 'running'",
+                (job_id, worker)).fetchone()
+            if row is None:
+                return False
+            index = STAGES.index(row["stage"])
+            if index + 1 < len(STAGES):
+                db.execute(
+                    "UPDATE jobs SET stage = ?, status = 'queued', worker = NULL, "
+                    "lease_expires = NULL, attempts = 0, updated_at = ? WHERE id = ?",
+                    (STAGES[index + 1], now, job_id))
+            else:
+                db.execute(
+                    "UPDATE jobs SET status = 'succeeded', worker = NULL, lease_expires = NULL, "
+                    "final_video = ?, updated_at = ? WHERE id = ?",
+                    (final_video, now, job_id))
+            return True
+
+    def fail(self, job_id, worker, error):
+        """
+        Marks the job of a claimed stage as failed.
+
+        Returns:
+            bool: False if the worker no longer held the lease.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET status = 'failed', worker = NULL, lease_expires = NULL, "
+                "error = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (error, now, job_id, worker))
+            return cursor.rowcount == 1
+
+    def release(self, job_id, worker):
+        """
+        Gives a claimed stage back to the queue without counting the attempt, e.g. when a
+        worker is stopped.
+
+        Returns:
+            bool: False if the worker no longer held the lease.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, lease_expires = NULL, "
+                "attempts = attempts - 1, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (now, job_id, worker))
+            return cursor.rowcount == 1
+
+    def get(self, job_id):
+        with self._transaction() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._to_dict(row) if row else None
+
+    def list(self, status=None):
+        with self._transaction() as db:
+            if status:
+                rows = db.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at", (status,)).fetchall()
+            else:
+                rows = db.execute("SELECT * FROM jobs ORDER BY created_at").fetchall()
+            return [self._to_dict(row) for row in rows]
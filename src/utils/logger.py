@@ -21,3 +21,36 @@ def setup_logger():
     logger.addHandler(handler)
 
     return logger
+
+
+# Parent of the job loggers, so job records also reach the handlers of the application logger
+JOBS_LOGGER = "rapidclip_generator.jobs"
+
+
+class JobLogger(logging.LoggerAdapter):
+    """
+    Logs the records of one job through the logger shared by all jobs, tagged with the job id
+    (record.job_id). Creating one per job leaves no logger behind once the job is done.
+    """
+
+    def __init__(self, job_id):
+        logger = logging.getLogger(JOBS_LOGGER)
+        logger.setLevel(logging.DEBUG)
+        super().__init__(logger, {"job_id": job_id})
+
+    def process(self, msg, kwargs):
+        kwargs["extra"] = {**kwargs.get("extra", {}), **self.extra}
+        return msg, kwargs
+
+
+class JobFilter(logging.Filter):
+    """
+    Keeps the records of one job, so a handler of the shared job logger only logs that job.
+    """
+
+    def __init__(self, job_id):
+        super().__init__()
+        self.job_id = job_id
+
+    def filter(self, record):
+        return getattr(record, "job_id", None) == self.job_id
@@ -0,0 +1,27 @@
+# Constants of the command-line options, kept free of imports so parsing the options does not
+# load the modules implementing them.
+
+# A job is generated, then rendered; workers claim the stages they are able to run
+STAGES = ("generate", "render")
+DEFAULT_QUEUE_PATH = "output/jobs.db"
+DEFAULT_LEASE_SECONDS = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Intermediate files of a video folder only needed while rendering
+TRANSIENT_FILES = ["adjusted_bg_music.mp3", "background_mix.wav", "{id}_final_audio.mp3",
+                   "{id}_original_audio.mp3", "*.part.mp4", "*.tmp"]
+# Caches of the incremental render
+CACHE_DIRS = ["segments"]
+# Sources needed to re-render a video
+SOURCE_FILES = ["{id}.mp3", "{id}_img_*.png"]
+
+# What each retention policy deletes from a video folder once its final video is verified:
+# - keep: nothing (duplicates are still deduplicated),
+# - sources: the intermediates and render caches, keeping the sources re-rendering needs (the
+#   next incremental render encodes every segment again),
+# - final: also the narration and images, keeping the videos, subtitles, manifests and log.
+RETENTION_POLICIES = {
+    "keep": ([], []),
+    "sources": (TRANSIENT_FILES, CACHE_DIRS),
+    "final": (TRANSIENT_FILES + SOURCE_FILES, CACHE_DIRS),
+}
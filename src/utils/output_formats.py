@@ -0,0 +1,120 @@
+import io
+import re
+
+DEFAULT_SIZE = (1080, 1920)
+
+# Sizes of the aspect ratios accepted by --output_sizes
+ASPECT_RATIO_SIZES = {
+    "9:16": (1080, 1920),
+    "16:9": (1920, 1080),
+    "1:1": (1080, 1080),
+    "4:5": (1080, 1350),
+}
+
+SIZE_PATTERN = re.compile(r"^(\d+)x(\d+)$")
+
+
+def parse_size(value):
+    """
+    Parses an output size given as WIDTHxHEIGHT (e.g. "1920x1080") or as an aspect ratio
+    (e.g. "16:9").
+
+    Args:
+        value (str): The size.
+
+    Returns:
+        tuple[int, int]: The width and height in pixels.
+
+    Raises:
+        ValueError: If the size is invalid. Dimensions must be even for H.264.
+    """
+    if value in ASPECT_RATIO_SIZES:
+        return ASPECT_RATIO_SIZES[value]
+    match = SIZE_PATTERN.match(value.strip().lower())
+    if not match:
+        raise ValueError(
+            f"Invalid size '{value}': use WIDTHxHEIGHT or one of {', '.join(ASPECT_RATIO_SIZES)}.")
+    width, height = int(match.group(1)), int(match.group(2))
+    if not width or not height or width % 2 or height % 2:
+        raise ValueError(
+            f"Invalid size '{value}': width and height must be even and positive.")
+    return width, height
+
+
+def format_size(size):
+    return f"{size[0]}x{size[1]}"
+
+
+def master_size(sizes):
+    """
+    Returns the size at which images are generated so that every output size can be cropped
+    from them without upscaling.
+
+    Args:
+        sizes (list[tuple[int, int]]): The output sizes.
+
+    Returns:
+        tuple[int, int]: The master width and height.
+    """
+    return max(width for width, _ in sizes), max(height for _, height in sizes)
+
+
+def crop_box(image_size, size):
+    """
+    Returns the largest box with the aspect ratio of `size` centered in an image.
+
+    Args:
+        image_size (tuple[int, int]): Width and height of the image.
+        size (tuple[int, int]): The output size.
+
+    Returns:
+        tuple[int, int, int, int]: The box as (left, top, right, bottom).
+    """
+    image_width, image_height = image_size
+    width, height = size
+    if image_width * height > image_height * width:
+        crop_width, crop_height = round(image_height * width / height), image_height
+    else:
+        crop_width, crop_height = image_width, round(image_width * height / width)
+    left = (image_width - crop_width) // 2
+    top = (image_height - crop_height) // 2
+    return left, top, left + crop_width, top + crop_height
+
+
+def fit_image(image_data, size):
+    """
+    Crops an image to the aspect ratio of `size` around its center and scales it to `size`, so
+    every image of a video has the size it was requested at, whatever the model returned.
+
+    Args:
+        image_data (bytes): The image.
+        size (tuple[int, int]): The width and height to fit.
+
+    Returns:
+        bytes: The image unchanged if it already has that size, else the fitted image as PNG.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_data)) as image:
+        if image.size == tuple(size):
+            return image_data
+        fitted = image.crop(crop_box(image.size, size)).resize(size, Image.LANCZOS)
+    output = io.BytesIO()
+    fitted.save(output, format="PNG")
+    return output.getvalue()
+
+
+def safe_area(image_size, sizes):
+    """
+    Returns the part of an image that is visible in every output size.
+
+    Args:
+        image_size (tuple[int, int]): Width and height of the image.
+        sizes (list[tuple[int, int]]): The output sizes.
+
+    Returns:
+        tuple[int, int, int, int]: The area as (left, top, right, bottom).
+    """
+    boxes = [crop_box(image_size, size) for size in sizes]
+    return (max(box[0] for box in boxes), max(box[1] for box in boxes),
+            min(box[2] for box in boxes), min(box[3] for box in boxes))
@@ -0,0 +1,192 @@
+import csv
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_memory_mb():
+    """
+    Returns the peak resident memory of the process in MB, or None if it cannot be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class RenderProfiler:
+    """
+    Measures where the time of a render goes.
+
+    Clip frame functions are wrapped so that every call is timed with its position in the clip
+    tree. Time spent in a clip itself (excluding the clips it composes) is attributed to its
+    layer, which separates image zooms, subtitle drawing, compositing, audio mixing and, as the
+    remainder of the write call, ffmpeg encoding.
+    """
+
+    def __init__(self):
+        self._stack = []
+        self._folded = defaultdict(float)
+        self.layer_times = defaultdict(float)
+        self.layer_calls = defaultdict(int)
+        self.frames = []
+        self._frame = None
+        self.frame_shape = None
+        self.encode_layers = set()
+        self.wall_time = 0.0
+
+    @contextmanager
+    def section(self, name):
+        """
+        Context manager timing a block of work as a layer nested in the current one.
+
+        Args:
+            name (str): Name of the layer.
+        """
+        self._stack.append([name, 0.0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _, child_time = self._stack.pop()
+            own_time = elapsed - child_time
+            path = ";".join([n for n, _ in self._stack] + [name])
+            self._folded[path] += own_time
+            self.layer_times[name] += own_time
+            self.layer_calls[name] += 1
+            if self._stack:
+                self._stack[-1][1] += elapsed
+            if self._frame is not None:
+                self._frame[name] = self._frame.get(name, 0.0) + own_time
+
+    def wrap(self, clip, name, frame_root=False):
+        """
+        Times every frame produced by a clip (and by its mask, as "<name>/mask").
+
+        Args:
+            clip: The moviepy clip. Its frame function is replaced in place.
+            name (str): Name of the layer.
+            frame_root (bool): Whether each call of this clip produces one frame of the video,
+                               so calls are also recorded frame by frame.
+
+        Returns:
+            The clip.
+        """
+        frame_function = clip.frame_function
+
+        def profiled(t):
+            if frame_root:
+                self._frame = {"t": t}
+            try:
+                with self.section(name):
+                    frame = frame_function(t)
+            finally:
+                if frame_root:
+                    self.frames.append(self._frame)
+                    self._frame = None
+            if frame_root and self.frame_shape is None:
+                self.frame_shape = getattr(frame, "shape", None)
+            return frame
+
+        clip.frame_function = profiled
+        mask = getattr(clip, "mask", None)
+        if mask is not None and not getattr(mask, "_profiled", False):
+            self.wrap(mask, f"{name}/mask")
+            mask._profiled = True
+        return clip
+
+    @contextmanager
+    def encoding(self, name="write_videofile"):
+        """
+        Context manager around a call writing the video (or one of its segments): its own time,
+        not spent producing frames or audio, is encoder time.
+        """
+        self.encode_layers.add(name)
+        start = time.perf_counter()
+        try:
+            with self.section(name):
+                yield
+        finally:
+            self.wall_time += time.perf_counter() - start
+
+    def summary(self):
+        """
+        Formats the per-layer times, encoder throughput and peak memory as a table.
+
+        Returns:
+            str: The summary.
+        """
+        frame_count = len(self.frames)
+        wall_time = self.wall_time or sum(self.layer_times.values())
+        width = max([len(name) for name in self.layer_times] + [len("Layer")])
+        lines = [
+            f"{'Layer':<{width}}  {'Calls':>7}  {'Total (s)':>10}  {'ms/frame':>9}  {'Share':>6}"]
+        for name, seconds in sorted(self.layer_times.items(), key=lambda item: -item[1]):
+            per_frame = seconds * 1000 / frame_count if frame_count else 0.0
+            share = seconds / wall_time * 100 if wall_time else 0.0
+            lines.append(
+                f"{name:<{width}}  {self.layer_calls[name]:>7}  {seconds:>10.3f}  "
+                f"{per_frame:>9.2f}  {share:>5.1f}%")
+
+        lines.append("")
+        lines.append(f"Frames: {frame_count} in {wall_time:.2f}s "
+                     f"({frame_count / wall_time if wall_time else 0.0:.2f} frames/s overall)")
+        encode_time = sum(self.layer_times[name] for name in self.encode_layers)
+        if encode_time and frame_count:
+            frame_mb = 0.0
+            if self.frame_shape is not None:
+                frame_mb = float(
+                    self.frame_shape[0] * self.frame_shape[1] * 3) / (1024 * 1024)
+            lines.append(
+                f"Encoder: {encode_time:.2f}s, {frame_count / encode_time:.2f} frames/s, "
+                f"{frame_count * frame_mb / encode_time:.1f} MB/s of raw frames")
+        peak = peak_memory_mb()
+        if peak is not None:
+            lines.append(f"Peak memory (RSS): {peak:.0f} MB")
+        return "\n".join(lines)
+
+    def save(self, directory, file_id):
+        """
+        Writes the profile to the video folder:
+        - <id>_render_profile.folded: folded stacks in microseconds (for flamegraph.pl,
+          speedscope or inferno).
+        - <id>_render_frames.csv: time of every layer in every frame, in milliseconds.
+        - <id>_render_profile.txt: the summary table.
+
+        Args:
+            directory (str): The video folder.
+            file_id (str): Identifier of the video.
+
+        Returns:
+            list[str]: Paths of the written files.
+        """
+        folded_path = os.path.join(directory, f"{file_id}_render_profile.folded")
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for path, seconds in sorted(self._folded.items()):
+                microseconds = int(round(seconds * 1e6))
+                if microseconds > 0:
+                    f.write(f"{path} {microseconds}\n")
+
+        frames_path = os.path.join(directory, f"{file_id}_render_frames.csv")
+        layers = sorted({name for frame in self.frames for name in frame if name != "t"})
+        with open(frames_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["t"] + layers)
+            for frame in self.frames:
+                writer.writerow([f"{frame['t']:.4f}"] +
+                                [f"{frame.get(name, 0.0) * 1000:.3f}" for name in layers])
+
+        summary_path = os.path.join(directory, f"{file_id}_render_profile.txt")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(self.summary() + "\n")
+
+        return [folded_path, frames_path, summary_path]
@@ -0,0 +1,134 @@
+import math
+import re
+from collections import Counter
+from utils.subtitle_handler import SENTENCE_END_PATTERN, CLAUSE_END_PATTERN
+
+MIN_SCENE_SECONDS = 3.0
+MAX_SCENE_SECONDS = 8.0
+
+# Cues compared on each side of a boundary to detect a topic shift
+COHESION_WINDOW = 2
+# Words shorter than this are mostly function words in space-separated languages
+MIN_CONTENT_WORD_LENGTH = 4
+# Content words are compared on their first letters, a crude language-independent stemmer
+STEM_LENGTH = 6
+
+# Scenes outside the duration range cost this much plus their excess in seconds, so the range
+# is only broken when a single cue is longer than the maximum
+DURATION_PENALTY = 10.0
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _content_words(text):
+    return Counter(word[:STEM_LENGTH] for word in WORD_PATTERN.findall(text.casefold())
+                   if len(word) >= MIN_CONTENT_WORD_LENGTH)
+
+
+def _cosine(a, b):
+    dot = sum(count * b[word] for word, count in a.items() if word in b)
+    norm = math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def topic_shift_scores(cues, window=COHESION_WINDOW):
+    """
+    Scores how much the topic changes at each boundary between two cues, by comparing the
+    content words of the cues before and after it (lexical cohesion, as in TextTiling).
+
+    Args:
+        cues (list): Subtitle cues as (start, end, text) tuples.
+        window (int): Number of cues compared on each side.
+
+    Returns:
+        list[float]: For each boundary after cues[i] (i < len(cues) - 1), from 0 (same topic)
+                     to 1 (no shared content words).
+    """
+    words = [_content_words(text) for _, _, text in cues]
+    scores = []
+    for i in range(len(cues) - 1):
+        before = sum(words[max(0, i - window + 1):i + 1], Counter())
+        after = sum(words[i + 1:i + 1 + window], Counter())
+        scores.append(1.0 - _cosine(before, after) if before and after else 0.5)
+    return scores
+
+
+def _boundary_scores(cues):
+    """
+    Scores every boundary between two cues as a scene change, from 0 (mid-sentence, same topic)
+    to 1 (end of a sentence and change of topic).
+    """
+    scores = []
+    for (_, _, text), shift in zip(cues, topic_shift_scores(cues)):
+        if SENTENCE_END_PATTERN.search(text):
+            punctuation = 1.0
+        elif CLAUSE_END_PATTERN.search(text):
+            punctuation = 0.4
+        else:
+            punctuation = 0.0
+        scores.append(0.5 * punctuation + 0.5 * shift)
+    return scores
+
+
+def _duration_cost(duration, min_seconds, max_seconds):
+    if duration < min_seconds:
+        return DURATION_PENALTY + (min_seconds - duration)
+    if duration > max_seconds:
+        return DURATION_PENALTY + (duration - max_seconds)
+    target = (min_seconds + max_seconds) / 2
+    return 0.5 * ((duration - target) / target) ** 2
+
+
+def plan_scenes(cues, min_seconds=MIN_SCENE_SECONDS, max_seconds=MAX_SCENE_SECONDS):
+    """
+    Groups consecutive subtitle cues into scenes, one image each.
+
+    Scenes last between min_seconds and max_seconds (measured until the next scene starts) and
+    preferably change at the end of a sentence where the topic shifts, so the number of images
+    follows the length of the video rather than the number of cues. The grouping minimizes the
+    total cost of the scene durations and of the boundaries used, by dynamic programming.
+
+    Args:
+        cues (list): Subtitle cues as (start, end, text) tuples.
+        min_seconds (float): Minimum duration of a scene.
+        max_seconds (float): Maximum duration of a scene.
+
+    Returns:
+        list[dict]: The scenes, with "start" and "end" times (of their first and last cue),
+                    the indices of their "first_cue" and "last_cue", and their "text".
+    """
+    if not cues:
+        return []
+    count = len(cues)
+    boundary_scores = _boundary_scores(cues)
+    # best[j]: cost of the best grouping of cues[:j]; previous[j]: where its last scene starts
+    best = [0.0] + [math.inf] * count
+    previous = [0] * (count + 1)
+    for j in range(1, count + 1):
+        scene_end = cues[j][0] if j < count else cues[-1][1]
+        cut_cost = 1.0 - boundary_scores[j - 1] if j < count else 0.0
+        for i in range(j - 1, -1, -1):
+            duration = scene_end - cues[i][0]
+            # A scene may exceed the maximum only when it is a single cue
+            if duration > max_seconds and i < j - 1:
+                break
+            cost = best[i] + _duration_cost(duration, min_seconds, max_seconds) + cut_cost
+            if cost < best[j]:
+                best[j] = cost
+                previous[j] = i
+
+    bounds = []
+    j = count
+    while j > 0:
+        bounds.append((previous[j], j - 1))
+        j = previous[j]
+    return [
+        {
+            "start": cues[first][0],
+            "end": cues[last][1],
+            "first_cue": first,
+            "last_cue": last,
+            "text": " ".join(cue[2] for cue in cues[first:last + 1]),
+        }
+        for first, last in reversed(bounds)
+    ]
@@ -0,0 +1,120 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.text_segmentation import SentenceSplitter
+
+
+def _synthesize_with_retries(synthesize, args, label, max_retries, retry_delay, logger):
+    """
+    Calls synthesize(*args), retrying a failed request with exponential backoff.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return synthesize(*args)
+        except Exception as e:
+            if attempt == max_retries:
+                raise RuntimeError(
+                    f"TTS failed for {label} after {max_retries + 1} attempts: {e}")
+            delay = retry_delay * (2 ** attempt)
+            if logger:
+                logger.warning(
+                    f"TTS failed for {label} ({e}). Retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+
+def stream_script_to_speech(events, synthesize, wait_for_instructions: bool = False,
+                            max_workers: int = 4, min_sentence_chars: int = 40,
+                            max_retries: int = 2, retry_delay: float = 1.0, logger=None):
+    """
+    Consumes a streamed script and synthesizes each sentence as soon as it is complete.
+
+    Speech synthesis runs in a thread pool while the script is still being generated, so the
+    first audio chunks are ready long before the language model finishes writing.
+
+    Args:
+        events (iterable): ("script", text) and ("voice_instructions", dict) events, as yielded
+                           by `OpenAIService.stream_script*`.
+        synthesize (callable): Function (sentence, voice_instructions) -> MP3 bytes.
+        wait_for_instructions (bool): Hold sentences back until the voice instructions arrive.
+        max_workers (int): Maximum number of concurrent TTS requests.
+        min_sentence_chars (int): Minimum number of characters sent in one TTS request.
+        max_retries (int): Number of times a failed sentence is retried.
+        retry_delay (float): Delay before the first retry, in seconds.
+        logger: Logger instance for logging.
+
+    Returns:
+        tuple: A tuple containing:
+            - str: The full script text.
+            - dict: The voice instructions (None if the stream carried none).
+            - list[bytes]: The audio chunks, in script order.
+    """
+    splitter = SentenceSplitter(min_chars=min_sentence_chars)
+    script_parts = []
+    voice_instructions = None
+    pending = []
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit(sentence):
+            label = f"sentence {len(futures) + 1}"
+            if logger:
+                logger.debug(f"Sending {label} to TTS: {sentence}")
+            futures.append(executor.submit(
+                _synthesize_with_retries, synthesize, (sentence, voice_instructions),
+                label, max_retries, retry_delay, logger))
+
+        for kind, value in events:
+            if kind == "voice_instructions":
+                voice_instructions = value
+                wait_for_instructions = False
+                for sentence in pending:
+                    submit(sentence)
+                pending = []
+                continue
+
+            script_parts.append(value)
+            for sentence in splitter.feed(value):
+                if wait_for_instructions:
+                    pending.append(sentence)
+                else:
+                    submit(sentence)
+
+        for sentence in pending + splitter.flush():
+            submit(sentence)
+
+        audio_chunks = [future.result() for future in futures]
+
+    return "".join(script_parts).strip(), voice_instructions, audio_chunks
+
+
+def synthesize_chunks(chunks: list, synthesize, max_workers: int = 4,
+                      max_retries: int = 2, retry_delay: float = 1.0, logger=None) -> list:
+    """
+    Synthesizes text chunks concurrently, retrying each failed chunk on its own.
+
+    Each chunk is sent together with the text of its neighbours so that providers supporting
+    request stitching can keep the prosody continuous across chunk boundaries.
+
+    Args:
+        chunks (list[str]): The text chunks, in order.
+        synthesize (callable): Function (text, previous_text, next_text) -> MP3 bytes.
+        max_workers (int): Maximum number of concurrent TTS requests.
+        max_retries (int): Number of times a failed chunk is retried.
+        retry_delay (float): Delay before the first retry, in seconds.
+        logger: Logger instance for logging.
+
+    Returns:
+        list[bytes]: The audio chunks, in order.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for i, chunk in enumerate(chunks):
+            previous_text = chunks[i - 1] if i > 0 else None
+            next_text = chunks[i + 1] if i + 1 < len(chunks) else None
+            label = f"chunk {i + 1}/{len(chunks)}"
+            if logger:
+                logger.debug(f"Sending {label} to TTS ({len(chunk)} chars).")
+            futures.append(executor.submit(
+                _synthesize_with_retries, synthesize, (chunk, previous_text, next_text),
+                label, max_retries, retry_delay, logger))
+
+        return [future.result() for future in futures]
@@ -0,0 +1,46 @@
+import time
+from contextlib import contextmanager
+
+_timings = []
+
+
+def record_import(label: str, seconds: float):
+    """
+    Records how long importing a group of modules took.
+
+    Args:
+        label (str): What was imported.
+        seconds (float): The import duration in seconds.
+    """
+    _timings.append((label, seconds))
+
+
+@contextmanager
+def timed_import(label: str):
+    """
+    Context manager recording the duration of the imports made inside it.
+
+    Args:
+        label (str): What is being imported.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_import(label, time.perf_counter() - start)
+
+
+def startup_report() -> str:
+    """
+    Formats the recorded import durations as a table, slowest first.
+
+    Returns:
+        str: The report.
+    """
+    total = sum(seconds for _, seconds in _timings)
+    width = max([len(label) for label, _ in _timings] + [len("Total")])
+    lines = [f"{'Import':<{width}}  {'Time (ms)':>10}"]
+    for label, seconds in sorted(_timings, key=lambda item: -item[1]):
+        lines.append(f"{label:<{width}}  {seconds * 1000:>10.1f}")
+    lines.append(f"{'Total':<{width}}  {total * 1000:>10.1f}")
+    return "\n".join(lines)
@@ -1,4 +1,26 @@
+import bisect
+import difflib
 import re
+import unicodedata
+
+SRT_TIMESTAMP_PATTERN = re.compile(r"(\d+):(\d{2}):(\d{2})[,.](\d{3})")
+SENTENCE_END_PATTERN = re.compile(r"[.!?…。！？]+[\"'”’)\]」』]*$")
+CLAUSE_END_PATTERN = re.compile(r"[,;:，、；：—–]+[\"'”’)\]」』]*$")
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]+")
+# Scripts written without spaces between words
+NO_SPACE_SCRIPT_PATTERN = re.compile(
+    r"[\u0e00-\u0e7f\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+# Lengths of the word and character n-grams used as alignment anchors, tried in order: an
+# n-gram found exactly once in both sequences pins them together, however far apart they are
+WORD_ANCHOR_LENGTHS = (4, 2, 1)
+CHAR_ANCHOR_LENGTHS = (24, 12, 6)
+# Ranges between anchors are aligned character by character only up to this many character
+# pairs; larger ranges without any shared n-gram are left unmatched (e.g. divergent text)
+MAX_GAP_PAIRS = 40000
+# Within larger gaps, shorter runs of equal characters are taken as coincidences
+MIN_GAP_MATCH = 3
+SMALL_GAP = 32
 
 
 def seconds_to_srt_timestamp(seconds: float) -> str:
@@ -18,6 +40,47 @@ def seconds_to_srt_timestamp(seconds: float) -> str:
     return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
 
 
+def srt_timestamp_to_seconds(timestamp: str) -> float:
+    """
+    Converts an SRT timestamp (HH:MM:SS,ms) to seconds.
+
+    Args:
+        timestamp (str): The timestamp in SRT format.
+
+    Returns:
+        float: The time in seconds.
+    """
+    match = SRT_TIMESTAMP_PATTERN.match(timestamp.strip())
+    if not match:
+        raise ValueError(f"Invalid SRT timestamp: {timestamp}")
+    hours, minutes, secs, milliseconds = (int(g) for g in match.groups())
+    return hours * 3600 + minutes * 60 + secs + milliseconds / 1000.0
+
+
+def parse_srt(srt_content: str):
+    """
+    Parses SRT subtitle content back into cues.
+
+    Args:
+        srt_content (str): The SRT-formatted subtitle text.
+
+    Returns:
+        list: A list of cues, where each cue is a tuple (start, end, text).
+    """
+    cues = []
+    for block in re.split(r"\n\s*\n", srt_content.strip()):
+        lines = block.strip().splitlines()
+        timing_index = next(
+            (i for i, line in enumerate(lines) if "-->" in line), None)
+        if timing_index is None:
+            continue
+        start, end = lines[timing_index].split("-->")
+        text = " ".join(line.strip() for line in lines[timing_index + 1:])
+        cues.append((srt_timestamp_to_seconds(start),
+                    srt_timestamp_to_seconds(end), text))
+    return cues
+
+
 def tokenize_with_punctuation(text: str):
     """
     Tokenizes a text into words and punctuation marks, preserving their order.
@@ -28,13 +91,212 @@ def tokenize_with_punctuation(text: str):
     Returns:
         list[str]: A list of tokens, where words and punctuation marks are separate.
     """
-    return re.findall(r"\w+|[^\w\s]+", text)
+    return TOKEN_PATTERN.findall(text)
+
+
+def _normalized_chars(text: str):
+    """
+    Yields (character, index in text) for the letters and digits of a text, case-folded and
+    without accents, so that "Straße", "strasse" and "STRASSE" compare equal.
+    """
+    for index, char in enumerate(text):
+        for normalized in unicodedata.normalize("NFKD", char.casefold()):
+            if normalized.isalnum():
+                yield normalized, index
+
+
+def _unique_ngrams(text: str, start: int, end: int, n: int):
+    """
+    Returns the n-grams occurring exactly once in text[start:end], with their position.
+    """
+    positions = {}
+    for i in range(start, end - n + 1):
+        gram = text[i:i + n]
+        positions[gram] = -1 if gram in positions else i
+    return {gram: i for gram, i in positions.items() if i >= 0}
+
+
+def _anchor_chain(a: str, b: str, i0: int, i1: int, j0: int, j1: int, n: int):
+    """
+    Finds the n-grams unique to both ranges and keeps the longest chain of them in the same
+    order in a and b (patience sorting), so moved or repeated text cannot anchor the alignment.
+
+    Returns:
+        list[tuple]: (index in a, index in b) of the anchors, in order.
+    """
+    unique_b = _unique_ngrams(b, j0, j1, n)
+    pairs = sorted((i, unique_b[gram]) for gram, i in _unique_ngrams(a, i0, i1, n).items()
+                   if gram in unique_b)
+    # Longest increasing subsequence of the b positions
+    tails, tail_indices, previous = [], [], [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        position = bisect.bisect_left(tails, j)
+        if position == len(tails):
+            tails.append(j)
+            tail_indices.append(k)
+        else:
+            tails[position] = j
+            tail_indices[position] = k
+        previous[k] = tail_indices[position - 1] if position else None
+    chain = []
+    k = tail_indices[-1] if tail_indices else None
+    while k is not None:
+        chain.append(pairs[k])
+        k = previous[k]
+    return chain[::-1]
+
+
+def _align_gap(a: str, b: str, i0: int, i1: int, j0: int, j1: int, matches: list):
+    """
+    Aligns a small range without shared anchors character by character.
+    """
+    if (i1 - i0) * (j1 - j0) > MAX_GAP_PAIRS:
+        return
+    small = i1 - i0 <= SMALL_GAP and j1 - j0 <= SMALL_GAP
+    matcher = difflib.SequenceMatcher(None, a[i0:i1], b[j0:j1], autojunk=False)
+    for i, j, size in matcher.get_matching_blocks():
+        if size and (small or size >= MIN_GAP_MATCH):
+            matches.extend((i0 + i + d, j0 + j + d) for d in range(size))
+
+
+def _align_range(a, b, i0: int, i1: int, j0: int, j1: int, matches: list,
+                 lengths=CHAR_ANCHOR_LENGTHS, level: int = 0):
+    """
+    Aligns a[i0:i1] with b[j0:j1], two strings or two tuples of words, appending the matched
+    pairs to matches in order. Ranges of characters without any anchor are aligned by
+    _align_gap; ranges of words are left to the character alignment.
+    """
+    # Common prefix and suffix
+    while i0 < i1 and j0 < j1 and a[i0] == b[j0]:
+        matches.append((i0, j0))
+        i0 += 1
+        j0 += 1
+    suffix = []
+    while i1 > i0 and j1 > j0 and a[i1 - 1] == b[j1 - 1]:
+        i1 -= 1
+        j1 -= 1
+        suffix.append((i1, j1))
+
+    if i0 < i1 and j0 < j1:
+        chain = []
+        while level < len(lengths):
+            chain = _anchor_chain(a, b, i0, i1, j0, j1, lengths[level])
+            if chain:
+                break
+            level += 1
+        if not chain and isinstance(a, str):
+            _align_gap(a, b, i0, i1, j0, j1, matches)
+        for i, j in chain:
+            if i < i0 or j < j0:
+                # Inside the match extended from the previous anchor
+                continue
+            # The ranges between anchors are smaller: look for anchors again at the same length
+            _align_range(a, b, i0, i, j0, j, matches, lengths, level)
+            while i < i1 and j < j1 and a[i] == b[j]:
+                matches.append((i, j))
+                i += 1
+                j += 1
+            i0, j0 = i, j
+        if chain:
+            _align_range(a, b, i0, i1, j0, j1, matches, lengths, level)
+
+    matches.extend(reversed(suffix))
+
+
+def _word_ranges(owners):
+    """
+    Returns the (start, end) ranges of the runs of equal owners, i.e. the characters of each word.
+    """
+    ranges = []
+    for index, owner in enumerate(owners):
+        if index and owner == owners[index - 1]:
+            ranges[-1][1] = index + 1
+        else:
+            ranges.append([index, index + 1])
+    return ranges
+
+
+def _align_chars(a: str, b: str, a_owners, b_owners):
+    """
+    Aligns two character sequences monotonically. Their words are aligned first, pinned by
+    word n-grams they share, then the characters of the words left between matched words,
+    pinned by character n-grams. Insertions and deletions of any length are recovered from at
+    the next anchor, and the work stays close to linear in the length.
+
+    Args:
+        a, b (str): The characters.
+        a_owners, b_owners (list): The word of every character.
+
+    Returns:
+        list[tuple]: Matched (index in a, index in b) pairs.
+    """
+    a_words, b_words = _word_ranges(a_owners), _word_ranges(b_owners)
+    word_matches = []
+    _align_range(tuple(a[s:e] for s, e in a_words), tuple(b[s:e] for s, e in b_words),
+                 0, len(a_words), 0, len(b_words), word_matches, lengths=WORD_ANCHOR_LENGTHS)
+
+    matches = []
+    i0 = j0 = 0
+    for ka, kb in word_matches + [(None, None)]:
+        i1 = a_words[ka][0] if ka is not None else len(a)
+        j1 = b_words[kb][0] if kb is not None else len(b)
+        if i1 > i0 and j1 > j0:
+            _align_range(a, b, i0, i1, j0, j1, matches)
+        if ka is not None:
+            (i0, i1), j0 = a_words[ka], b_words[kb][0]
+            matches.extend((i0 + d, j0 + d) for d in range(i1 - i0))
+            i0, j0 = i1, b_words[kb][1]
+    return matches
+
+
+def _split_gap(gap: str):
+    """
+    Splits the text between two aligned words into the part that trails the first word and the
+    part that leads the second one.
+    """
+    if not any(char.isspace() for char in gap):
+        # No whitespace (e.g. CJK): opening brackets and quotes lead, anything else trails
+        k = len(gap)
+        while k > 0 and unicodedata.category(gap[k - 1]) in ("Ps", "Pi"):
+            k -= 1
+        return gap[:k], gap[k:]
+
+    # Pieces glued to a word stay with it ("word, ¿next" -> "," and "¿"); loose pieces (words
+    # Whisper missed, standalone quotes) are shared, with opening marks kept on the right
+    pieces = gap.split()
+    glued_trailing = pieces.pop(0) if pieces and not gap[0].isspace() else ""
+    glued_leading = pieces.pop() if pieces and not gap[-1].isspace() else ""
+    half = (len(pieces) + 1) // 2
+    while half and all(unicodedata.category(c) in ("Ps", "Pi") for c in pieces[half - 1]):
+        half -= 1
+    trailing = " ".join([glued_trailing] * bool(glued_trailing) + pieces[:half])
+    leading = " ".join(pieces[half:] + [glued_leading] * bool(glued_leading))
+    if pieces[:half]:
+        trailing = trailing if glued_trailing else " " + trailing
+    if pieces[half:]:
+        leading = leading if glued_leading else leading + " "
+    return trailing, leading
+
+
+def _distribute(pieces, count):
+    """
+    Distributes whitespace-separated pieces of text over count words, in order.
+    """
+    return [" ".join(pieces[u * len(pieces) // count:(u + 1) * len(pieces) // count])
+            for u in range(count)]
 
 
 def align_words_with_punctuation(words, full_text):
     """
     Aligns a list of word objects with the punctuated tokens from the full text.
 
+    The Whisper words and the transcript text are compared as sequences of normalized
+    characters (case-folded, without accents or punctuation), so words that Whisper splits or
+    merges differently from the text (contractions, numbers, scripts without spaces) still line
+    up. The sequences are pinned together by character n-grams they share, so skipped paragraphs
+    or hallucinated passages are recovered from at the next shared text, and text that no word
+    matches is attached to the neighbouring words instead of drifting to the end of the video.
+
     Args:
         words (list): A list of word objects, each containing `word`, `start`, and `end`.
         full_text (str): The full transcript text with punctuation.
@@ -42,98 +304,421 @@ def align_words_with_punctuation(words, full_text):
     Returns:
         list[tuple]: A list of tuples where each tuple contains (start, end, word_with_punctuation).
     """
-    punct_tokens = tokenize_with_punctuation(full_text)
-    aligned_words = []
-    pt_idx = 0
-
-    for w_obj in words:
-        base_word = None
-        while pt_idx < len(punct_tokens):
-            token = punct_tokens[pt_idx]
-            pt_idx += 1
-            if re.match(r"\w+", token, flags=re.UNICODE):
-                base_word = token
-                if pt_idx < len(punct_tokens):
-                    next_token = punct_tokens[pt_idx]
-                    if re.match(r"[^\w\s]+", next_token):
-                        base_word += next_token
-                        pt_idx += 1
-                break
+    word_chars = []
+    word_owner = []
+    for k, w_obj in enumerate(words):
+        for char, _ in _normalized_chars(w_obj.word):
+            word_chars.append(char)
+            word_owner.append(k)
+    text_chars = []
+    text_index = []
+    for char, index in _normalized_chars(full_text):
+        text_chars.append(char)
+        text_index.append(index)
+
+    # Span of the text matched by each word
+    spans = [None] * len(words)
+    # Words of the text are separated by whitespace
+    text_owner = []
+    for k, index in enumerate(text_index):
+        gap = full_text[text_index[k - 1]:index] if k else ""
+        text_owner.append((text_owner[-1] + any(c.isspace() for c in gap)) if k else 0)
+    for i, j in _align_chars("".join(word_chars), "".join(text_chars), word_owner, text_owner):
+        k = word_owner[i]
+        position = text_index[j]
+        if spans[k] is None:
+            spans[k] = [position, position + 1]
+        else:
+            spans[k][1] = position + 1
+
+    anchored = [k for k, span in enumerate(spans) if span is not None]
+    if not anchored:
+        return [(w.start, w.end, w.word.strip()) for w in words]
 
-        if base_word is None:
-            base_word = w_obj.word
+    texts = [None] * len(words)
+    for k in anchored:
+        texts[k] = full_text[spans[k][0]:spans[k][1]]
 
-        aligned_words.append((w_obj.start, w_obj.end, base_word))
+    # Attach the text between anchored words to them, or share it among the unmatched
+    # words in between
+    previous = None
+    for k in anchored + [None]:
+        gap_start = spans[previous][1] if previous is not None else 0
+        gap_end = spans[k][0] if k is not None else len(full_text)
+        gap = full_text[gap_start:gap_end]
+        first = previous + 1 if previous is not None else 0
+        last = k if k is not None else len(words)
+        unmatched = last - first
 
-    # Append any remaining tokens using spaces and then remove extra spaces before punctuation.
-    if pt_idx < len(punct_tokens) and aligned_words:
-        remaining = " ".join(punct_tokens[pt_idx:])
-        remaining = re.sub(r'\s+([^\w\s])', r'\1', remaining)
-        start, end, word_with_punc = aligned_words[-1]
-        # Insert a space if needed
-        if word_with_punc and remaining and word_with_punc[-1].isalnum() and remaining[0].isalnum():
-            aligned_words[-1] = (start, end, word_with_punc + " " + remaining)
+        leading = ""
+        if unmatched:
+            pieces = gap.split()
+            if pieces and previous is not None and not gap[0].isspace():
+                texts[previous] += pieces.pop(0)
+            if pieces and k is not None and not gap[-1].isspace():
+                leading = pieces.pop()
+            for u, piece in zip(range(first, last), _distribute(pieces, unmatched)):
+                texts[u] = piece
+        elif previous is None:
+            leading = gap.lstrip()
+        elif k is None:
+            texts[previous] += gap.rstrip()
         else:
-            aligned_words[-1] = (start, end, word_with_punc + remaining)
+            trailing, leading = _split_gap(gap)
+            texts[previous] += trailing
+        if k is not None:
+            texts[k] = leading + texts[k]
+        previous = k
 
-    return aligned_words
+    return [
+        (w_obj.start, w_obj.end, text.strip())
+        for w_obj, text in zip(words, texts)
+        if text and text.strip()
+    ]
 
 
-def format_srt_from_aligned_words(aligned_words, max_words_per_cue=10, max_chars_per_cue=40):
+def join_words(texts):
     """
-    Formats a list of aligned words into SRT subtitle format and returns cues.
+    Joins words with spaces, except between words of scripts written without spaces (CJK, Thai).
+
+    Args:
+        texts (list[str]): The words, in order.
+
+    Returns:
+        str: The joined text.
+    """
+    parts = []
+    for text in texts:
+        if parts:
+            parts.append(word_separator(parts[-1], text))
+        parts.append(text)
+    return "".join(parts)
+
+
+def word_separator(previous, text):
+    """
+    Returns the separator between two consecutive words: a space, or nothing between words of
+    scripts written without spaces.
+    """
+    if NO_SPACE_SCRIPT_PATTERN.match(previous[-1]) and NO_SPACE_SCRIPT_PATTERN.match(text[0]):
+        return ""
+    return " "
+
+
+def group_words_by_cue(cues, words):
+    """
+    Assigns timed words to the cues they are shown in.
+
+    Args:
+        cues (list): A list of cues, where each cue is a tuple (start, end, text).
+        words (list[tuple]): Timed words (start, end, text), in order.
+
+    Returns:
+        list[list[tuple]]: The words of each cue, in order.
+    """
+    # Cues start with their first word; allow for the millisecond rounding of SRT files
+    starts = [start - 0.001 for start, _, _ in cues]
+    groups = [[] for _ in cues]
+    for word in words:
+        index = bisect.bisect_right(starts, word[0]) - 1
+        if index >= 0:
+            groups[index].append(tuple(word))
+    return groups
+
+
+def _break_strength(word_text, gap, pause_threshold):
+    """
+    Scores how good a cue break right after a word is: 2 at the end of a sentence or after a
+    long pause, 1 after clause punctuation or a short pause, 0 otherwise.
+    """
+    if SENTENCE_END_PATTERN.search(word_text) or gap >= 2 * pause_threshold:
+        return 2
+    if CLAUSE_END_PATTERN.search(word_text) or gap >= pause_threshold:
+        return 1
+    return 0
+
+
+def segment_aligned_words(aligned_words, max_words_per_cue=10, max_chars_per_cue=40,
+                          min_cue_duration=0.8, max_cue_duration=6.0, pause_threshold=0.35):
+    """
+    Groups aligned words into subtitle cues in a single pass.
+
+    Cues are closed at sentence ends and long pauses once they last at least min_cue_duration.
+    When a cue would exceed max_words_per_cue, max_chars_per_cue or max_cue_duration, it is
+    broken at the best earlier break point (punctuation or pause between a word's end and the
+    next word's start) instead of in the middle of a phrase.
 
     Args:
         aligned_words (list[tuple]): A list of tuples containing (start, end, word_with_punctuation).
         max_words_per_cue (int): Maximum number of words allowed per subtitle cue.
         max_chars_per_cue (int): Maximum number of characters allowed per subtitle cue.
+        min_cue_duration (float): Minimum duration of a cue closed early at a sentence end, in seconds.
+        max_cue_duration (float): Maximum duration of a cue, in seconds.
+        pause_threshold (float): Gap between two words that counts as a pause, in seconds.
 
     Returns:
-        tuple: A tuple containing:
-            - str: The SRT-formatted subtitle text.
-            - list: A list of cues, where each cue is a tuple (start, end, text).
+        list[list[tuple]]: The words of each cue, in order.
+    """
+    groups = []
+    current = []
+    current_len = 0
+    # (index of the last word before the break, strength) of the best break in the current cue
+    best_break = None
+
+    def text_len(words):
+        return sum(len(w[2]) for w in words) + max(0, len(words) - 1)
+
+    for k, word in enumerate(aligned_words):
+        start, end, w_text = word
+        # Break until the word fits: the rest of a cue broken at an earlier break point may
+        # still be too long with it
+        while current and (
+            len(current) + 1 > max_words_per_cue
+            or current_len + 1 + len(w_text) > max_chars_per_cue
+            or end - current[0][0] > max_cue_duration
+        ):
+            # Break at the best earlier break point if it leaves a reasonably full cue
+            if best_break and best_break[0] + 1 < len(current) and \
+                    text_len(current[:best_break[0] + 1]) >= max_chars_per_cue // 3:
+                split = best_break[0] + 1
+            else:
+                split = len(current)
+            groups.append(current[:split])
+            current = current[split:]
+            current_len = text_len(current)
+            best_break = None
+            for i in range(len(current) - 1):
+                gap = current[i + 1][0] - current[i][1]
+                strength = _break_strength(
+                    current[i][2], gap, pause_threshold)
+                if strength and (not best_break or strength >= best_break[1]):
+                    best_break = (i, strength)
+
+        current.append(word)
+        current_len += len(w_text) + (1 if len(current) > 1 else 0)
+
+        gap = aligned_words[k + 1][0] - \
+            end if k + 1 < len(aligned_words) else 0.0
+        strength = _break_strength(w_text, gap, pause_threshold)
+        if strength == 2 and end - current[0][0] >= min_cue_duration:
+            groups.append(current)
+            current = []
+            current_len = 0
+            best_break = None
+        elif strength and (not best_break or strength >= best_break[1]):
+            best_break = (len(current) - 1, strength)
+
+    if current:
+        groups.append(current)
+    return groups
+
+
+def build_cues(groups, min_cue_duration=0.8, max_chars_per_second=20.0, last_cue_min_duration=2.0):
+    """
+    Turns groups of words into timed cues, extending cues that are too short to read.
+
+    A cue is extended up to the start of the next cue so that it lasts at least
+    min_cue_duration and can be read at max_chars_per_second.
+
+    Args:
+        groups (list[list[tuple]]): The words of each cue, as returned by segment_aligned_words.
+        min_cue_duration (float): Minimum duration of a cue, in seconds.
+        max_chars_per_second (float): Maximum reading speed, in characters per second.
+        last_cue_min_duration (float): Minimum duration of the last cue, in seconds.
+
+    Returns:
+        list: A list of cues, where each cue is a tuple (start, end, text).
     """
     cues = []
-    current_words = []
-
-    def flush_cue():
-        """
-        Flushes the current buffered words into a subtitle cue.
-        """
-        nonlocal current_words
-        if not current_words:
-            return
-        start_time = current_words[0][0]
-        end_time = current_words[-1][1]
-        cue_text = " ".join(w[2] for w in current_words)
+    for i, words in enumerate(groups):
+        start_time = words[0][0]
+        end_time = words[-1][1]
+        cue_text = join_words([w[2] for w in words])
+        needed = max(min_cue_duration, len(cue_text) / max_chars_per_second)
+        if end_time - start_time < needed:
+            limit = groups[i + 1][0][0] if i + \
+                1 < len(groups) else start_time + needed
+            end_time = max(end_time, min(start_time + needed, limit))
         cues.append((start_time, end_time, cue_text))
-        current_words = []
-
-    for w_data in aligned_words:
-        start, end, w_text = w_data
-        tentative_line = " ".join([cw[2] for cw in current_words] + [w_text])
-        if (len(current_words) + 1 > max_words_per_cue) or (len(tentative_line) > max_chars_per_cue):
-            flush_cue()
-            current_words = [w_data]
-        else:
-            current_words.append(w_data)
-
-    flush_cue()
 
     # Adjust the duration of the last one if it is too short
     if cues:
         last_start, last_end, last_text = cues[-1]
-        min_duration = 2.0  # minimum duration in seconds for the last caption
-        if (last_end - last_start) < min_duration:
-            last_end = last_start + min_duration
+        if (last_end - last_start) < last_cue_min_duration:
+            last_end = last_start + last_cue_min_duration
             cues[-1] = (last_start, last_end, last_text)
 
-    srt_content = ""
+    return cues
+
+
+def seconds_to_vtt_timestamp(seconds: float) -> str:
+    """
+    Converts seconds to the WebVTT timestamp format (HH:MM:SS.mmm).
+    """
+    return seconds_to_srt_timestamp(seconds).replace(",", ".")
+
+
+def seconds_to_ass_timestamp(seconds: float) -> str:
+    """
+    Converts seconds to the ASS timestamp format (H:MM:SS.cc).
+    """
+    centiseconds = int(round(seconds * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+
+def iter_srt(cues):
+    """
+    Yields the SRT blocks of the cues one by one (see format_srt).
+    """
     for i, (start, end, text) in enumerate(cues, start=1):
-        srt_content += (
+        yield (
             f"{i}\n"
             f"{seconds_to_srt_timestamp(start)} --> {seconds_to_srt_timestamp(end)}\n"
             f"{text}\n\n"
         )
 
-    return srt_content, cues
+
+def iter_vtt(cues):
+    """
+    Yields the WebVTT header and cue blocks one by one (see format_vtt).
+    """
+    yield "WEBVTT\n\n"
+    for start, end, text in cues:
+        yield (
+            f"{seconds_to_vtt_timestamp(start)} --> {seconds_to_vtt_timestamp(end)}\n"
+            f"{text}\n\n"
+        )
+
+
+# Colours of the karaoke words in override tags (&HBBGGRR&): yellow, and white while spoken
+ASS_BASE_COLOUR = "&H00FFFF&"
+ASS_HIGHLIGHT_COLOUR = "&HFFFFFF&"
+
+
+def _ass_escape(text):
+    # ASS has no escape sequences: neutralize override blocks and backslash commands
+    return text.replace("\\", "＼").replace("{", "(").replace("}", ")").replace("\n", "\\N")
+
+
+def _ass_karaoke_text(start, end, words):
+    """
+    Builds the text of a karaoke dialogue line highlighting only the word being spoken, like the
+    rendered subtitles: every word switches to the highlight colour when it starts and back to
+    the base colour when the next word starts (or, for the last word, when it ends). \\k tags
+    are not used, as they leave every word already spoken highlighted.
+    """
+    def offset(t):
+        # \t times are in milliseconds from the start of the line
+        return max(0, int(round((t - start) * 1000)))
+
+    def switch(t, colour):
+        # A 1 ms transition, as renderers may divide by the duration of the transition
+        return f"\\t({offset(t)},{offset(t) + 1},\\1c{colour})"
+
+    parts = []
+    for i, (word_start, word_end, text) in enumerate(words):
+        off = words[i + 1][0] if i + 1 < len(words) else min(word_end, end)
+        separator = word_separator(words[i - 1][2], text) if i else ""
+        # Tags apply to the rest of the line: each word starts again from the base colour
+        parts.append(f"{separator}{{\\1c{ASS_BASE_COLOUR}{switch(word_start, ASS_HIGHLIGHT_COLOUR)}"
+                     f"{switch(off, ASS_BASE_COLOUR)}}}{_ass_escape(text)}")
+    return "".join(parts)
+
+
+def iter_ass(cues, font_name="Helvetica", font_size=50, play_res=(1080, 1920), margin_v=250,
+             cue_words=None):
+    """
+    Yields the ASS header and dialogue lines one by one (see format_ass).
+
+    With cue_words, the lines carry karaoke tags: each word is shown in the highlight color
+    (white) instead of the base color (yellow) while it is spoken.
+    """
+    yield (
+        "[Script Info]\n"
+        "ScriptType: v4.00+\n"
+        f"PlayResX: {play_res[0]}\n"
+        f"PlayResY: {play_res[1]}\n"
+        "WrapStyle: 0\n"
+        "ScaledBorderAndShadow: yes\n\n"
+        "[V4+ Styles]\n"
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding\n"
+        # Yellow text with a black outline, bottom-centered like the rendered subtitles
+        f"Style: Default,{font_name},{font_size},&H0000FFFF,&H00FFFFFF,&H00000000,&H00000000,"
+        f"0,0,0,0,100,100,0,0,1,2,0,2,40,40,{margin_v},1\n\n"
+        "[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+    )
+    for i, (start, end, text) in enumerate(cues):
+        if cue_words and cue_words[i]:
+            text = _ass_karaoke_text(start, end, cue_words[i])
+        else:
+            text = _ass_escape(text)
+        yield (
+            f"Dialogue: 0,{seconds_to_ass_timestamp(start)},{seconds_to_ass_timestamp(end)},"
+            f"Default,,0,0,0,,{text}\n"
+        )
+
+
+SUBTITLE_WRITERS = {
+    "srt": iter_srt,
+    "vtt": iter_vtt,
+    "ass": iter_ass,
+}
+
+
+def format_subtitles(cues, subtitle_format="srt", cue_words=None):
+    """
+    Formats cues as SRT, WebVTT or ASS subtitle text.
+
+    Args:
+        cues (list): A list of cues, where each cue is a tuple (start, end, text).
+        subtitle_format (str): "srt", "vtt" or "ass".
+        cue_words (list[list[tuple]], optional): The timed words of each cue (see
+                                                 group_words_by_cue). ASS output then carries
+                                                 karaoke tags; other formats ignore them.
+
+    Returns:
+        str: The formatted subtitle text.
+    """
+    if subtitle_format == "ass" and cue_words:
+        return "".join(iter_ass(cues, cue_words=cue_words))
+    return "".join(SUBTITLE_WRITERS[subtitle_format](cues))
+
+
+def format_srt_from_aligned_words(aligned_words, max_words_per_cue=10, max_chars_per_cue=40,
+                                  min_cue_duration=0.8, max_cue_duration=6.0, pause_threshold=0.35,
+                                  max_chars_per_second=20.0):
+    """
+    Formats a list of aligned words into SRT subtitle format and returns cues.
+
+    Args:
+        aligned_words (list[tuple]): A list of tuples containing (start, end, word_with_punctuation).
+        max_words_per_cue (int): Maximum number of words allowed per subtitle cue.
+        max_chars_per_cue (int): Maximum number of characters allowed per subtitle cue.
+        min_cue_duration (float): Minimum duration of a cue, in seconds.
+        max_cue_duration (float): Maximum duration of a cue, in seconds.
+        pause_threshold (float): Gap between two words that counts as a pause, in seconds.
+        max_chars_per_second (float): Maximum reading speed, in characters per second.
+
+    Returns:
+        tuple: A tuple containing:
+            - str: The SRT-formatted subtitle text.
+            - list: A list of cues, where each cue is a tuple (start, end, text).
+    """
+    groups = segment_aligned_words(
+        aligned_words,
+        max_words_per_cue=max_words_per_cue,
+        max_chars_per_cue=max_chars_per_cue,
+        min_cue_duration=min_cue_duration,
+        max_cue_duration=max_cue_duration,
+        pause_threshold=pause_threshold
+    )
+    cues = build_cues(groups, min_cue_duration=min_cue_duration,
+                      max_chars_per_second=max_chars_per_second)
+
+    return format_subtitles(cues, "srt"), cues
@@ -0,0 +1,117 @@
+import re
+
+# A sentence ends with terminal punctuation (optionally followed by closing quotes or
+# brackets) and whitespace. CJK full-width terminators do not need trailing whitespace.
+SENTENCE_BOUNDARY_PATTERN = re.compile(
+    r"[.!?…]+[\"'”’)\]]*\s+|[。！？]+[\"'”’」』)\]]*\s*"
+)
+
+PARAGRAPH_BREAK_PATTERN = re.compile(r"\n\s*\n")
+
+
+class SentenceSplitter:
+    """
+    Incrementally splits streamed text into sentences.
+
+    Text is fed in arbitrary pieces (e.g. tokens from a streamed chat completion) and
+    complete sentences are returned as soon as their boundary is seen. Sentences shorter
+    than `min_chars` are merged with the following one so that short interjections
+    ("Hmmm...", "Haha!") are not synthesized on their own.
+    """
+
+    def __init__(self, min_chars: int = 40):
+        """
+        Initialize the splitter.
+
+        Args:
+            min_chars (int): Minimum number of characters of an emitted sentence.
+        """
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> list:
+        """
+        Adds a piece of text and returns the sentences completed by it.
+
+        Args:
+            text (str): The next piece of streamed text.
+
+        Returns:
+            list[str]: Sentences that are complete, in order.
+        """
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_BOUNDARY_PATTERN.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> list:
+        """
+        Returns whatever text is still buffered as a final sentence.
+
+        Returns:
+            list[str]: The remaining sentence, or an empty list if nothing is buffered.
+        """
+        remaining = self._buffer.strip()
+        self._buffer = ""
+        return [remaining] if remaining else []
+
+
+def split_sentences(text: str, min_chars: int = 40) -> list:
+    """
+    Splits a complete text into sentences.
+
+    Args:
+        text (str): The text to split.
+        min_chars (int): Minimum number of characters of a sentence.
+
+    Returns:
+        list[str]: The sentences, in order.
+    """
+    splitter = SentenceSplitter(min_chars=min_chars)
+    return splitter.feed(text) + splitter.flush()
+
+
+def split_text_into_chunks(text: str, max_chars: int = 800) -> list:
+    """
+    Splits a long text into chunks of at most max_chars, breaking only between sentences.
+
+    Paragraph breaks are preferred: a chunk is closed at the end of a paragraph once it is at
+    least half full. A single sentence longer than max_chars becomes a chunk of its own.
+
+    Args:
+        text (str): The text to split.
+        max_chars (int): Maximum number of characters per chunk.
+
+    Returns:
+        list[str]: The chunks, in order.
+    """
+    chunks = []
+    current = []
+    current_len = 0
+
+    def flush():
+        nonlocal current, current_len
+        if current:
+            chunks.append(" ".join(current))
+        current = []
+        current_len = 0
+
+    for paragraph in PARAGRAPH_BREAK_PATTERN.split(text):
+        for sentence in split_sentences(paragraph, min_chars=0):
+            added_len = len(sentence) + (1 if current else 0)
+            if current and current_len + added_len > max_chars:
+                flush()
+                added_len = len(sentence)
+            current.append(sentence)
+            current_len += added_len
+        if current_len >= max_chars // 2:
+            flush()
+
+    flush()
+    return chunks
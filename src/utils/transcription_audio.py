@@ -0,0 +1,189 @@
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from pydub.utils import mediainfo
+from utils.subtitle_handler import align_words_with_punctuation, join_words
+
+# Speech recognition works on 16 kHz mono; Opus keeps speech intelligible at low bitrates
+SAMPLE_RATE = 16000
+BITRATE = "24k"
+CODEC = "libopus"
+CONTAINER = "ogg"
+
+# The Whisper API rejects uploads over 25 MB; keep a margin for the container overhead
+MAX_UPLOAD_BYTES = 24 * 1024 * 1024
+CHUNK_OVERLAP_SECONDS = 3.0
+# Words of two chunks are the same word if they start within this many seconds
+SPLICE_TOLERANCE = 0.5
+
+
+def audio_duration(path):
+    """
+    Returns the duration of an audio file in seconds, read by ffprobe without decoding it.
+    """
+    return float(mediainfo(path)["duration"])
+
+
+def encode_for_transcription(path, start=0.0, duration=None, ffmpeg_binary="ffmpeg",
+                             sample_rate=SAMPLE_RATE, bitrate=BITRATE):
+    """
+    Downmixes, resamples and encodes (part of) an audio file for upload to a speech
+    recognition API, in memory.
+
+    Args:
+        path (str): Path to the audio file.
+        start (float): Start of the part to encode, in seconds.
+        duration (float, optional): Duration of the part. Defaults to the rest of the file.
+        ffmpeg_binary (str): The ffmpeg executable.
+        sample_rate (int): Output sample rate.
+        bitrate (str): Output bitrate, e.g. "24k".
+
+    Returns:
+        bytes: The encoded audio (Opus in Ogg).
+    """
+    command = [ffmpeg_binary, "-v", "error", "-ss", f"{start:.3f}"]
+    if duration is not None:
+        command += ["-t", f"{duration:.3f}"]
+    command += ["-i", path, "-vn", "-ac", "1", "-ar", str(sample_rate),
+                # Constant bitrate, so the size of a chunk follows its duration
+                "-c:a", CODEC, "-b:a", bitrate, "-vbr", "off", "-f", CONTAINER, "pipe:1"]
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode:
+        raise RuntimeError(
+            f"ffmpeg failed to encode {path}: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def plan_chunks(duration, max_bytes=MAX_UPLOAD_BYTES, bitrate=BITRATE,
+                overlap=CHUNK_OVERLAP_SECONDS):
+    """
+    Splits an audio duration into overlapping chunks whose encoding fits the upload limit.
+
+    Args:
+        duration (float): Duration of the audio in seconds.
+        max_bytes (int): Maximum upload size.
+        bitrate (str): Encoding bitrate, e.g. "24k".
+        overlap (float): Seconds shared by consecutive chunks, so no word is lost at a cut.
+
+    Returns:
+        list[tuple[float, float]]: (start, duration) of each chunk.
+    """
+    bits_per_second = float(bitrate.rstrip("k")) * 1000
+    # 10% margin for the container and the encoder's bitrate variations
+    chunk_seconds = max(2 * overlap, max_bytes * 8 / bits_per_second * 0.9)
+    if duration <= chunk_seconds:
+        return [(0.0, duration)]
+    chunks = []
+    start = 0.0
+    while start + overlap < duration:
+        chunks.append((start, min(chunk_seconds, duration - start)))
+        start += chunk_seconds - overlap
+    return chunks
+
+
+def _normalized(text):
+    return re.sub(r"\W+", "", text.casefold())
+
+
+def _splice_point(merged, tokens, overlap_start, overlap_end):
+    """
+    Finds where to join the tokens of a chunk to the tokens merged so far: at a word both
+    chunks recognized at the same time, as close as possible to the middle of their overlap.
+
+    Returns:
+        tuple[int, int]: Index of the first merged token dropped and of the first chunk token
+                         kept.
+    """
+    middle = (overlap_start + overlap_end) / 2
+    candidates = []
+    for i in range(len(merged) - 1, -1, -1):
+        if merged[i][0] < overlap_start - SPLICE_TOLERANCE:
+            break
+        for j, token in enumerate(tokens):
+            if token[0] > overlap_end + SPLICE_TOLERANCE:
+                break
+            if (abs(token[0] - merged[i][0]) <= SPLICE_TOLERANCE
+                    and _normalized(token[2]) == _normalized(merged[i][2])):
+                candidates.append((abs(merged[i][0] - middle), i, j))
+    if candidates:
+        _, i, j = min(candidates)
+        return i, j
+    # No word recognized by both chunks: cut both at the middle of the overlap
+    i = next((k for k, token in enumerate(merged) if token[0] >= middle), len(merged))
+    j = next((k for k, token in enumerate(tokens) if token[0] >= middle), len(tokens))
+    return i, j
+
+
+def merge_chunk_transcripts(chunks):
+    """
+    Merges the transcripts of overlapping audio chunks into one.
+
+    Word timestamps are shifted by the start of their chunk, and the overlap between two chunks
+    is resolved at a word both recognized, so words cut at a chunk edge are taken from the
+    chunk where they are whole.
+
+    Args:
+        chunks (list[tuple[float, float, object]]): (start, duration, transcript) of every
+                                                    chunk, in order. Transcripts have `text`
+                                                    and `words` with `word`, `start`, `end`.
+
+    Returns:
+        tuple[str, list[tuple]]: The merged text and the merged words as
+                                 (start, end, word_with_punctuation).
+    """
+    merged = []
+    for start, duration, transcript in chunks:
+        # Punctuated words, so the text can be rebuilt from the words kept in each chunk
+        tokens = [(word_start + start, word_end + start, text) for word_start, word_end, text
+                  in align_words_with_punctuation(transcript.words or [], transcript.text)]
+        if not merged:
+            merged = tokens
+            continue
+        previous_end = max(token[1] for token in merged)
+        i, j = _splice_point(merged, tokens, start, min(previous_end, start + duration))
+        merged = merged[:i] + tokens[j:]
+    return join_words([token[2] for token in merged]), merged
+
+
+def transcribe_in_chunks(path, transcribe, max_bytes=MAX_UPLOAD_BYTES, max_workers=4,
+                         ffmpeg_binary="ffmpeg"):
+    """
+    Transcribes an audio file through a speech recognition API with small uploads: the audio
+    is encoded as 16 kHz mono Opus and, if it is still over the upload limit, split into
+    overlapping chunks transcribed in parallel and merged.
+
+    Args:
+        path (str): Path to the audio file.
+        transcribe (callable): Function sending (file name, encoded bytes) to the API and
+                               returning its transcript (`text`, `words`, `duration`).
+        max_bytes (int): Maximum upload size.
+        max_workers (int): Maximum number of chunks transcribed concurrently.
+        ffmpeg_binary (str): The ffmpeg executable.
+
+    Returns:
+        The transcript of the API for a single upload, otherwise an object with the merged
+        `text`, `words` (with `word`, `start`, `end`) and `duration`.
+    """
+    duration = audio_duration(path)
+    chunks = plan_chunks(duration, max_bytes)
+
+    def run(chunk):
+        start, length = chunk
+        data = encode_for_transcription(
+            path, start, length if len(chunks) > 1 else None, ffmpeg_binary)
+        return transcribe((f"audio.{CONTAINER}", data))
+
+    if len(chunks) == 1:
+        return run(chunks[0])
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        transcripts = list(executor.map(run, chunks))
+    text, words = merge_chunk_transcripts(
+        [(start, length, transcript) for (start, length), transcript in zip(chunks, transcripts)])
+    return SimpleNamespace(
+        text=text,
+        duration=duration,
+        language=getattr(transcripts[0], "language", None),
+        words=[SimpleNamespace(word=word, start=start, end=end) for start, end, word in words],
+    )
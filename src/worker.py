@@ -0,0 +1,187 @@
+import os
+import socket
+import sys
+import threading
+import time
+from parsers.arguments import parse_args, parse_worker_args
+from pipeline import PipelineError, StageStopped, attach_log_file, clean_video_folder, detach_log_file, \
+    generate_assets, render_video
+from services.registry import ServiceRegistry, required_services
+from utils.job_queue import JobQueue
+from utils.logger import JobLogger, setup_logger
+
+
+class _Heartbeat:
+    """
+    Renews the lease of a claimed stage in the background while it runs. The lease is lost when
+    the queue refuses a renewal, or when no renewal succeeds for a whole lease.
+    """
+
+    def __init__(self, job_queue, job_id, worker, lease_seconds, logger):
+        self.job_queue = job_queue
+        self.job_id = job_id
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.logger = logger
+        self.lost = False
+        self._renewed = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job_id}", daemon=True)
+
+    def _run(self):
+        # Renew well before expiry so one slow renewal does not lose the lease
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                renewed = self.job_queue.renew(self.job_id, self.worker, self.lease_seconds)
+            except Exception as e:
+                self.logger.warning(f"Could not renew the lease of job {self.job_id}: {e}")
+                # Another worker may claim the stage once the last renewal has expired
+                if time.monotonic() - self._renewed < self.lease_seconds:
+                    continue
+                renewed = False
+            if not renewed:
+                self.lost = True
+                self.logger.warning(f"Lost the lease of job {self.job_id}; stopping its stage.")
+                return
+            self._renewed = time.monotonic()
+
+    def check(self):
+        """
+        Stops the stage once the lease is lost, since another worker may be running it.
+
+        Raises:
+            StageStopped: If the lease is lost.
+        """
+        if self.lost:
+            raise StageStopped(f"Lost the lease of job {self.job_id}.")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_stage(job, services, logger, checkpoint=None):
+    """
+    Runs the claimed stage of a job in its output folder.
+
+    Args:
+        job (dict): The claimed job (see JobQueue.claim).
+        services (ServiceRegistry): The registry providing the API clients.
+        logger: Logger instance for logging.
+        checkpoint (callable, optional): Called between the steps of the stage; it raises
+                                         StageStopped to stop the stage.
+
+    Returns:
+        str | None: The path to the final video after the render stage.
+    """
+    # Fails the job, rather than exiting the worker, if its options are no longer valid
+    args = parse_args(job["argv"], exit_on_error=False)
+    checkpoint = checkpoint or (lambda: None)
+    file_id = job["id"]
+    video_folder = f"output/{file_id}"
+    os.makedirs(video_folder, exist_ok=True)
+    file_handler = attach_log_file(logger, video_folder, mode='a')
+    try:
+        if job["stage"] == "generate":
+            services.validate(required_services(args))
+            generate_assets(args, services, logger, file_id, video_folder, checkpoint=checkpoint)
+            return None
+        checkpoint()
+        final_video_path = render_video(video_folder, file_id, logger,
+                                        incremental=args.incremental_render,
+                                        profile=args.profile_render, streaming=args.streaming_render)
+        # The sources are kept for the worker that claims the stage again
+        checkpoint()
+        clean_video_folder(video_folder, file_id, args.retention, logger)
+        return final_video_path
+    finally:
+        detach_log_file(logger, file_handler)
+
+
+def run_worker(job_queue, services, worker_id, capabilities, logger, lease_seconds=60.0,
+               poll_seconds=2.0, max_jobs=None, exit_when_idle=False):
+    """
+    Claims and runs job stages until stopped.
+
+    Args:
+        job_queue (JobQueue): The shared queue.
+        services (ServiceRegistry): The registry providing the API clients.
+        worker_id (str): Identifier of this worker in the queue.
+        capabilities (list[str]): The stages this worker runs ("generate", "render").
+        logger: Logger instance for logging.
+        lease_seconds (float): Lease duration; the lease is renewed every third of it.
+        poll_seconds (float): Wait between two claims when the queue is empty.
+        max_jobs (int, optional): Stop after running this many stages.
+        exit_when_idle (bool): Stop when no stage is queued instead of waiting.
+
+    Returns:
+        int: The number of stages run.
+    """
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = job_queue.claim(worker_id, capabilities, lease_seconds)
+        if job is None:
+            if exit_when_idle:
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        job_id, stage = job["id"], job["stage"]
+        logger.info(f"Claimed the {stage} stage of job {job_id} (attempt {job['attempts']}).")
+        # Tagging the records with the job keeps each process.log limited to its own job
+        job_logger = JobLogger(job_id)
+        try:
+            with _Heartbeat(job_queue, job_id, worker_id, lease_seconds, logger) as heartbeat:
+                final_video = run_stage(job, services, job_logger, checkpoint=heartbeat.check)
+        except KeyboardInterrupt:
+            job_queue.release(job_id, worker_id)
+            logger.info(f"Released the {stage} stage of job {job_id}.")
+            raise
+        except StageStopped as e:
+            # The stage is queued again (or failed) by the queue when the lease expires
+            logger.warning(f"Stopped the {stage} stage of job {job_id}: {e}")
+        except Exception as e:
+            if not isinstance(e, PipelineError):
+                job_logger.exception(f"Unexpected error in job {job_id}")
+            if job_queue.fail(job_id, worker_id, str(e)):
+                logger.info(f"The {stage} stage of job {job_id} failed: {e}")
+        else:
+            if job_queue.complete(job_id, worker_id, final_video=final_video):
+                logger.info(f"Finished the {stage} stage of job {job_id}.")
+            else:
+                logger.warning(
+                    f"Finished the {stage} stage of job {job_id} after losing its lease; "
+                    f"the result is discarded.")
+        processed += 1
+    return processed
+
+
+def main():
+    """
+    Runs a worker of the distributed job queue.
+    - Claims the queued stages it is able to run (generation, render) from the shared queue.
+    - Renews the lease of the running stage, so crashed workers' stages are queued again.
+    - Writes every job to output/<job id>, which must be on storage shared by all workers.
+    """
+    logger = setup_logger()
+    args = parse_worker_args()
+    worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+    job_queue = JobQueue(args.queue)
+    logger.info(
+        f"Worker {worker_id} running {', '.join(args.capabilities)} stages from {args.queue}.")
+    try:
+        run_worker(job_queue, ServiceRegistry(), worker_id, args.capabilities, logger,
+                   lease_seconds=args.lease_seconds, poll_seconds=args.poll_seconds,
+                   max_jobs=args.max_jobs, exit_when_idle=args.exit_when_idle)
+    except KeyboardInterrupt:
+        logger.info(f"Stopping worker {worker_id}...")
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()